@@ -0,0 +1,255 @@
+# alert_history_store.py
+#
+# Histórico de alertas em SQLite (modo WAL), só com inserções no fim e índices por data,
+# símbolo e gatilho. Cada alerta é gravado no momento em que dispara, então um
+# fechamento inesperado não perde o histórico, e as consultas por período/filtro não
+# precisam carregar os dados de análise de todos os registros.
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from datetime import date, datetime, timedelta
+from collections import namedtuple
+from threading import Lock
+
+import numpy as np
+
+from app_state import get_application_path
+
+ALERT_HISTORY_DB_PATH = os.path.join(get_application_path(), "alert_history.db")
+LEGACY_HISTORY_PATH = os.path.join(get_application_path(), "alert_history.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_symbol_ts ON alerts (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_trigger_ts ON alerts (trigger, ts);
+
+-- Contagens por (dia, símbolo, gatilho), mantidas por triggers: as contagens da janela
+-- de histórico não dependem da quantidade de alertas guardados
+CREATE TABLE IF NOT EXISTS alert_counts (
+    day TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (day, symbol, trigger)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS alerts_count_insert AFTER INSERT ON alerts BEGIN
+    INSERT INTO alert_counts (day, symbol, trigger, n) VALUES (date(NEW.ts, 'unixepoch', 'localtime'), NEW.symbol, NEW.trigger, 1)
+    ON CONFLICT (day, symbol, trigger) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS alerts_count_delete AFTER DELETE ON alerts BEGIN
+    UPDATE alert_counts SET n = n - 1
+    WHERE day = date(OLD.ts, 'unixepoch', 'localtime') AND symbol = OLD.symbol AND trigger = OLD.trigger;
+END;
+"""
+
+def _to_epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+class AlertHistoryStore:
+    """
+    Histórico persistente de alertas. 'append' é O(1); a retenção (quantidade máxima e
+    idade máxima) é aplicada na abertura e a cada 'RETENTION_EVERY' inserções. 'version'
+    muda a cada alteração, para quem guarda páginas em cache saber quando descartá-las.
+    """
+    RETENTION_EVERY = 500
+
+    def __init__(self, path=ALERT_HISTORY_DB_PATH, max_entries=50000, retention_days=365, legacy_path=LEGACY_HISTORY_PATH):
+        self.path = path
+        self.max_entries = max_entries
+        self.retention_days = retention_days
+        self._lock = Lock()
+        self._appends = 0
+        self.version = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._backfill_counts()
+        if legacy_path: self.migrate_json(legacy_path)
+        self.enforce_retention()
+
+    def _backfill_counts(self):
+        """Preenche alert_counts para bancos criados antes da tabela de contagens."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM alert_counts LIMIT 1").fetchone(): return
+            if not self._conn.execute("SELECT 1 FROM alerts LIMIT 1").fetchone(): return
+            self._conn.execute(
+                "INSERT INTO alert_counts (day, symbol, trigger, n) SELECT date(ts, 'unixepoch', 'localtime'), symbol, trigger, COUNT(*) "
+                "FROM alerts GROUP BY 1, 2, 3")
+
+    def migrate_json(self, legacy_path):
+        """Importa o antigo alert_history.json (mais recente primeiro) e o renomeia para .bak."""
+        if not os.path.exists(legacy_path): return 0
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Não foi possível ler o histórico antigo de alertas: {e}")
+            return 0
+        rows = [(_to_epoch(r.get('timestamp')), r.get('timestamp', ''), r.get('symbol', 'N/A'), r.get('trigger', 'N/A'),
+                 json.dumps(r['data'], default=str) if r.get('data') else None) for r in reversed(records)]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO alerts (ts, timestamp, symbol, trigger, data) VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+        os.replace(legacy_path, legacy_path + ".bak")
+        logging.info(f"{len(rows)} alerta(s) migrado(s) de alert_history.json para o banco de histórico.")
+        return len(rows)
+
+    def append(self, symbol, trigger, data=None, timestamp=None):
+        """Grava um alerta. Retorna o registro (sem os dados de análise)."""
+        timestamp = timestamp or datetime.now().isoformat()
+        payload = json.dumps(data, default=str) if data else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO alerts (ts, timestamp, symbol, trigger, data) VALUES (?, ?, ?, ?, ?)",
+                (_to_epoch(timestamp), timestamp, symbol, trigger, payload))
+            self._appends += 1
+            self.version += 1
+        if self._appends % self.RETENTION_EVERY == 0:
+            self.enforce_retention()
+        return {'id': cursor.lastrowid, 'timestamp': timestamp, 'symbol': symbol, 'trigger': trigger, 'has_data': payload is not None}
+
+    def aggregates(self):
+        """Linhas (dia 'AAAA-MM-DD', símbolo, gatilho, quantidade) da tabela de contagens."""
+        with self._lock:
+            cursor = self._conn.execute("SELECT day, symbol, trigger, n FROM alert_counts WHERE n > 0")
+            cursor.row_factory = None
+            return cursor.fetchall()
+
+    def page(self, start=None, symbols=None, triggers=None, limit=100, before=None, skip=0):
+        """
+        Uma página de linhas (id, timestamp, symbol, trigger, has_data, ts), da mais recente
+        para a mais antiga. Com 'symbols'/'triggers', traz os alertas de qualquer um deles.
+        A paginação é por chave: 'before' é o (ts, id) da última linha da página anterior, ou
+        só um ts (as linhas anteriores a ele); 'skip' pula linhas a partir daí e deve ficar
+        pequeno (no máximo o total de um dia, ver AlertHistoryIndex.seek).
+        """
+        clauses, params = [], []
+        if start is not None: clauses.append("ts >= ?"); params.append(start)
+        if isinstance(before, tuple):
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))"); params += [before[0], before[0], before[1]]
+        elif before is not None:
+            clauses.append("ts < ?"); params.append(before)
+        if symbols is not None or triggers is not None:
+            symbols, triggers = list(symbols or ()), list(triggers or ())
+            clauses.append(f"(symbol IN ({','.join('?' * len(symbols))}) OR trigger IN ({','.join('?' * len(triggers))}))")
+            params += symbols + triggers
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        sql = f"SELECT id, timestamp, symbol, trigger, data IS NOT NULL, ts FROM alerts{where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            cursor = self._conn.execute(sql, params + [limit, skip])
+            cursor.row_factory = None
+            return cursor.fetchall()
+
+    def get_data(self, alert_id):
+        """Dados de análise gravados com o alerta (ou None)."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+        return json.loads(row['data']) if row and row['data'] else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM alerts")
+            self._conn.execute("DELETE FROM alert_counts")
+            self._conn.execute("COMMIT")
+            self.version += 1
+
+    def enforce_retention(self):
+        """Remove alertas mais antigos que 'retention_days' e o excedente de 'max_entries'."""
+        try:
+            with self._lock:
+                if self.retention_days:
+                    self._conn.execute("DELETE FROM alerts WHERE ts < ?", (time.time() - self.retention_days * 86400,))
+                if self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM alerts WHERE id <= (SELECT id FROM alerts ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (self.max_entries,))
+                self._conn.execute("DELETE FROM alert_counts WHERE n <= 0")
+                self.version += 1
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao aplicar a retenção do histórico de alertas: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# 'day_ends'/'day_totals': fim (epoch) de cada dia com alertas, do mais recente para o mais
+# antigo, e o total acumulado de alertas do filtro até o fim daquele dia
+HistoryFilter = namedtuple('HistoryFilter', ['start', 'symbols', 'triggers', 'count', 'day_ends', 'day_totals'])
+
+def _day_end(day):
+    return datetime.combine(date.fromisoformat(day) + timedelta(days=1), datetime.min.time()).timestamp()
+
+class AlertHistoryIndex:
+    """
+    Índice da janela de busca, montado a partir das contagens agregadas (não dos alertas):
+    símbolos e gatilhos distintos já em minúsculas e, por (dia, símbolo, gatilho), a
+    quantidade de alertas. Uma busca resolve quais símbolos/gatilhos casam com o texto e
+    quantos alertas existem no período sem tocar na tabela de alertas.
+    """
+    def __init__(self, aggregate_rows):
+        days = sorted({row[0] for row in aggregate_rows})
+        self.symbols = sorted({row[1] for row in aggregate_rows})
+        self.triggers = sorted({row[2] for row in aggregate_rows})
+        self.symbol_tokens = [symbol.lower() for symbol in self.symbols]
+        self.trigger_tokens = [trigger.lower() for trigger in self.triggers]
+        day_codes = {day: i for i, day in enumerate(days)}
+        symbol_codes = {symbol: i for i, symbol in enumerate(self.symbols)}
+        trigger_codes = {trigger: i for i, trigger in enumerate(self.triggers)}
+        self.days = days
+        self.day = np.array([day_codes[row[0]] for row in aggregate_rows], dtype=np.int32)
+        self.symbol = np.array([symbol_codes[row[1]] for row in aggregate_rows], dtype=np.int32)
+        self.trigger = np.array([trigger_codes[row[2]] for row in aggregate_rows], dtype=np.int32)
+        self.n = np.array([row[3] for row in aggregate_rows], dtype=np.int64)
+
+    def search(self, text=None, start_date=None):
+        """HistoryFilter com os símbolos/gatilhos que contêm 'text' e os totais de alertas desde 'start_date'."""
+        mask = np.ones(len(self.n), dtype=bool)
+        if start_date is not None:
+            first_day = int(np.searchsorted(self.days, start_date.isoformat()))
+            mask &= self.day >= first_day
+        start = datetime.combine(start_date, datetime.min.time()).timestamp() if start_date is not None else None
+        text = (text or "").strip().lower()
+        symbols = triggers = None
+        if text:
+            symbol_codes = [i for i, token in enumerate(self.symbol_tokens) if text in token]
+            trigger_codes = [i for i, token in enumerate(self.trigger_tokens) if text in token]
+            mask &= np.isin(self.symbol, symbol_codes) | np.isin(self.trigger, trigger_codes)
+            symbols, triggers = [self.symbols[i] for i in symbol_codes], [self.triggers[i] for i in trigger_codes]
+        per_day = np.bincount(self.day[mask], weights=self.n[mask], minlength=len(self.days)).astype(np.int64)[::-1]
+        days = np.flatnonzero(per_day)
+        day_ends = tuple(_day_end(self.days[len(self.days) - 1 - i]) for i in days)
+        day_totals = np.cumsum(per_day[days])
+        return HistoryFilter(start, symbols, triggers, int(day_totals[-1]) if len(days) else 0, day_ends, day_totals)
+
+    @staticmethod
+    def seek(history_filter, position):
+        """
+        Ponto de partida da linha 'position' (0 = mais recente) para AlertHistoryStore.page:
+        (before, skip), com 'before' = fim do dia dessa linha e 'skip' = linhas do mesmo dia
+        antes dela. Os totais por dia evitam um OFFSET sobre todos os alertas mais novos.
+        """
+        i = int(np.searchsorted(history_filter.day_totals, position, side='right'))
+        if i >= len(history_filter.day_ends): return None, position
+        return history_filter.day_ends[i], position - (int(history_filter.day_totals[i - 1]) if i else 0)
@@ -0,0 +1,268 @@
+# alert_rules.py
+#
+# Compilador de regras de alerta: converte o 'alert_config' de cada moeda em regras com
+# os limites já convertidos, uma única vez por alteração da configuração. As regras de
+# todos os símbolos viram matrizes de limites, avaliadas com máscaras NumPy sobre as
+# colunas da análise do ciclo. As mensagens só são formatadas para as regras que disparam.
+
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+AlertRule = namedtuple('AlertRule', ['condition', 'key', 'params', 'message'])
+
+def _price_below(cond):
+    limit = float(cond['value'])
+    return 'PRECO_ABAIXO', (limit,), (lambda d: f"Preço Abaixo de ${limit:.2f}")
+
+def _price_above(cond):
+    limit = float(cond['value'])
+    return 'PRECO_ACIMA', (limit,), (lambda d: f"Preço Acima de ${limit:.2f}")
+
+def _rsi_oversold(cond):
+    limit = float(cond['value'])
+    return 'RSI_SOBREVENDA', (limit,), (lambda d: f"RSI Sobrevendido (<= {limit:.1f})")
+
+def _rsi_overbought(cond):
+    limit = float(cond['value'])
+    return 'RSI_SOBRECOMPRA', (limit,), (lambda d: f"RSI Sobrecomprado (>= {limit:.1f})")
+
+def _volume_anomaly(cond):
+    limit = float(cond['value'])
+    return 'VOLUME_ANORMAL', (limit,), (lambda d: f"Volume Anormal (z-score {d['volume_zscore']:.1f} >= {limit:.1f})")
+
+def _signal(key, text):
+    """Regra baseada em um sinal textual da análise (sem parâmetros)."""
+    def build(cond):
+        return key, (), (lambda d: text)
+    return build
+
+def _capital_flow(key, text):
+    """Regra de fuga/entrada de capital: valor no formato 'Vol % do Cap., Var %'."""
+    def build(cond):
+        percent_mcap, percent_price = (float(part) for part in str(cond['value']).split(','))
+        return key, (percent_mcap, percent_price), (lambda d: text)
+    return build
+
+# Ordem de avaliação (e de disparo) das condições
+RULE_BUILDERS = {
+    'preco_baixo': _price_below,
+    'preco_alto': _price_above,
+    'rsi_sobrevendido': _rsi_oversold,
+    'rsi_sobrecomprado': _rsi_overbought,
+    'bollinger_abaixo': _signal('PRECO_ABAIXO_BANDA_INFERIOR', "Preço Abaixo da Banda Inferior de Bollinger"),
+    'bollinger_acima': _signal('PRECO_ACIMA_BANDA_SUPERIOR', "Preço Acima da Banda Superior de Bollinger"),
+    'macd_cruz_baixa': _signal('CRUZAMENTO_MACD_BAIXA', "MACD: Cruzamento de Baixa"),
+    'macd_cruz_alta': _signal('CRUZAMENTO_MACD_ALTA', "MACD: Cruzamento de Alta"),
+    'mme_cruz_morte': _signal('CRUZ_DA_MORTE', "MME: Cruz da Morte (50/200)"),
+    'mme_cruz_dourada': _signal('CRUZ_DOURADA', "MME: Cruz Dourada (50/200)"),
+    'hilo_compra': _signal('HILO_COMPRA', "HiLo: Sinal de Compra"),
+    'hilo_venda': _signal('HILO_VENDA', "HiLo: Sinal de Venda"),
+    'volume_anormal': _volume_anomaly,
+    'fuga_capital_significativa': _capital_flow('FUGA_CAPITAL', "Detectada possível fuga de capital significativa"),
+    'entrada_capital_significativa': _capital_flow('ENTRADA_CAPITAL', "Detectada possível entrada de capital significativa"),
+}
+CONDITIONS = tuple(RULE_BUILDERS)
+# Condições que não passam pelo cooldown: já têm rearme próprio por nível (price_levels.py)
+COOLDOWN_EXEMPT = frozenset({'niveis_preco'})
+CONDITION_INDEX = {condition: i for i, condition in enumerate(CONDITIONS)}
+
+def compile_alert_rules(symbol, alert_config):
+    """Compila as condições habilitadas de um 'alert_config' em uma tupla de AlertRule."""
+    conditions = alert_config.get('conditions', {})
+    rules = []
+    for condition, builder in RULE_BUILDERS.items():
+        cond = conditions.get(condition)
+        if not cond or not cond.get('enabled'): continue
+        try:
+            rules.append(AlertRule(condition, *builder(cond)))
+        except (KeyError, ValueError, TypeError):
+            logging.warning(f"Configuração de alerta '{condition}' inválida para {symbol}. Condição ignorada.")
+    return tuple(rules)
+
+class AlertRuleCache:
+    """Regras compiladas por símbolo; recompila só quando o 'alert_config' do símbolo muda de conteúdo."""
+    def __init__(self):
+        self._entries = {}
+        self.version = 0  # Incrementado a cada recompilação
+
+    def get(self, symbol, alert_config):
+        entry = self._entries.get(symbol)
+        if entry is None or (entry[0] is not alert_config and entry[0] != alert_config):
+            entry = (alert_config, compile_alert_rules(symbol, alert_config))
+            self._entries[symbol] = entry
+            self.version += 1
+        return entry[1]
+
+    def prune(self, symbols):
+        """Descarta as regras de símbolos que deixaram de ser monitorados."""
+        for symbol in self._entries.keys() - set(symbols):
+            del self._entries[symbol]
+
+# ==========================================
+# AVALIAÇÃO VETORIZADA
+# ==========================================
+# Sinais textuais da análise codificados como inteiros nas colunas
+SIGNAL_CODES = {"Cruzamento de Alta": 1, "Cruzamento de Baixa": 2, "Cruz Dourada": 3,
+                "Cruz da Morte": 4, "HiLo Buy": 5, "HiLo Sell": 6}
+
+class AnalysisColumns:
+    """Resultados da análise do ciclo em colunas (um array por campo, uma posição por símbolo)."""
+    VALUE_FIELDS = ('current_price', 'rsi_value', 'volume_24h', 'price_change_24h',
+                    'market_cap', 'volume_zscore', 'bollinger_pct_b')
+    SIGNAL_FIELDS = ('macd_signal', 'mme_cross', 'hilo_signal')
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        for field in self.VALUE_FIELDS:
+            setattr(self, field, np.full(n, np.nan))
+        for field in self.SIGNAL_FIELDS:
+            setattr(self, field, np.zeros(n, dtype=np.int8))
+
+    def set_row(self, i, analysis_data):
+        """Copia a análise de um símbolo para a posição 'i' das colunas (None vira NaN)."""
+        for field in self.VALUE_FIELDS:
+            value = analysis_data.get(field)
+            getattr(self, field)[i] = np.nan if value is None else value
+        for field in self.SIGNAL_FIELDS:
+            getattr(self, field)[i] = SIGNAL_CODES.get(analysis_data.get(field), 0)
+
+    def select(self, rows):
+        """Colunas restritas a 'rows' (fatia ou índices); com uma fatia, os arrays são views."""
+        view = object.__new__(AnalysisColumns)
+        view.symbols = self.symbols[rows] if isinstance(rows, slice) else [self.symbols[i] for i in rows]
+        for field in self.VALUE_FIELDS + self.SIGNAL_FIELDS:
+            setattr(view, field, getattr(self, field)[rows])
+        return view
+
+def _capital_ratio(c):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(c.market_cap > 0, c.volume_24h / c.market_cap * 100, np.nan)
+
+# Máscara de cada condição: c = AnalysisColumns, p = matriz de parâmetros (n_params x n_símbolos)
+CONDITION_MASKS = {
+    'preco_baixo': lambda c, p: c.current_price <= p[0],
+    'preco_alto': lambda c, p: c.current_price >= p[0],
+    'rsi_sobrevendido': lambda c, p: c.rsi_value <= p[0],
+    'rsi_sobrecomprado': lambda c, p: c.rsi_value >= p[0],
+    'bollinger_abaixo': lambda c, p: c.bollinger_pct_b < 0,
+    'bollinger_acima': lambda c, p: c.bollinger_pct_b > 1,
+    'macd_cruz_baixa': lambda c, p: c.macd_signal == SIGNAL_CODES["Cruzamento de Baixa"],
+    'macd_cruz_alta': lambda c, p: c.macd_signal == SIGNAL_CODES["Cruzamento de Alta"],
+    'mme_cruz_morte': lambda c, p: c.mme_cross == SIGNAL_CODES["Cruz da Morte"],
+    'mme_cruz_dourada': lambda c, p: c.mme_cross == SIGNAL_CODES["Cruz Dourada"],
+    'hilo_compra': lambda c, p: c.hilo_signal == SIGNAL_CODES["HiLo Buy"],
+    'hilo_venda': lambda c, p: c.hilo_signal == SIGNAL_CODES["HiLo Sell"],
+    'volume_anormal': lambda c, p: c.volume_zscore >= p[0],
+    'fuga_capital_significativa': lambda c, p: (_capital_ratio(c) > p[0]) & (c.price_change_24h < p[1]),
+    'entrada_capital_significativa': lambda c, p: (_capital_ratio(c) > p[0]) & (c.price_change_24h > p[1]),
+}
+
+# Condições de nível disparam uma vez ao entrar na zona e só são rearmadas depois de
+# voltar além de uma banda de histerese. Cruzamentos (MACD, MME, HiLo) já são eventos.
+DEFAULT_HYSTERESIS = {'price_pct': 0.5, 'rsi_points': 5.0, 'bollinger_pct_b': 0.1, 'volume_zscore': 1.0}
+
+REARM_MASKS = {
+    'preco_baixo': lambda c, p, h: c.current_price > p[0] * (1 + h['price_pct'] / 100),
+    'preco_alto': lambda c, p, h: c.current_price < p[0] * (1 - h['price_pct'] / 100),
+    'rsi_sobrevendido': lambda c, p, h: c.rsi_value > p[0] + h['rsi_points'],
+    'rsi_sobrecomprado': lambda c, p, h: c.rsi_value < p[0] - h['rsi_points'],
+    'bollinger_abaixo': lambda c, p, h: c.bollinger_pct_b > h['bollinger_pct_b'],
+    'bollinger_acima': lambda c, p, h: c.bollinger_pct_b < 1 - h['bollinger_pct_b'],
+    'volume_anormal': lambda c, p, h: c.volume_zscore < p[0] - h['volume_zscore'],
+    'fuga_capital_significativa': lambda c, p, h: (_capital_ratio(c) <= p[0]) | (c.price_change_24h >= p[1]),
+    'entrada_capital_significativa': lambda c, p, h: (_capital_ratio(c) <= p[0]) | (c.price_change_24h <= p[1]),
+}
+
+class AlertRuleMatrix:
+    """Regras compiladas de vários símbolos como máscaras de habilitação e matrizes de limites."""
+    def __init__(self, symbols, rules_by_symbol, hysteresis=None):
+        self.symbols = list(symbols)
+        self.rules_by_symbol = rules_by_symbol
+        self.hysteresis = {**DEFAULT_HYSTERESIS, **(hysteresis or {})}
+        n = len(self.symbols)
+        self.enabled = np.zeros((len(CONDITIONS), n), dtype=bool)
+        self.armed = np.ones((len(CONDITIONS), n), dtype=bool)  # Estado da máquina de disparo por borda
+        self.params = {}
+        for i, symbol in enumerate(self.symbols):
+            for rule in rules_by_symbol.get(symbol, ()):
+                j = CONDITION_INDEX[rule.condition]
+                self.enabled[j, i] = True
+                if rule.params:
+                    params = self.params.setdefault(j, np.full((len(rule.params), n), np.nan))
+                    params[:, i] = rule.params
+        # Só as condições habilitadas em pelo menos um símbolo são avaliadas
+        self.active_conditions = np.flatnonzero(self.enabled.any(axis=1))
+
+    def evaluate(self, columns, rows=slice(None), conditions=None):
+        """
+        Avalia as regras sobre as colunas da análise (mesma ordem de símbolos).
+        Condições de nível só disparam se estiverem armadas; ao disparar são desarmadas
+        até voltarem além da banda de histerese.
+        'rows' (fatia ou índices) restringe a avaliação a parte dos símbolos, para avaliar
+        cada um assim que sua análise fica pronta; 'conditions' restringe as condições.
+        Retorna (acertos, ativas): arrays (k x 2) de pares (índice do símbolo, índice da
+        condição), ordenados por símbolo e pela ordem das condições. 'acertos' são os
+        disparos; 'ativas' são todas as condições atendidas, inclusive as desarmadas.
+        """
+        # Índices a partir dos limites da fatia: o custo acompanha só as linhas avaliadas
+        index = np.arange(*rows.indices(len(self.symbols))) if isinstance(rows, slice) else np.asarray(rows, dtype=np.intp)
+        view = columns.select(rows)
+        hits = np.zeros((len(index), len(CONDITIONS)), dtype=bool)
+        active = np.zeros_like(hits)
+        # Só as condições habilitadas em alguma das linhas avaliadas
+        candidates = self.active_conditions[self.enabled[:, rows][self.active_conditions].any(axis=1)]
+        with np.errstate(invalid='ignore'):
+            for j in candidates:
+                condition = CONDITIONS[j]
+                if conditions is not None and condition not in conditions: continue
+                params = self.params.get(j)
+                if params is not None: params = params[:, rows]
+                fired = self.enabled[j, rows] & CONDITION_MASKS[condition](view, params)
+                active[:, j] = fired
+                if rearm := REARM_MASKS.get(condition):
+                    armed = self.armed[j, rows]
+                    fired = fired & armed
+                    self.armed[j, rows] = (armed & ~fired) | rearm(view, params, self.hysteresis)
+                hits[:, j] = fired
+        hit_pairs, active_pairs = np.argwhere(hits), np.argwhere(active)
+        hit_pairs[:, 0] = index[hit_pairs[:, 0]]
+        active_pairs[:, 0] = index[active_pairs[:, 0]]
+        return hit_pairs, active_pairs
+
+    def carry_state(self, previous):
+        """Herda o estado armado/desarmado da matriz anterior para as regras que não mudaram."""
+        if previous is None: return
+        previous_index = {symbol: i for i, symbol in enumerate(previous.symbols)}
+        for i, symbol in enumerate(self.symbols):
+            k = previous_index.get(symbol)
+            if k is None: continue
+            previous_params = {rule.condition: rule.params for rule in previous.rules_by_symbol.get(symbol, ())}
+            for rule in self.rules_by_symbol.get(symbol, ()):
+                if previous_params.get(rule.condition) == rule.params:
+                    j = CONDITION_INDEX[rule.condition]
+                    self.armed[j, i] = previous.armed[j, k]
+
+    def disarmed_state(self):
+        """{símbolo: {condição: parâmetros}} das regras desarmadas, para guardar entre execuções."""
+        state = {}
+        for j, i in np.argwhere(self.enabled & ~self.armed):
+            rule = self.rule_for(i, j)
+            state.setdefault(self.symbols[i], {})[rule.condition] = list(rule.params)
+        return state
+
+    def restore_disarmed(self, state):
+        """Desarma as regras salvas com disarmed_state() cujos parâmetros não mudaram."""
+        for i, symbol in enumerate(self.symbols):
+            saved = state.get(symbol)
+            if not saved: continue
+            for rule in self.rules_by_symbol.get(symbol, ()):
+                if rule.condition in saved and tuple(saved[rule.condition]) == tuple(rule.params):
+                    self.armed[CONDITION_INDEX[rule.condition], i] = False
+
+    def rule_for(self, symbol_index, condition_index):
+        """Regra compilada correspondente a um acerto de evaluate()."""
+        condition = CONDITIONS[condition_index]
+        return next(rule for rule in self.rules_by_symbol[self.symbols[symbol_index]] if rule.condition == condition)
@@ -0,0 +1,106 @@
+# alert_state.py
+#
+# Estado de cooldown dos alertas, indexado por (símbolo, gatilho). Em memória os
+# instantes são floats de time.monotonic(); no disco viram epoch (time.time()), para
+# que o cooldown sobreviva ao reinício do programa. Junto fica o estado desarmado das
+# condições de nível (AlertRuleMatrix), para que uma condição que continua atendida não
+# dispare de novo só porque o programa foi reiniciado.
+
+import json
+import os
+import time
+import logging
+from threading import Lock
+
+from app_state import get_application_path
+
+ALERT_STATE_FILE_PATH = os.path.join(get_application_path(), "alert_state.json")
+
+class AlertStateStore:
+    """Último disparo de cada (símbolo, gatilho), com persistência em disco sob demanda."""
+    def __init__(self, path=ALERT_STATE_FILE_PATH, save_interval=30.0):
+        self.path = path
+        self.save_interval = save_interval
+        self._last_triggered = {}
+        self._disarmed = {}
+        self._lock = Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+
+    def _load(self):
+        """Carrega o estado salvo, convertendo os instantes epoch para o relógio monotônico."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        # Formato antigo: só {símbolo: {gatilho: epoch}}
+        if 'cooldowns' in saved:
+            self._disarmed = saved.get('disarmed', {})
+            saved = saved['cooldowns']
+        offset = time.monotonic() - time.time()
+        for symbol, triggers in saved.items():
+            for trigger, epoch in triggers.items():
+                self._last_triggered[(symbol, trigger)] = float(epoch) + offset
+
+    def in_cooldown(self, symbol, trigger, cooldown_seconds, now=None):
+        """Indica se o gatilho disparou para o símbolo há menos de 'cooldown_seconds'."""
+        last = self._last_triggered.get((symbol, trigger))
+        if last is None: return False
+        return (now if now is not None else time.monotonic()) - last < cooldown_seconds
+
+    def mark_triggered(self, symbol, trigger, now=None):
+        with self._lock:
+            self._last_triggered[(symbol, trigger)] = now if now is not None else time.monotonic()
+            self._dirty = True
+
+    def retain_active(self, symbols, active_pairs):
+        """
+        Remove o cooldown dos gatilhos dos 'symbols' avaliados que não estão mais ativos,
+        para que disparem de novo assim que a condição voltar a ser atendida.
+        """
+        symbols = set(symbols)
+        with self._lock:
+            stale = [pair for pair in self._last_triggered if pair[0] in symbols and pair not in active_pairs]
+            for pair in stale:
+                del self._last_triggered[pair]
+            if stale: self._dirty = True
+
+    def disarmed_rules(self):
+        """Estado desarmado salvo, no formato de AlertRuleMatrix.disarmed_state()."""
+        with self._lock:
+            return dict(self._disarmed)
+
+    def update_disarmed(self, state):
+        with self._lock:
+            if state != self._disarmed:
+                self._disarmed = state
+                self._dirty = True
+
+    def save_if_due(self):
+        """Salva no disco se houve mudanças e já passou 'save_interval' desde a última gravação."""
+        if self._dirty and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Grava o estado atual (instantes em epoch) de forma atômica."""
+        with self._lock:
+            if not self._dirty: return
+            offset = time.time() - time.monotonic()
+            cooldowns = {}
+            for (symbol, trigger), last in self._last_triggered.items():
+                cooldowns.setdefault(symbol, {})[trigger] = round(last + offset, 3)
+            data = {'cooldowns': cooldowns, 'disarmed': self._disarmed}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._dirty = True
+            logging.error(f"Erro ao salvar o estado dos alertas: {e}")
+
+alert_state = AlertStateStore()
@@ -0,0 +1,163 @@
+# analysis_pool.py
+#
+# Backend opcional de cálculo de indicadores em um pool de processos. Os candles de
+# todos os símbolos ficam em ring buffers em multiprocessing.shared_memory; os workers
+# recebem apenas o índice do símbolo e devolvem um registro compacto de sinais, sem
+# serializar DataFrames entre processos.
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from indicators import IndicatorPipeline
+
+CANDLE_FIELDS = ('open_time', 'close', 'high', 'low')
+
+# Sinais textuais codificados como inteiros nos registros devolvidos pelos workers.
+SIGNAL_VALUES = ("Nenhum", "N/A", "Cruzamento de Alta", "Cruzamento de Baixa",
+                 "Cruz Dourada", "Cruz da Morte", "HiLo Buy", "HiLo Sell")
+SIGNAL_CODES = {value: code for code, value in enumerate(SIGNAL_VALUES)}
+
+class SharedCandleBuffer:
+    """Ring buffers de candles (um por símbolo) em um único bloco de memória compartilhada."""
+    def __init__(self, n_symbols, capacity=300, name=None):
+        self.n_symbols = n_symbols
+        self.capacity = capacity
+        self._owner = name is None
+        meta_size = n_symbols * 2 * 8
+        data_size = n_symbols * capacity * len(CANDLE_FIELDS) * 8
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=meta_size + data_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        # meta[i] = (head, count): próxima posição de escrita e quantidade de candles válidos
+        self.meta = np.ndarray((n_symbols, 2), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.data = np.ndarray((n_symbols, capacity, len(CANDLE_FIELDS)), dtype=np.float64,
+                               buffer=self.shm.buf, offset=meta_size)
+        if self._owner:
+            self.meta[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, idx, rows):
+        """
+        Mescla candles (matriz N x CANDLE_FIELDS, ordenada por open_time) no buffer do símbolo.
+        O candle em formação é sobrescrito; candles novos são anexados. Um buraco na
+        sequência descarta o conteúdo antigo.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        if not len(rows): return
+        cap = self.capacity
+        head, count = (int(v) for v in self.meta[idx])
+        if count:
+            last_pos = (head - 1) % cap
+            last_open = self.data[idx, last_pos, 0]
+            step = rows[1, 0] - rows[0, 0] if len(rows) > 1 else 0
+            if rows[0, 0] > last_open + step:
+                head, count = 0, 0  # Buraco entre o buffer e os dados novos
+            else:
+                rows = rows[rows[:, 0] >= last_open]
+                if len(rows) and rows[0, 0] == last_open:
+                    self.data[idx, last_pos] = rows[0]
+                    rows = rows[1:]
+        rows = rows[-cap:]
+        k = len(rows)
+        if k:
+            positions = (head + np.arange(k)) % cap
+            self.data[idx, positions] = rows
+        self.meta[idx] = ((head + k) % cap, min(count + k, cap))
+
+    def read(self, idx):
+        """Retorna os candles do símbolo em ordem cronológica, como listas de float por campo."""
+        head, count = (int(v) for v in self.meta[idx])
+        if not count:
+            return {field: [] for field in CANDLE_FIELDS}
+        positions = (head - count + np.arange(count)) % self.capacity
+        block = self.data[idx, positions]
+        return {field: block[:, i].tolist() for i, field in enumerate(CANDLE_FIELDS)}
+
+    def close(self):
+        """Libera a memória compartilhada (e a remove do sistema, se for o dono)."""
+        self.meta = self.data = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+# ==========================================
+# LADO DO WORKER
+# ==========================================
+_worker_buffer = None
+_worker_pipeline = None
+
+def _init_worker(shm_name, n_symbols, capacity, indicators, params):
+    """Anexa o worker ao buffer compartilhado e monta o pipeline de indicadores."""
+    global _worker_buffer, _worker_pipeline
+    _worker_buffer = SharedCandleBuffer(n_symbols, capacity, name=shm_name)
+    _worker_pipeline = IndicatorPipeline(indicators, **params)
+
+def _analyze_index(idx):
+    """Calcula os indicadores de um símbolo e devolve um registro compacto."""
+    arrays = _worker_buffer.read(idx)
+    if not arrays['close']:
+        return (idx, None)
+    r = _worker_pipeline.run_arrays(arrays)
+    return (idx, r['rsi_value'], r['bollinger_upper'], r['bollinger_lower'],
+            SIGNAL_CODES[r['macd_signal']], SIGNAL_CODES[r['mme_cross']], SIGNAL_CODES[r['hilo_signal']])
+
+def _decode_record(record):
+    _, rsi, upper, lower, macd, mme, hilo = record
+    return {'rsi_value': rsi, 'bollinger_upper': upper, 'bollinger_lower': lower,
+            'macd_signal': SIGNAL_VALUES[macd], 'mme_cross': SIGNAL_VALUES[mme], 'hilo_signal': SIGNAL_VALUES[hilo]}
+
+# ==========================================
+# LADO DO PROCESSO PRINCIPAL
+# ==========================================
+class ProcessAnalysisBackend:
+    """Pool de processos para o cálculo de indicadores de listas grandes de símbolos."""
+    def __init__(self, symbols, workers=None, capacity=300, pipeline=None):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        pipeline = pipeline or IndicatorPipeline()
+        # Mesmo padrão do ProcessPoolExecutor (no Windows ele aceita no máximo 61 processos)
+        self.workers = workers or min(os.cpu_count() or 1, 61)
+        self.buffer = SharedCandleBuffer(len(self.symbols), capacity)
+        # 'spawn' evita herdar o estado do Tk e funciona igual no Windows e no executável do PyInstaller
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.buffer.name, len(self.symbols), capacity, pipeline.indicators, pipeline.params),
+        )
+        logging.info(f"Backend de análise em processos iniciado para {len(self.symbols)} símbolos.")
+
+    def update_candles(self, symbol, df):
+        """Copia os klines de um símbolo para o ring buffer compartilhado."""
+        if df is None or df.empty or symbol not in self.index: return
+        rows = df[list(CANDLE_FIELDS)].to_numpy(dtype=np.float64)
+        self.buffer.write(self.index[symbol], rows)
+
+    def analyze(self, symbols):
+        """Calcula os indicadores dos símbolos informados em paralelo. Retorna {símbolo: indicadores}."""
+        indexes = [self.index[s] for s in symbols if s in self.index]
+        if not indexes: return {}
+        chunksize = max(1, len(indexes) // (4 * self.workers))
+        results = {}
+        for record in self.executor.map(_analyze_index, indexes, chunksize=chunksize):
+            if record[1] is not None:
+                results[self.symbols[record[0]]] = _decode_record(record)
+        return results
+
+    def shutdown(self):
+        """Encerra os workers e libera a memória compartilhada (também depois de o pool ter quebrado)."""
+        try:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        except Exception as e:
+            logging.error(f"Erro ao encerrar o pool de processos: {e}")
+        self.buffer.close()
+        logging.info("Backend de análise em processos encerrado.")
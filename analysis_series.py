@@ -0,0 +1,260 @@
+# analysis_series.py
+#
+# Série temporal local dos snapshots de análise (preço, RSI, sinais, volume e market cap)
+# de cada símbolo monitorado. Os dados ficam em colunas binárias só de acréscimo (um
+# arquivo por coluna), lidas por memória mapeada, e são reduzidos conforme envelhecem:
+# cada ciclo fica guardado por alguns dias, depois um ponto por hora e, por fim, um por dia.
+
+import os
+import time
+import logging
+from threading import Lock
+
+import numpy as np
+
+from app_state import get_application_path
+
+ANALYSIS_SERIES_PATH = os.path.join(get_application_path(), "analysis_series")
+
+COLUMNS = {
+    'ts': np.int64, 'symbol': np.int32,
+    'price': np.float64, 'change_24h': np.float32, 'volume_24h': np.float64, 'market_cap': np.float64,
+    'rsi': np.float32, 'bollinger_pct_b': np.float32, 'volume_zscore': np.float32,
+    'bollinger_signal': np.int8, 'macd_signal': np.int8, 'mme_cross': np.int8, 'hilo_signal': np.int8,
+}
+
+# Os sinais são gravados como códigos; o índice na tupla é o código
+SIGNAL_LABELS = {
+    'bollinger_signal': ("Nenhum", "Acima da Banda", "Abaixo da Banda"),
+    'macd_signal': ("Nenhum", "Cruzamento de Alta", "Cruzamento de Baixa", "N/A"),
+    'mme_cross': ("Nenhum", "Cruz Dourada", "Cruz da Morte", "N/A"),
+    'hilo_signal': ("Nenhum", "HiLo Buy", "HiLo Sell", "N/A"),
+}
+_SIGNAL_CODES = {column: {label: code for code, label in enumerate(labels)} for column, labels in SIGNAL_LABELS.items()}
+
+# (nome, resolução em segundos); a retenção de cada nível vem de configure()
+TIERS = (('raw', 0), ('1h', 3600), ('1d', 86400))
+COMPACT_INTERVAL = 3600
+
+def _float(value):
+    return np.nan if value in (None, "N/A") else float(value)
+
+class _Tier:
+    """Um nível de resolução: um arquivo .bin por coluna, com as linhas em ordem de tempo."""
+    def __init__(self, path, name, step):
+        self.path = os.path.join(path, name)
+        self.name = name
+        self.step = step
+        os.makedirs(self.path, exist_ok=True)
+        self._recover()
+        self.rows = self._row_count()
+
+    def file(self, column, suffix=""):
+        return os.path.join(self.path, f"{column}.bin{suffix}")
+
+    def _recover(self):
+        """
+        Conclui ou descarta uma compactação interrompida: o marcador só existe depois que
+        todos os .new foram gravados, então com ele os .new são aplicados e sem ele, apagados.
+        """
+        marker = os.path.join(self.path, "COMPACTING")
+        for column in COLUMNS:
+            if os.path.exists(self.file(column, ".new")):
+                if os.path.exists(marker): os.replace(self.file(column, ".new"), self.file(column))
+                else: os.remove(self.file(column, ".new"))
+        if os.path.exists(marker): os.remove(marker)
+
+    def _row_count(self):
+        """Linhas completas; descarta o final de colunas que ficaram maiores num fechamento inesperado."""
+        sizes = {column: os.path.getsize(self.file(column)) // np.dtype(dtype).itemsize if os.path.exists(self.file(column)) else 0
+                 for column, dtype in COLUMNS.items()}
+        rows = min(sizes.values())
+        for column, size in sizes.items():
+            if size > rows:
+                with open(self.file(column), 'r+b') as f:
+                    f.truncate(rows * np.dtype(COLUMNS[column]).itemsize)
+        return rows
+
+    def append(self, arrays):
+        for column, dtype in COLUMNS.items():
+            with open(self.file(column), 'ab') as f:
+                f.write(np.ascontiguousarray(arrays[column], dtype=dtype).tobytes())
+        self.rows += len(arrays['ts'])
+
+    def column(self, column):
+        """Coluna inteira mapeada em memória (somente leitura)."""
+        if not self.rows: return np.empty(0, dtype=COLUMNS[column])
+        return np.memmap(self.file(column), dtype=COLUMNS[column], mode='r', shape=(self.rows,))
+
+    def last_ts(self):
+        return int(self.column('ts')[-1]) if self.rows else None
+
+    def rewrite(self, start):
+        """Mantém só as linhas a partir de 'start', trocando os arquivos de uma vez no fim."""
+        for column in COLUMNS:
+            data = np.array(self.column(column)[start:])
+            with open(self.file(column, ".new"), 'wb') as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        marker = os.path.join(self.path, "COMPACTING")
+        open(marker, 'w').close()
+        for column in COLUMNS:
+            os.replace(self.file(column, ".new"), self.file(column))
+        os.remove(marker)
+        self.rows -= start
+
+def _downsample(arrays, step):
+    """Um ponto por (intervalo de 'step' segundos, símbolo): o último snapshot do intervalo."""
+    buckets = arrays['ts'] // step
+    keys = buckets * (int(arrays['symbol'].max()) + 1) + arrays['symbol']
+    # np.unique devolve a primeira ocorrência; invertido, é a última de cada chave
+    _, reversed_index = np.unique(keys[::-1], return_index=True)
+    index = len(keys) - 1 - reversed_index
+    result = {column: values[index] for column, values in arrays.items()}
+    result['ts'] = buckets[index] * step
+    return result
+
+class AnalysisSeriesStore:
+    """Armazena e consulta os snapshots de análise por símbolo. Abre os arquivos só no primeiro uso."""
+    def __init__(self, path=ANALYSIS_SERIES_PATH, raw_days=2, hourly_days=90):
+        self.path = path
+        self.retention = {'raw': raw_days * 86400, '1h': hourly_days * 86400, '1d': None}
+        self._lock = Lock()
+        self._tiers = None
+        self._symbols = {}
+        self._symbol_names = []
+        self._last_compaction = 0.0
+
+    def configure(self, config):
+        self.retention['raw'] = float(config.get('analysis_series_raw_days', 2)) * 86400
+        self.retention['1h'] = float(config.get('analysis_series_hourly_days', 90)) * 86400
+
+    def _open(self):
+        if self._tiers is not None: return
+        os.makedirs(self.path, exist_ok=True)
+        symbols_file = os.path.join(self.path, "symbols.txt")
+        if os.path.exists(symbols_file):
+            with open(symbols_file, 'r', encoding='utf-8') as f:
+                self._symbol_names = [line.strip() for line in f if line.strip()]
+        self._symbols = {symbol: i for i, symbol in enumerate(self._symbol_names)}
+        self._tiers = [_Tier(self.path, name, step) for name, step in TIERS]
+
+    def _symbol_id(self, symbol):
+        if symbol not in self._symbols:
+            # O símbolo é gravado antes das linhas que o usam
+            with open(os.path.join(self.path, "symbols.txt"), 'a', encoding='utf-8') as f:
+                f.write(symbol + "\n")
+            self._symbols[symbol] = len(self._symbol_names)
+            self._symbol_names.append(symbol)
+        return self._symbols[symbol]
+
+    def append(self, snapshots, ts=None):
+        """Grava os snapshots ('analysis_data') de um ciclo, todos com o mesmo horário."""
+        if not snapshots: return
+        with self._lock:
+            try:
+                self._open()
+                raw = self._tiers[0]
+                ts = int(ts if ts is not None else time.time())
+                # Mantém a coluna de tempo ordenada mesmo se o relógio voltar
+                if raw.rows: ts = max(ts, raw.last_ts())
+                arrays = {
+                    'ts': np.full(len(snapshots), ts, dtype=np.int64),
+                    'symbol': [self._symbol_id(s['symbol']) for s in snapshots],
+                    'price': [_float(s.get('current_price')) for s in snapshots],
+                    'change_24h': [_float(s.get('price_change_24h')) for s in snapshots],
+                    'volume_24h': [_float(s.get('volume_24h')) for s in snapshots],
+                    'market_cap': [_float(s.get('market_cap')) for s in snapshots],
+                    'rsi': [_float(s.get('rsi_value') or None) for s in snapshots],
+                    'bollinger_pct_b': [_float(s.get('bollinger_pct_b')) for s in snapshots],
+                    'volume_zscore': [_float(s.get('volume_zscore')) for s in snapshots],
+                }
+                for column, codes in _SIGNAL_CODES.items():
+                    arrays[column] = [codes.get(s.get(column), 0) for s in snapshots]
+                raw.append(arrays)
+                if time.time() - self._last_compaction >= COMPACT_INTERVAL:
+                    self._compact()
+            except OSError as e:
+                logging.error(f"Erro ao gravar a série de análises: {e}")
+
+    def _compact(self):
+        """Passa para o nível seguinte, já reduzidas, as linhas que saíram da retenção de cada nível."""
+        self._last_compaction = time.time()
+        for tier, next_tier in zip(self._tiers, self._tiers[1:]):
+            retention = self.retention[tier.name]
+            if retention is None or not tier.rows: continue
+            # Corte alinhado à resolução do próximo nível: só passam intervalos completos
+            cutoff = int(time.time() - retention) // next_tier.step * next_tier.step
+            end = int(np.searchsorted(tier.column('ts'), cutoff, side='left'))
+            if not end: continue
+            arrays = {column: np.array(tier.column(column)[:end]) for column in COLUMNS}
+            reduced = _downsample(arrays, next_tier.step)
+            # Se uma compactação anterior parou no meio, os intervalos já passados não se repetem
+            last = next_tier.last_ts()
+            if last is not None:
+                keep = reduced['ts'] > last
+                reduced = {column: values[keep] for column, values in reduced.items()}
+            if len(reduced['ts']): next_tier.append(reduced)
+            tier.rewrite(end)
+            logging.info(f"Série de análises: {end} linhas do nível '{tier.name}' reduzidas a {len(reduced['ts'])} no nível '{next_tier.name}'.")
+        last_tier = self._tiers[-1]
+        if self.retention[last_tier.name] is not None and last_tier.rows:
+            end = int(np.searchsorted(last_tier.column('ts'), time.time() - self.retention[last_tier.name]))
+            if end: last_tier.rewrite(end)
+
+    def series(self, symbol, start=None, end=None, columns=('price',)):
+        """
+        Valores de 'columns' do símbolo entre 'start' e 'end' (timestamps), do mais antigo
+        ao mais recente, juntando os níveis. Retorna um dict de arrays, sempre com 'ts'.
+        """
+        columns = ['ts', *(c for c in columns if c != 'ts')]
+        result = {column: [] for column in columns}
+        with self._lock:
+            try:
+                self._open()
+            except OSError as e:
+                logging.error(f"Erro ao abrir a série de análises: {e}")
+                return {column: np.empty(0, dtype=COLUMNS[column]) for column in columns}
+            symbol_id = self._symbols.get(symbol)
+            if symbol_id is not None:
+                # Os níveis cobrem períodos consecutivos: o mais grosso tem os dados mais antigos
+                for tier in reversed(self._tiers):
+                    if not tier.rows: continue
+                    ts = tier.column('ts')
+                    lo = int(np.searchsorted(ts, start, side='left')) if start is not None else 0
+                    hi = int(np.searchsorted(ts, end, side='right')) if end is not None else tier.rows
+                    if lo >= hi: continue
+                    index = lo + np.flatnonzero(tier.column('symbol')[lo:hi] == symbol_id)
+                    for column in columns:
+                        result[column].append(np.array(tier.column(column)[index]))
+        return {column: np.concatenate(parts) if parts else np.empty(0, dtype=COLUMNS[column]) for column, parts in result.items()}
+
+    def sparkline(self, symbol, seconds=86400, points=60, column='price'):
+        """Até 'points' valores de 'column' nos últimos 'seconds' segundos (o último de cada intervalo)."""
+        data = self.series(symbol, start=time.time() - seconds, columns=(column,))
+        values = data[column]
+        if len(values) <= points: return values.tolist()
+        edges = np.linspace(0, len(values), points + 1).astype(int)[1:] - 1
+        return values[edges].tolist()
+
+    def trend(self, symbol, seconds=86400, column='price'):
+        """Variação percentual e inclinação (por hora) de 'column' nos últimos 'seconds' segundos."""
+        data = self.series(symbol, start=time.time() - seconds, columns=(column,))
+        valid = ~np.isnan(data[column].astype(np.float64))
+        ts, values = data['ts'][valid], data[column][valid].astype(np.float64)
+        if len(values) < 2 or values[0] == 0: return None
+        slope = np.polyfit((ts - ts[0]) / 3600.0, values, 1)[0] if ts[-1] > ts[0] else 0.0
+        return {'change_pct': float((values[-1] / values[0] - 1) * 100), 'slope_per_hour': float(slope), 'points': len(values)}
+
+    @staticmethod
+    def signal_labels(column, codes):
+        """Converte os códigos gravados de uma coluna de sinal de volta para o texto."""
+        return np.asarray(SIGNAL_LABELS[column], dtype=object)[codes]
+
+    def symbols(self):
+        with self._lock:
+            self._open()
+            return list(self._symbol_names)
+
+analysis_series = AnalysisSeriesStore()
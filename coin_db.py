@@ -0,0 +1,215 @@
+# coin_db.py
+#
+# Banco local (SQLite) com a lista de moedas da CoinGecko: substitui o all_coins.json e o
+# coin_mapping.json. As consultas por id, símbolo e prefixo do nome vão direto aos índices,
+# sem carregar a lista inteira (~15 mil moedas) em dicts na inicialização. Cada lista que
+# muda algo vira uma nova geração; as linhas guardam de qual a qual geração valem, então
+# um snapshot publicado continua lendo a sua lista mesmo depois de uma atualização.
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from threading import RLock
+from collections import namedtuple
+
+from app_state import get_application_path
+
+COIN_DB_PATH = os.path.join(get_application_path(), "coins.db")
+LEGACY_COIN_LIST_PATH = os.path.join(get_application_path(), "all_coins.json")
+
+# Gerações que continuam consultáveis (a atual e as anteriores mais recentes)
+KEPT_GENERATIONS = 3
+
+# 'since'/'until': a linha vale nas gerações since <= g < until (until NULL = atual)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS coin_rows (
+    id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    since INTEGER NOT NULL,
+    until INTEGER,
+    PRIMARY KEY (id, since)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_coin_rows_symbol ON coin_rows (symbol, pos);
+CREATE INDEX IF NOT EXISTS idx_coin_rows_name ON coin_rows (name_lower);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+
+CoinListDiff = namedtuple('CoinListDiff', ['added', 'removed', 'changed'])
+
+def _visible(generation):
+    """Filtro das linhas de uma geração (None = a atual)."""
+    if generation is None: return "until IS NULL", ()
+    return "since <= ? AND (until IS NULL OR until > ?)", (generation, generation)
+
+class CoinDatabase:
+    """
+    Lista de moedas indexada por id, símbolo (maiúsculo) e nome (minúsculo). O arquivo só
+    é aberto (e criado) na primeira consulta, não ao importar o módulo. As consultas
+    aceitam 'generation' para ler uma das KEPT_GENERATIONS listas mais recentes.
+    """
+    def __init__(self, path=COIN_DB_PATH, legacy_path=LEGACY_COIN_LIST_PATH):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = RLock()
+        self._conn = None
+
+    def _connect(self):
+        """Conexão aberta no primeiro uso; na primeira abertura importa o antigo all_coins.json."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA)
+                self._migrate_unversioned()
+                if self.legacy_path and not self.count() and os.path.exists(self.legacy_path):
+                    self._import_legacy(self.legacy_path)
+            return self._conn
+
+    def _migrate_unversioned(self):
+        """Bancos anteriores às gerações: a tabela 'coins' vira a geração 1 de 'coin_rows'."""
+        if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coins'").fetchone(): return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("INSERT OR IGNORE INTO coin_rows (id, symbol, name, name_lower, pos, since) "
+                               "SELECT id, symbol, name, name_lower, pos, 1 FROM coins")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', '1')")
+            self._conn.execute("DROP TABLE coins")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _import_legacy(self, legacy_path):
+        """Importa uma única vez o antigo all_coins.json, mantendo a data do arquivo como data da lista."""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                coins = json.load(f)
+            self.apply_list(coins, updated_at=os.path.getmtime(legacy_path))
+            logging.info(f"{len(coins)} moedas importadas de all_coins.json para o banco de moedas.")
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Não foi possível importar all_coins.json: {e}")
+
+    def apply_list(self, coins, updated_at=None):
+        """
+        Atualiza o banco com a lista completa (resultado de get_coins_list), gravando só o
+        que mudou em uma única transação. Se algo mudou, as linhas novas formam a próxima
+        geração e as substituídas deixam de valer nela. Retorna o CoinListDiff.
+        """
+        rows = {coin['id']: (coin['symbol'].upper(), coin['name'], pos) for pos, coin in enumerate(coins)}
+        conn = self._connect()
+        with self._lock:
+            current = {row[0]: (row[1], row[2], row[3]) for row in conn.execute("SELECT id, symbol, name, pos FROM coin_rows WHERE until IS NULL")}
+            added = [coin_id for coin_id in rows if coin_id not in current]
+            removed = [coin_id for coin_id in current if coin_id not in rows]
+            changed = [coin_id for coin_id, row in rows.items() if coin_id in current and current[coin_id][:2] != row[:2]]
+            # Posições mudam em massa quando entra uma moeda no meio da lista: só regrava as diferentes
+            moved = [coin_id for coin_id, row in rows.items() if coin_id in current and current[coin_id] != row]
+            conn.execute("BEGIN")
+            try:
+                if added or removed or moved:
+                    generation = self.generation() + 1
+                    conn.executemany("UPDATE coin_rows SET until = ? WHERE id = ? AND until IS NULL",
+                                     [(generation, coin_id) for coin_id in removed + moved])
+                    conn.executemany("INSERT OR REPLACE INTO coin_rows (id, symbol, name, name_lower, pos, since) VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(coin_id, rows[coin_id][0], rows[coin_id][1], rows[coin_id][1].lower(), rows[coin_id][2], generation)
+                                      for coin_id in added + moved])
+                    conn.execute("DELETE FROM coin_rows WHERE until <= ?", (generation - KEPT_GENERATIONS + 1,))
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (str(generation),))
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated_at', ?)", (str(updated_at or time.time()),))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return CoinListDiff(tuple(added), tuple(removed), tuple(changed))
+
+    def _meta(self, key, default):
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def updated_at(self):
+        return float(self._meta('updated_at', 0.0))
+
+    def generation(self):
+        """Geração da lista atual (0 enquanto o banco estiver vazio)."""
+        return int(self._meta('generation', 0))
+
+    def is_fresh(self, max_age_seconds=86400):
+        """Indica se há uma lista com menos de 'max_age_seconds'."""
+        return self.count() > 0 and time.time() - self.updated_at() < max_age_seconds
+
+    def _scalar(self, sql, params=()):
+        with self._lock:
+            row = self._connect().execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def count(self, generation=None):
+        where, params = _visible(generation)
+        return self._scalar(f"SELECT COUNT(*) FROM coin_rows WHERE {where}", params)
+
+    def symbol_count(self, generation=None):
+        """Quantidade de símbolos distintos."""
+        where, params = _visible(generation)
+        return self._scalar(f"SELECT COUNT(DISTINCT symbol) FROM coin_rows WHERE {where}", params)
+
+    def symbols(self, generation=None):
+        """Símbolos distintos (maiúsculos), em ordem alfabética."""
+        where, params = _visible(generation)
+        with self._lock:
+            return [row[0] for row in self._connect().execute(f"SELECT DISTINCT symbol FROM coin_rows WHERE {where} ORDER BY symbol", params)]
+
+    def _fetch(self, condition, params=(), order="pos", limit=None, generation=None):
+        where, visible_params = _visible(generation)
+        sql = f"SELECT id, symbol, name FROM coin_rows WHERE {condition} AND {where} ORDER BY {order}"
+        params = (*params, *visible_params)
+        if limit is not None:
+            sql += " LIMIT ?"; params += (limit,)
+        with self._lock:
+            return [{'id': row[0], 'symbol': row[1].lower(), 'name': row[2]} for row in self._connect().execute(sql, params)]
+
+    def by_id(self, coin_id, generation=None):
+        rows = self._fetch("id = ?", (coin_id,), generation=generation)
+        return rows[0] if rows else None
+
+    def by_symbol(self, symbol, generation=None):
+        """Todas as moedas com o símbolo (há símbolos repetidos na CoinGecko)."""
+        return self._fetch("symbol = ?", (symbol.upper(),), generation=generation)
+
+    def name_for_symbol(self, symbol, generation=None):
+        """Nome da moeda para o símbolo; com símbolos repetidos vale a última da lista, como no antigo mapeamento."""
+        where, params = _visible(generation)
+        return self._scalar(f"SELECT name FROM coin_rows WHERE symbol = ? AND {where} ORDER BY pos DESC LIMIT 1", (symbol.upper(), *params))
+
+    def id_for_name(self, name, generation=None):
+        """Id da primeira moeda com esse nome (sem diferenciar maiúsculas)."""
+        where, params = _visible(generation)
+        return self._scalar(f"SELECT id FROM coin_rows WHERE name_lower = ? AND {where} ORDER BY pos LIMIT 1", (name.lower(), *params))
+
+    def search_prefix(self, prefix, limit=50, generation=None):
+        """Moedas cujo nome começa com 'prefix', em ordem alfabética."""
+        prefix = prefix.lower()
+        return self._fetch("name_lower >= ? AND name_lower < ?", (prefix, prefix + "\U0010ffff"), order="name_lower, pos",
+                           limit=limit, generation=generation)
+
+    def all_coins(self, generation=None):
+        """Lista completa, na ordem da CoinGecko (só para quem realmente precisa de tudo)."""
+        return self._fetch("1", generation=generation)
+
+    def display_list(self, generation=None):
+        """'Nome (SÍMBOLO)' de todas as moedas, ordenado pelo nome."""
+        where, params = _visible(generation)
+        with self._lock:
+            return [f"{name} ({symbol})" for name, symbol in self._connect().execute(f"SELECT name, symbol FROM coin_rows WHERE {where} ORDER BY name", params)]
+
+coin_db = CoinDatabase()
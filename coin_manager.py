@@ -1,55 +1,28 @@
-import os
-import json
-import time
 import logging
-from datetime import datetime, timedelta
-from pycoingecko import CoinGeckoAPI
-from core_components import get_application_path
+from coin_metadata import coin_metadata
 
 class CoinManager:
-    def __init__(self, update_interval_hours=24):
-        self.coin_list_path = os.path.join(get_application_path(), "all_coins.json")
-        self.update_interval = timedelta(hours=update_interval_hours)
-        self.cg = CoinGeckoAPI()
-        self.all_coins = self._load_or_fetch_coins()
+    """Thin facade over the shared coin metadata service (no downloads of its own)."""
+    def __init__(self, metadata=None):
+        self.metadata = metadata or coin_metadata
+        self.metadata.ensure_loaded()
+        logging.info(f"Coin list ready ({len(self.metadata.snapshot())} coins, version {self.metadata.snapshot().version}).")
 
-    def _fetch_coins_from_api(self):
-        """Fetches the complete list of coins from the CoinGecko API."""
-        logging.info("Fetching coin list from CoinGecko API...")
-        try:
-            coins = self.cg.get_coins_list()
-            with open(self.coin_list_path, 'w', encoding='utf-8') as f:
-                json.dump(coins, f, indent=2)
-            logging.info(f"Successfully fetched and saved {len(coins)} coins.")
-            return coins
-        except Exception as e:
-            logging.error(f"Failed to fetch coin list from CoinGecko: {e}")
-            return None
-
-    def _load_or_fetch_coins(self):
-        """Loads the coin list from the local cache or fetches it if outdated or non-existent."""
-        if os.path.exists(self.coin_list_path):
-            file_mod_time = datetime.fromtimestamp(os.path.getmtime(self.coin_list_path))
-            if datetime.now() - file_mod_time < self.update_interval:
-                logging.info("Loading coin list from local cache.")
-                with open(self.coin_list_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-
-        return self._fetch_coins_from_api()
+    @property
+    def all_coins(self):
+        return self.metadata.db.all_coins()
 
     def get_all_coins(self):
         """Returns the list of all coins."""
-        return self.all_coins
+        return self.metadata.db.all_coins()
 
     def get_coin_display_list(self):
-        """Returns a list of formatted strings for display (e.g., 'Bitcoin (BTC)')."""
-        if not self.all_coins:
-            return []
-
-        # Sort by name for user-friendly display
-        sorted_coins = sorted(self.all_coins, key=lambda x: x['name'])
+        """Returns a list of formatted strings for display (e.g., 'Bitcoin (BTC)'), sorted by name."""
+        return self.metadata.db.display_list()
 
-        return [f"{coin['name']} ({coin['symbol'].upper()})" for coin in sorted_coins]
+    def search_coins(self, prefix, limit=50):
+        """Returns coins whose name starts with the given prefix."""
+        return self.metadata.snapshot().search_prefix(prefix, limit)
 
     def get_symbol_from_display_name(self, display_name):
         """Extracts the symbol from the display name format."""
@@ -0,0 +1,169 @@
+# coin_metadata.py
+#
+# Serviço único de metadados das moedas da CoinGecko. Baixa a lista (get_coins_list) uma
+# vez, em segundo plano, a cada 24 horas, aplica só as diferenças no banco local (coin_db)
+# e publica um snapshot imutável e versionado (fixado numa geração do banco). Todos os
+# consumidores (CoinManager, mapeamento de nomes e busca de market cap) leem desse
+# snapshot em vez de baixar a lista.
+
+import copy
+import time
+import logging
+import threading
+from functools import lru_cache, partial
+from collections.abc import Mapping
+
+from pycoingecko import CoinGeckoAPI
+
+import robust_services
+from coin_db import coin_db
+
+class CoinSnapshot(Mapping):
+    """
+    Versão publicada da lista de moedas. Funciona como o antigo dict SÍMBOLO -> nome e
+    também responde id por nome, moedas por símbolo/id e busca por prefixo. Lê do banco
+    fixado na geração em que foi publicado (não muda com atualizações posteriores) e só
+    guarda as respostas já pedidas, num cache LRU limitado.
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(self, db, version, updated_at):
+        self._db = db
+        self.version = version
+        self.updated_at = updated_at
+        self._len = None
+        self._name_for_symbol = lru_cache(self.CACHE_SIZE)(partial(db.name_for_symbol, generation=version))
+        self._id_for_name = lru_cache(self.CACHE_SIZE)(partial(db.id_for_name, generation=version))
+
+    @classmethod
+    def from_db(cls, db):
+        """Snapshot da geração atual do banco."""
+        return cls(db, db.generation(), db.updated_at())
+
+    def restamped(self, updated_at):
+        """Mesma geração (e mesmo cache), com outra data de atualização (a lista baixada não mudou)."""
+        snapshot = copy.copy(self)
+        snapshot.updated_at = updated_at
+        return snapshot
+
+    def __getitem__(self, symbol):
+        name = self._name_for_symbol(symbol.upper())
+        if name is None:
+            raise KeyError(symbol)
+        return name
+
+    def __iter__(self):
+        return iter(self._db.symbols(self.version))
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self._db.symbol_count(self.version)
+        return self._len
+
+    def id_for_name(self, name):
+        """Id da CoinGecko para o nome da moeda (a primeira da lista, sem diferenciar maiúsculas)."""
+        return self._id_for_name(name.lower())
+
+    def by_id(self, coin_id):
+        return self._db.by_id(coin_id, self.version)
+
+    def by_symbol(self, symbol):
+        """Todas as moedas com o símbolo (há símbolos repetidos na CoinGecko)."""
+        return self._db.by_symbol(symbol, self.version)
+
+    def search_prefix(self, prefix, limit=50):
+        """Moedas cujo nome começa com 'prefix', em ordem alfabética."""
+        return self._db.search_prefix(prefix, limit, self.version)
+
+class LiveSymbolNames(Mapping):
+    """Mapeamento SÍMBOLO -> nome que sempre consulta o snapshot mais recente do serviço."""
+    def __init__(self, service):
+        self._service = service
+
+    def __getitem__(self, symbol):
+        return self._service.snapshot()[symbol]
+
+    def __iter__(self):
+        return iter(self._service.snapshot())
+
+    def __len__(self):
+        return len(self._service.snapshot())
+
+class CoinMetadataService:
+    """Atualização única (e em segundo plano) da lista de moedas, com publicação de snapshots."""
+    def __init__(self, db=coin_db, max_age_seconds=86400):
+        self.db = db
+        self.max_age = max_age_seconds
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.symbol_names = LiveSymbolNames(self)
+        self.last_diff = None
+
+    def snapshot(self):
+        """Snapshot publicado mais recente (o primeiro é criado no primeiro uso, não na importação)."""
+        if self._snapshot is None:
+            with self._refresh_lock:
+                if self._snapshot is None:
+                    self._snapshot = CoinSnapshot.from_db(self.db)
+        return self._snapshot
+
+    def refresh(self, force=False):
+        """
+        Baixa a lista e aplica as diferenças, se ela tiver mais de 'max_age' (ou se 'force').
+        Chamadas simultâneas esperam a mesma atualização em vez de baixar de novo.
+        """
+        with self._refresh_lock:
+            if not force and self.db.is_fresh(self.max_age):
+                return self._snapshot or CoinSnapshot.from_db(self.db)
+            logging.info("Buscando a lista de moedas da CoinGecko...")
+            robust_services.rate_limiter.wait_if_needed()
+            coins = CoinGeckoAPI().get_coins_list()
+            diff = self.db.apply_list(coins)
+            self.last_diff = diff
+            # Publica a nova geração mesmo quando só as posições mudaram: as antigas são descartadas aos poucos
+            if self._snapshot is None or self._snapshot.version != self.db.generation():
+                self._snapshot = CoinSnapshot.from_db(self.db)
+            else:
+                self._snapshot = self._snapshot.restamped(self.db.updated_at())
+            if diff.added or diff.removed or diff.changed:
+                logging.info(f"Lista de moedas atualizada (versão {self._snapshot.version}): "
+                             f"{len(diff.added)} novas, {len(diff.removed)} removidas, {len(diff.changed)} alteradas.")
+            else:
+                logging.info("Lista de moedas da CoinGecko sem alterações.")
+            return self._snapshot
+
+    def ensure_loaded(self):
+        """
+        Garante que há uma lista para consultar: só bloqueia se o banco estiver vazio; se
+        estiver apenas desatualizado, a atualização fica para a thread de segundo plano.
+        """
+        if not self.db.count():
+            try:
+                self.refresh(force=True)
+            except Exception as e:
+                logging.error(f"Não foi possível buscar a lista de moedas da CoinGecko: {e}")
+        self.start()
+        return self.snapshot()
+
+    def start(self):
+        """Inicia (uma vez) a thread que atualiza a lista quando ela passa de 'max_age'."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                wait = max(60.0, self.db.updated_at() + self.max_age - time.time())
+            except Exception as e:
+                logging.error(f"Erro ao atualizar a lista de moedas: {e}")
+                wait = 600.0
+            self._stop.wait(wait)
+
+    def stop(self):
+        self._stop.set()
+
+coin_metadata = CoinMetadataService()
@@ -0,0 +1,137 @@
+# config_store.py
+#
+# Snapshots imutáveis e versionados da configuração. A interface publica uma nova
+# versão (em save_config) e o serviço de monitoramento só relê/recompila o que depende
+# da configuração quando a versão muda, sem copiar nem compartilhar dicts mutáveis
+# entre threads.
+
+import os
+import json
+import time
+import shutil
+import logging
+from threading import Lock, Condition, Thread
+from types import MappingProxyType
+
+def freeze(value):
+    """Converte dicts e listas (recursivamente) em MappingProxyType e tuplas."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Inverso de freeze: snapshot imutável de volta para dicts e listas (ex.: para salvar em JSON)."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+class ConfigStore:
+    """Guarda a versão atual da configuração como um snapshot imutável."""
+    def __init__(self):
+        self._lock = Lock()
+        self._current = (0, MappingProxyType({}))
+
+    def publish(self, config):
+        """Publica uma nova versão da configuração. Retorna o número da versão."""
+        snapshot = freeze(config)
+        with self._lock:
+            version = self._current[0] + 1
+            self._current = (version, snapshot)
+        return version
+
+    def current(self):
+        """Retorna (versão, snapshot) da configuração publicada mais recente."""
+        return self._current
+
+    @property
+    def version(self):
+        return self._current[0]
+
+config_store = ConfigStore()
+
+def load_config_file(path, default=None):
+    """Lê o config.json; se estiver corrompido ou truncado, usa o backup mais recente que for válido."""
+    for candidate in [path] + [f"{path}.bak.{i}" for i in range(1, 10)]:
+        if not os.path.exists(candidate): continue
+        try:
+            with open(candidate, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Arquivo de configuração inválido '{candidate}': {e}")
+            continue
+        if candidate != path:
+            logging.warning(f"config.json inválido. Configuração restaurada de '{candidate}'.")
+        return config
+    return default
+
+class ConfigPersister:
+    """
+    Grava em disco os snapshots publicados no ConfigStore, fora da thread da interface.
+    Várias publicações seguidas viram uma gravação só (debounce); a escrita é atômica
+    (arquivo temporário + os.replace) e mantém até 'backup_count' backups rotativos,
+    com no máximo um backup novo a cada 'backup_interval' segundos.
+    """
+    def __init__(self, store, path, debounce=1.0, backup_count=3, backup_interval=600.0):
+        self.store = store
+        self.path = path
+        self.debounce = debounce
+        self.backup_count = backup_count
+        self.backup_interval = backup_interval
+        self._ready = Condition()
+        self._write_lock = Lock()
+        self._due = None
+        self._written_version = 0
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self):
+        """Agenda a gravação da versão atual para daqui a 'debounce' segundos."""
+        with self._ready:
+            self._due = time.monotonic() + self.debounce
+            self._ready.notify()
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while self._due is None or self._due > time.monotonic():
+                    self._ready.wait(None if self._due is None else self._due - time.monotonic())
+                self._due = None
+            self._write()
+
+    def flush(self):
+        """Grava imediatamente a versão atual, se ainda não foi gravada (ex.: ao fechar o programa)."""
+        with self._ready:
+            self._due = None
+        self._write()
+
+    def _rotate_backups(self):
+        if not self.backup_count or not os.path.exists(self.path): return
+        newest = f"{self.path}.bak.1"
+        if os.path.exists(newest) and time.time() - os.path.getmtime(newest) < self.backup_interval: return
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.bak.{i}"):
+                os.replace(f"{self.path}.bak.{i}", f"{self.path}.bak.{i + 1}")
+        shutil.copy2(self.path, newest)
+        os.utime(newest)
+
+    def _write(self):
+        with self._write_lock:
+            version, snapshot = self.store.current()
+            if version <= self._written_version: return
+            tmp_path = self.path + '.tmp'
+            try:
+                data = json.dumps(thaw(snapshot), indent=2)
+                self._rotate_backups()
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self._written_version = version
+                logging.info("Configurações salvas com sucesso.")
+            except Exception as e:
+                logging.error(f"Erro ao salvar configurações: {e}")
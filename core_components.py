@@ -2,11 +2,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
 import sys
+from datetime import datetime, timedelta
 try:
     import winsound
 except ImportError:
     winsound = None
 import ttkbootstrap as ttkb
+from price_levels import parse_price_levels
+from alert_history_store import AlertHistoryIndex
 
 TOOLTIP_DEFINITIONS = {
     "preco_baixo": "Alerta quando o preço da moeda cai e atinge o valor que você definiu.",
@@ -22,7 +25,9 @@ TOOLTIP_DEFINITIONS = {
     "fuga_capital_significativa": "Volume de negociação alto combinado com queda de preço. Sugere grande saída de capital.",
     "entrada_capital_significativa": "Volume de negociação alto combinado com alta de preço. Sugere grande entrada de capital.",
     "hilo_compra": "Sinal de compra do indicador HiLo. O preço cruzou acima da média móvel das máximas.",
-    "hilo_venda": "Sinal de venda do indicador HiLo. O preço cruzou abaixo da média móvel das mínimas."
+    "hilo_venda": "Sinal de venda do indicador HiLo. O preço cruzou abaixo da média móvel das mínimas.",
+    "volume_anormal": "Volume do último candle de 1h fechado muito acima do normal das últimas horas (z-score).",
+    "niveis_preco": "Alerta sempre que o preço cruza qualquer um dos níveis da lista, para cima ou para baixo (escadas e grids)."
 }
 
 ALERT_SUMMARIES = {
@@ -40,6 +45,9 @@ ALERT_SUMMARIES = {
     'CRUZ_DA_MORTE': "MME 50 cruzou abaixo da MME 200: Forte sinal de tendência de baixa.",
     # Padrão de Volume
     'VOLUME_ANORMAL': "Volume de negociação significativamente acima da média. Indica forte interesse ou evento.",
+    # Níveis de Preço
+    'NIVEL_PRECO_ACIMA': "Preço cruzou para cima um nível configurado: possível rompimento de resistência.",
+    'NIVEL_PRECO_ABAIXO': "Preço cruzou para baixo um nível configurado: possível perda de suporte.",
     # Padrão de Velas (Exemplo)
     'MARTELO_ALTA': "Padrão de vela 'Martelo': Pode indicar uma reversão de baixa para alta.",
     'ESTRELA_CADENTE_BAIXA': "Padrão de vela 'Estrela Cadente': Pode indicar uma reversão de alta para baixa."
@@ -247,7 +255,7 @@ class StartupConfigDialog(ttkb.Toplevel):
             if symbol in current_configs:
                 new_config_list.append(current_configs[symbol])
             else:
-                default_alert_config = {"notes": "", "sound": "sons/Alerta.mp3", "conditions": { "preco_baixo": {"enabled": False, "value": 0.0}, "preco_alto": {"enabled": False, "value": 0.0}, "rsi_sobrevendido": {"enabled": True, "value": 30.0}, "rsi_sobrecomprado": {"enabled": True, "value": 70.0}, "bollinger_abaixo": {"enabled": True}, "bollinger_acima": {"enabled": True}, "macd_cruz_baixa": {"enabled": True}, "macd_cruz_alta": {"enabled": True}, "mme_cruz_morte": {"enabled": True}, "mme_cruz_dourada": {"enabled": True}, "hilo_compra": {"enabled": True}, "hilo_venda": {"enabled": True}, "fuga_capital_significativa": {"enabled": False, "value": "0.5, -2.0"}, "entrada_capital_significativa": {"enabled": False, "value": "0.3, 1.0"} }, "triggered_conditions": []}
+                default_alert_config = {"notes": "", "sound": "sons/Alerta.mp3", "conditions": { "preco_baixo": {"enabled": False, "value": 0.0}, "preco_alto": {"enabled": False, "value": 0.0}, "rsi_sobrevendido": {"enabled": True, "value": 30.0}, "rsi_sobrecomprado": {"enabled": True, "value": 70.0}, "bollinger_abaixo": {"enabled": True}, "bollinger_acima": {"enabled": True}, "macd_cruz_baixa": {"enabled": True}, "macd_cruz_alta": {"enabled": True}, "mme_cruz_morte": {"enabled": True}, "mme_cruz_dourada": {"enabled": True}, "hilo_compra": {"enabled": True}, "hilo_venda": {"enabled": True}, "fuga_capital_significativa": {"enabled": False, "value": "0.5, -2.0"}, "entrada_capital_significativa": {"enabled": False, "value": "0.3, 1.0"}, "volume_anormal": {"enabled": False, "value": 3.0}, "niveis_preco": {"enabled": False, "value": ""} }, "triggered_conditions": []}
                 new_config_list.append({"symbol": symbol, "alert_config": default_alert_config})
         self.parent_app.config["cryptos_to_monitor"] = new_config_list
         self.parent_app.save_config()
@@ -389,12 +397,12 @@ class AlertConfigDialog(ttkb.Toplevel):
 
     def _get_default_config(self):
         """Retorna uma estrutura de configuração de alerta padrão."""
-        return {"notes": "", "sound": "sons/Alerta.mp3", "alert_cooldown_minutes": 60, "conditions": {"preco_baixo": {"enabled": False, "value": 0.0}, "preco_alto": {"enabled": False, "value": 0.0}, "rsi_sobrevendido": {"enabled": False, "value": 30.0}, "rsi_sobrecomprado": {"enabled": False, "value": 70.0}, "bollinger_abaixo": {"enabled": False}, "bollinger_acima": {"enabled": False}, "macd_cruz_baixa": {"enabled": False}, "macd_cruz_alta": {"enabled": False}, "mme_cruz_morte": {"enabled": False}, "mme_cruz_dourada": {"enabled": False}, "hilo_compra": {"enabled": False}, "hilo_venda": {"enabled": False}}, "triggered_conditions": {}}
+        return {"notes": "", "sound": "sons/Alerta.mp3", "alert_cooldown_minutes": 60, "conditions": {"preco_baixo": {"enabled": False, "value": 0.0}, "preco_alto": {"enabled": False, "value": 0.0}, "rsi_sobrevendido": {"enabled": False, "value": 30.0}, "rsi_sobrecomprado": {"enabled": False, "value": 70.0}, "bollinger_abaixo": {"enabled": False}, "bollinger_acima": {"enabled": False}, "macd_cruz_baixa": {"enabled": False}, "macd_cruz_alta": {"enabled": False}, "mme_cruz_morte": {"enabled": False}, "mme_cruz_dourada": {"enabled": False}, "hilo_compra": {"enabled": False}, "hilo_venda": {"enabled": False}, "volume_anormal": {"enabled": False, "value": 3.0}, "niveis_preco": {"enabled": False, "value": ""}}, "triggered_conditions": {}}
 
     def _create_condition_widgets(self, parent_frame):
         """Cria e organiza os widgets para cada condição de alerta."""
-        icons = {'preco_baixo': '⬇️', 'preco_alto': '⬆️', 'rsi_sobrevendido': '🟢', 'rsi_sobrecomprado': '🔴', 'bollinger_abaixo': '↘️', 'bollinger_acima': '↗️', 'macd_cruz_baixa': '📉', 'macd_cruz_alta': '📈', 'mme_cruz_morte': '☠️', 'mme_cruz_dourada': '🌟', 'fuga_capital_significativa': '💸', 'entrada_capital_significativa': '💰', 'hilo_compra': '🟢', 'hilo_venda': '🔴'}
-        condition_definitions = {'preco_baixo': {'text': 'Preço Abaixo de ($)', 'has_value': True, 'default': 0.0, 'icon': icons['preco_baixo'], 'category': 'price'}, 'preco_alto': {'text': 'Preço Acima de ($)', 'has_value': True, 'default': 0.0, 'icon': icons['preco_alto'], 'category': 'price'}, 'rsi_sobrevendido': {'text': 'RSI Sobrevendido (<=)', 'has_value': True, 'default': 30.0, 'icon': icons['rsi_sobrevendido'], 'category': 'indicator'}, 'rsi_sobrecomprado': {'text': 'RSI Sobrecomprado (>=)', 'has_value': True, 'default': 70.0, 'icon': icons['rsi_sobrecomprado'], 'category': 'indicator'}, 'bollinger_abaixo': {'text': 'Abaixo da Banda Inferior', 'has_value': False, 'icon': icons['bollinger_abaixo'], 'category': 'indicator'}, 'bollinger_acima': {'text': 'Acima da Banda Superior', 'has_value': False, 'icon': icons['bollinger_acima'], 'category': 'indicator'}, 'macd_cruz_baixa': {'text': 'MACD: Cruzamento de Baixa', 'has_value': False, 'icon': icons['macd_cruz_baixa'], 'category': 'indicator'}, 'macd_cruz_alta': {'text': 'MACD: Cruzamento de Alta', 'has_value': False, 'icon': icons['macd_cruz_alta'], 'category': 'indicator'}, 'mme_cruz_morte': {'text': 'MME: Cruz da Morte (50/200)', 'has_value': False, 'icon': icons['mme_cruz_morte'], 'category': 'indicator'}, 'mme_cruz_dourada': {'text': 'MME: Cruz Dourada (50/200)', 'has_value': False, 'icon': icons['mme_cruz_dourada'], 'category': 'indicator'}, 'hilo_compra': {'text': 'HiLo: Sinal de Compra', 'has_value': False, 'icon': icons['hilo_compra'], 'category': 'indicator'}, 'hilo_venda': {'text': 'HiLo: Sinal de Venda', 'has_value': False, 'icon': icons['hilo_venda'], 'category': 'indicator'}, 'fuga_capital_significativa': {'text': 'Fuga de Capital (Vol %, Var %)', 'has_value': True, 'default': "0.5, -2.0", 'icon': icons['fuga_capital_significativa'], 'category': 'volume', 'info_tooltip': 'Ex: "0.5, -2.0" para 0.5% do Cap.Merc. e variação menor que -2%.'}, 'entrada_capital_significativa': {'text': 'Entrada de Capital (Vol %, Var %)', 'has_value': True, 'default': "0.3, 1.0", 'icon': icons['entrada_capital_significativa'], 'category': 'volume', 'info_tooltip': 'Ex: "0.3, 1.0" para 0.3% do Cap.Merc. e variação maior que 1%.'}}
+        icons = {'preco_baixo': '⬇️', 'preco_alto': '⬆️', 'rsi_sobrevendido': '🟢', 'rsi_sobrecomprado': '🔴', 'bollinger_abaixo': '↘️', 'bollinger_acima': '↗️', 'macd_cruz_baixa': '📉', 'macd_cruz_alta': '📈', 'mme_cruz_morte': '☠️', 'mme_cruz_dourada': '🌟', 'fuga_capital_significativa': '💸', 'entrada_capital_significativa': '💰', 'hilo_compra': '🟢', 'hilo_venda': '🔴', 'volume_anormal': '📊', 'niveis_preco': '🪜'}
+        condition_definitions = {'preco_baixo': {'text': 'Preço Abaixo de ($)', 'has_value': True, 'default': 0.0, 'icon': icons['preco_baixo'], 'category': 'price'}, 'preco_alto': {'text': 'Preço Acima de ($)', 'has_value': True, 'default': 0.0, 'icon': icons['preco_alto'], 'category': 'price'}, 'niveis_preco': {'text': 'Níveis de Preço ($, lista)', 'has_value': True, 'default': "", 'icon': icons['niveis_preco'], 'category': 'price', 'info_tooltip': 'Ex: "95000, 97500, 100000" (separados por vírgula, ponto e vírgula ou espaço).'}, 'rsi_sobrevendido': {'text': 'RSI Sobrevendido (<=)', 'has_value': True, 'default': 30.0, 'icon': icons['rsi_sobrevendido'], 'category': 'indicator'}, 'rsi_sobrecomprado': {'text': 'RSI Sobrecomprado (>=)', 'has_value': True, 'default': 70.0, 'icon': icons['rsi_sobrecomprado'], 'category': 'indicator'}, 'bollinger_abaixo': {'text': 'Abaixo da Banda Inferior', 'has_value': False, 'icon': icons['bollinger_abaixo'], 'category': 'indicator'}, 'bollinger_acima': {'text': 'Acima da Banda Superior', 'has_value': False, 'icon': icons['bollinger_acima'], 'category': 'indicator'}, 'macd_cruz_baixa': {'text': 'MACD: Cruzamento de Baixa', 'has_value': False, 'icon': icons['macd_cruz_baixa'], 'category': 'indicator'}, 'macd_cruz_alta': {'text': 'MACD: Cruzamento de Alta', 'has_value': False, 'icon': icons['macd_cruz_alta'], 'category': 'indicator'}, 'mme_cruz_morte': {'text': 'MME: Cruz da Morte (50/200)', 'has_value': False, 'icon': icons['mme_cruz_morte'], 'category': 'indicator'}, 'mme_cruz_dourada': {'text': 'MME: Cruz Dourada (50/200)', 'has_value': False, 'icon': icons['mme_cruz_dourada'], 'category': 'indicator'}, 'hilo_compra': {'text': 'HiLo: Sinal de Compra', 'has_value': False, 'icon': icons['hilo_compra'], 'category': 'indicator'}, 'hilo_venda': {'text': 'HiLo: Sinal de Venda', 'has_value': False, 'icon': icons['hilo_venda'], 'category': 'indicator'}, 'fuga_capital_significativa': {'text': 'Fuga de Capital (Vol %, Var %)', 'has_value': True, 'default': "0.5, -2.0", 'icon': icons['fuga_capital_significativa'], 'category': 'volume', 'info_tooltip': 'Ex: "0.5, -2.0" para 0.5% do Cap.Merc. e variação menor que -2%.'}, 'entrada_capital_significativa': {'text': 'Entrada de Capital (Vol %, Var %)', 'has_value': True, 'default': "0.3, 1.0", 'icon': icons['entrada_capital_significativa'], 'category': 'volume', 'info_tooltip': 'Ex: "0.3, 1.0" para 0.3% do Cap.Merc. e variação maior que 1%.'}, 'volume_anormal': {'text': 'Volume Anormal (z-score >=)', 'has_value': True, 'default': 3.0, 'icon': icons['volume_anormal'], 'category': 'volume', 'info_tooltip': 'Ex: 3.0 para volume 3 desvios acima da média das últimas horas.'}}
         categories = {'price': {'title': 'Alertas de Preço', 'color': 'info', 'icon': '💲'}, 'indicator': {'title': 'Alertas de Indicadores Técnicos', 'color': 'warning', 'icon': '📊'}, 'volume': {'title': 'Alertas de Volume e Capital', 'color': 'success', 'icon': '📈'}}
 
         categorized_conditions = {}
@@ -423,7 +431,7 @@ class AlertConfigDialog(ttkb.Toplevel):
                     if details['has_value']:
                         default_value = str(details.get('default', 0.0))
                         current_value = current_cond_config.get('value', default_value)
-                        value_var = tk.StringVar(value=current_value) if key in ['fuga_capital_significativa', 'entrada_capital_significativa'] else tk.DoubleVar(value=float(current_value))
+                        value_var = tk.StringVar(value=current_value) if key in ['fuga_capital_significativa', 'entrada_capital_significativa', 'niveis_preco'] else tk.DoubleVar(value=float(current_value))
                     
                     self.vars[key] = {'enabled': enabled_var, 'value': value_var}
                     
@@ -437,7 +445,7 @@ class AlertConfigDialog(ttkb.Toplevel):
                     cb.bind("<Leave>", lambda e, tt=tooltip: tt.hide_tooltip())
                     
                     if details['has_value']:
-                        entry = ttkb.Entry(condition_frame, textvariable=value_var, width=15, font=("Segoe UI", 10), bootstyle="dark")
+                        entry = ttkb.Entry(condition_frame, textvariable=value_var, width=30 if key == 'niveis_preco' else 15, font=("Segoe UI", 10), bootstyle="dark")
                         entry.pack(side="right", padx=5)
                         cb.config(command=lambda e=entry, v=enabled_var: e.config(state='normal' if v.get() else 'disabled'))
                         entry.config(state='normal' if enabled_var.get() else 'disabled')
@@ -476,14 +484,22 @@ class AlertConfigDialog(ttkb.Toplevel):
             if var_dict['value'] is not None:
                 try:
                     value = var_dict['value'].get()
-                    if key in ['preco_baixo', 'preco_alto', 'rsi_sobrevendido', 'rsi_sobrecomprado']:
+                    if key in ['preco_baixo', 'preco_alto', 'rsi_sobrevendido', 'rsi_sobrecomprado', 'volume_anormal']:
                         value = float(value)
-                        if is_enabled and value <= 0 and key in ['preco_baixo', 'preco_alto']:
+                        if is_enabled and value <= 0 and key in ['preco_baixo', 'preco_alto', 'volume_anormal']:
                              messagebox.showerror("Erro de Validação", f"O valor para '{key.replace('_',' ').title()}' deve ser maior que zero.", parent=self); return
                     elif key in ['fuga_capital_significativa', 'entrada_capital_significativa']:
                         parts = str(value).split(',')
                         if len(parts) != 2 or not all(self._is_float(p.strip()) for p in parts):
                             messagebox.showerror("Erro de Validação", f"Formato inválido para '{key.replace('_',' ').title()}'. Use 'num,num'.", parent=self); return
+                    elif key == 'niveis_preco':
+                        try:
+                            levels = parse_price_levels(value)
+                        except ValueError:
+                            messagebox.showerror("Erro de Validação", "Níveis de preço inválidos. Use números maiores que zero separados por vírgula.", parent=self); return
+                        if is_enabled and not levels:
+                            messagebox.showerror("Erro de Validação", "Informe ao menos um nível de preço.", parent=self); return
+                        value = ", ".join(f"{level:g}" for level in levels)
                     condition_data["value"] = value
                 except (tk.TclError, ValueError):
                     messagebox.showerror("Erro de Validação", f"Por favor, insira um número válido para '{key.replace('_',' ').title()}'.", parent=self); return
@@ -871,7 +887,9 @@ class ManageSymbolsDialog(ttkb.Toplevel):
                 "hilo_compra": {"enabled": True},
                 "hilo_venda": {"enabled": True},
                 "fuga_capital_significativa": {"enabled": False, "value": "0.5, -2.0"},
-                "entrada_capital_significativa": {"enabled": False, "value": "0.3, 1.0"}
+                "entrada_capital_significativa": {"enabled": False, "value": "0.3, 1.0"},
+                "volume_anormal": {"enabled": False, "value": 3.0},
+                "niveis_preco": {"enabled": False, "value": ""}
             },
             "triggered_conditions": {}
         }
@@ -934,10 +952,11 @@ class AlertHistoryWindow(ttkb.Toplevel):
         self.tree.heading('symbol', text='Símbolo'); self.tree.column('symbol', width=120, anchor='w')
         self.tree.heading('trigger', text='Gatilho do Alerta'); self.tree.column('trigger', width=450, anchor='w')
         
-        vsb = ttkb.Scrollbar(tree_container, orient="vertical", command=self.tree.yview, bootstyle="round-dark")
-        self.tree.configure(yscrollcommand=vsb.set)
+        # Tabela virtualizada: a Treeview só tem as linhas visíveis e a barra de rolagem
+        # representa o total de alertas do filtro; as linhas vêm do banco por páginas
+        self.vsb = ttkb.Scrollbar(tree_container, orient="vertical", command=self._on_scrollbar, bootstyle="round-dark")
         self.tree.pack(side='left', expand=True, fill='both')
-        vsb.pack(side='right', fill='y')
+        self.vsb.pack(side='right', fill='y')
         
         self.details_frame = ttkb.LabelFrame(main_container, text="Detalhes do Alerta", padding=15, height=150, bootstyle="dark")
         self.details_frame.pack(fill='x')
@@ -959,11 +978,25 @@ class AlertHistoryWindow(ttkb.Toplevel):
         self.status_label = ttkb.Label(status_bar, text="", font=("Segoe UI", 10), bootstyle="secondary")
         self.status_label.pack(side="left")
 
-        self.tree.bind("<<TreeviewSelect>>", self._on_selection)
+        self.tree.tag_configure('alert', background="#1e1e2d")
+        self._filter_job = None
+        self._filter = None
+        self._first_row = 0
+        self._visible_rows = 15
+        self._visible_records = []
+        self._selected_id = None
+        self._selected_row = None
+        self._page_cache = {}
+        self._store_version = None
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", self._on_tree_resize)
+        self.tree.bind("<Next>", lambda e: self._scroll_rows(self._visible_rows))
+        self.tree.bind("<Prior>", lambda e: self._scroll_rows(-self._visible_rows))
         self.search_var.trace_add("write", self._filter_history)
         self.period_var.trace_add("write", self._filter_history)
         self.bind_all("<MouseWheel>", self._on_mousewheel)
         self._load_history()
+        self.after(self.WATCH_INTERVAL_MS, self._watch_history)
         self.parent_app.center_toplevel_on_main(self)
 
     def _add_placeholder(self, event=None):
@@ -978,80 +1011,164 @@ class AlertHistoryWindow(ttkb.Toplevel):
 
     def _on_mousewheel(self, event):
         """Permite a rolagem da lista de histórico com o scroll do mouse."""
-        if event.num == 5 or event.delta == -120:
-            self.tree.yview_scroll(1, "units")
-        elif event.num == 4 or event.delta == 120:
-            self.tree.yview_scroll(-1, "units")
+        if event.num == 5 or event.delta < 0:
+            self._scroll_rows(3)
+        elif event.num == 4 or event.delta > 0:
+            self._scroll_rows(-3)
+
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 20
+    FILTER_DEBOUNCE_MS = 150
+    WATCH_INTERVAL_MS = 1000
+
+    @staticmethod
+    def _trigger_icon(trigger):
+        trigger = trigger.lower()
+        return "💲" if 'preço' in trigger else "📊" if 'rsi' in trigger else "📈" if 'bollinger' in trigger else "📉" if 'macd' in trigger else "✖️" if 'cruz' in trigger else "💰" if 'capital' in trigger else "⚠️"
 
     def _load_history(self):
-        """Carrega e exibe o histórico de alertas na tabela."""
-        for item in self.tree.get_children(): self.tree.delete(item)
-        self.history_data = self.parent_app.alert_history
-        for i, record in enumerate(self.history_data):
-            try:
-                dt = datetime.fromisoformat(record.get('timestamp', ''))
-                formatted_time = dt.strftime("%d/%m/%Y %H:%M:%S")
-            except:
-                formatted_time = record.get('timestamp', 'N/A')
-            trigger = record.get('trigger', 'N/A')
-            trigger_icon = "💲" if 'preço' in trigger.lower() else "📊" if 'rsi' in trigger.lower() else "📈" if 'bollinger' in trigger.lower() else "📉" if 'macd' in trigger.lower() else "✖️" if 'cruz' in trigger.lower() else "💰" if 'capital' in trigger.lower() else "⚠️"
-            self.tree.insert('', tk.END, iid=i, values=(formatted_time, record.get('symbol', 'N/A'), f"{trigger_icon} {trigger}"), tags=('alert',))
-        self.tree.tag_configure('alert', background="#1e1e2d")
-        self.status_label.config(text=f"{len(self.history_data)} alertas encontrados")
+        """Recarrega o índice (contagens agregadas) do histórico e reaplica os filtros atuais."""
+        self._store_version = self.parent_app.alert_history.version
+        self.history_data = AlertHistoryIndex(self.parent_app.alert_history.aggregates())
+        self._apply_filter()
         self._on_selection()
 
-    def _filter_history(self, *args):
-        """Filtra o histórico exibido com base nos critérios de busca e período."""
-        for item in self.tree.get_children(): self.tree.delete(item)
-        search_term = self.search_var.get().lower()
-        if search_term == self.placeholder_text.lower():
-            search_term = ""
-
+    def _refresh_index(self):
+        """Recalcula índice, filtro e total após mudanças no histórico, sem voltar ao topo da tabela."""
+        self._store_version = self.parent_app.alert_history.version
+        self.history_data = AlertHistoryIndex(self.parent_app.alert_history.aggregates())
+        if self._filter:
+            self._filter = self.history_data.search(self._get_search_term(), self._get_filter_start())
+            self.status_label.config(text=f"{self._filter.count} alertas encontrados")
+        self._page_cache = {}
+
+    def _watch_history(self):
+        """Mostra os alertas novos enquanto a janela está aberta (as páginas em cache ficam obsoletas)."""
+        if not self.winfo_exists(): return
+        if self.parent_app.alert_history.version != self._store_version: self._render_rows()
+        self.after(self.WATCH_INTERVAL_MS, self._watch_history)
+
+    def _get_search_term(self):
+        """Texto da busca (vazio enquanto o campo mostra o placeholder)."""
+        search_term = self.search_var.get()
+        return "" if search_term.strip().lower() == self.placeholder_text.lower() else search_term
+
+    def _get_filter_start(self):
+        """Primeiro dia do período selecionado, ou None para todos."""
         period = self.period_var.get()
-        
-        from datetime import datetime, timedelta
-        filtered_data = self.history_data
-        if period != "Todos":
-            cutoff = datetime.now().date()
-            if period == "7 dias": cutoff -= timedelta(days=7)
-            elif period == "30 dias": cutoff -= timedelta(days=30)
-            filtered_data = [r for r in self.history_data if self._get_date_from_record(r) >= cutoff]
-            
-        if search_term:
-            filtered_data = [r for r in filtered_data if search_term in r.get('symbol','').lower() or search_term in r.get('trigger','').lower()]
-            
-        for i, record in enumerate(filtered_data):
-            try:
-                dt = datetime.fromisoformat(record.get('timestamp', ''))
-                formatted_time = dt.strftime("%d/%m/%Y %H:%M:%S")
-            except (ValueError, TypeError):
-                formatted_time = record.get('timestamp', 'N/A')
-
-            trigger = record.get('trigger', 'N/A')
-            trigger_icon = "💲" if 'preço' in trigger.lower() else "📊" if 'rsi' in trigger.lower() else "📈" if 'bollinger' in trigger.lower() else "📉" if 'macd' in trigger.lower() else "✖️" if 'cruz' in trigger.lower() else "💰" if 'capital' in trigger.lower() else "⚠️"
-
-            # Usar um iid único para cada item na visualização filtrada
-            self.tree.insert('', tk.END, iid=f"item_{i}", values=(formatted_time, record.get('symbol', 'N/A'), f"{trigger_icon} {trigger}"), tags=('alert',))
-            
-        self.status_label.config(text=f"{len(self.tree.get_children())} alertas encontrados")
-            
-    def _get_date_from_record(self, record):
-        """Extrai um objeto de data de um registro de alerta para filtragem."""
-        try: return datetime.fromisoformat(record.get('timestamp', '')).date()
-        except: return datetime(1970, 1, 1).date()
+        if period not in ("Hoje", "7 dias", "30 dias"): return None
+        cutoff = datetime.now().date()
+        if period == "7 dias": cutoff -= timedelta(days=7)
+        elif period == "30 dias": cutoff -= timedelta(days=30)
+        return cutoff
+
+    def _filter_history(self, *args):
+        """Agenda a filtragem para depois que o usuário parar de digitar (debounce)."""
+        if self._filter_job: self.after_cancel(self._filter_job)
+        self._filter_job = self.after(self.FILTER_DEBOUNCE_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        """Resolve o filtro pelo índice (total pelas contagens) e volta ao topo da tabela."""
+        self._filter_job = None
+        self._filter = self.history_data.search(self._get_search_term(), self._get_filter_start())
+        self._page_cache = {}
+        self._first_row = 0
+        self._render_rows()
+        self.status_label.config(text=f"{self._filter.count} alertas encontrados")
+
+    def _get_rows(self, first, count):
+        """Linhas [first, first + count) do filtro atual, buscadas no banco página a página."""
+        rows = []
+        store = self.parent_app.alert_history
+        for page_no in range(first // self.PAGE_SIZE, (first + count - 1) // self.PAGE_SIZE + 1):
+            if page_no not in self._page_cache:
+                if len(self._page_cache) >= self.MAX_CACHED_PAGES: self._page_cache.clear()
+                f = self._filter
+                # Continua da última linha da página anterior (se estiver em cache) ou salta
+                # direto para o dia da primeira linha pelos totais por dia
+                previous = self._page_cache.get(page_no - 1)
+                if previous: before, skip = (previous[-1][5], previous[-1][0]), 0
+                else: before, skip = AlertHistoryIndex.seek(f, page_no * self.PAGE_SIZE)
+                self._page_cache[page_no] = store.page(f.start, f.symbols, f.triggers, self.PAGE_SIZE, before, skip)
+            rows.extend(self._page_cache[page_no])
+        offset = first - (first // self.PAGE_SIZE) * self.PAGE_SIZE
+        return rows[offset:offset + count]
+
+    def _render_rows(self):
+        """Mostra na Treeview só as linhas visíveis, reaproveitando os itens existentes."""
+        if self._filter and self.parent_app.alert_history.version != self._store_version: self._refresh_index()
+        total = self._filter.count if self._filter else 0
+        self._first_row = max(0, min(self._first_row, total - self._visible_rows))
+        records = self._get_rows(self._first_row, self._visible_rows) if total else []
+        self._visible_records = records
+
+        items = self.tree.get_children()
+        if len(items) > len(records): self.tree.delete(*items[len(records):])
+        for index, record in enumerate(records):
+            try: formatted_time = datetime.fromisoformat(record[1]).strftime("%d/%m/%Y %H:%M:%S")
+            except (ValueError, TypeError): formatted_time = record[1] or 'N/A'
+            values = (formatted_time, record[2], f"{self._trigger_icon(record[3])} {record[3]}")
+            if index < len(items): self.tree.item(items[index], values=values)
+            else: self.tree.insert('', tk.END, iid=f"row{index}", values=values, tags=('alert',))
+
+        # Mantém selecionado o mesmo alerta enquanto ele estiver visível
+        selected = [f"row{index}" for index, record in enumerate(records) if record[0] == self._selected_id]
+        if tuple(selected) != self.tree.selection(): self.tree.selection_set(selected)
+
+        if total: self.vsb.set(self._first_row / total, min(1.0, (self._first_row + len(records)) / total))
+        else: self.vsb.set(0.0, 1.0)
+
+    def _scroll_rows(self, delta):
+        self._first_row += delta
+        self._render_rows()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        """Comando da barra de rolagem ('moveto' fração / 'scroll' n units|pages)."""
+        if action == 'moveto':
+            self._first_row = int(float(value) * (self._filter.count if self._filter else 0))
+            self._render_rows()
+        elif action == 'scroll':
+            self._scroll_rows(int(value) * (self._visible_rows if unit == 'pages' else 1))
+
+    def _on_tree_resize(self, event):
+        """Ajusta a quantidade de linhas visíveis à altura da tabela."""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        visible_rows = max(1, (event.height - 25) // row_height)
+        if visible_rows != self._visible_rows:
+            self._visible_rows = visible_rows
+            if self._filter: self._render_rows()
+
+    def _selected_record(self):
+        """Registro (id, timestamp, symbol, trigger, has_data) da linha selecionada."""
+        selected_item = self.tree.selection()
+        if not selected_item: return None
+        index = int(selected_item[0][3:])
+        return self._visible_records[index] if index < len(self._visible_records) else None
+
+    def _on_tree_select(self, event=None):
+        """Guarda o alerta selecionado; a seleção some da Treeview quando ele sai da área visível."""
+        record = self._selected_record()
+        if record:
+            if record[0] == self._selected_id: return
+            self._selected_id, self._selected_row = record[0], record
+        elif self._selected_id is None or not any(r[0] == self._selected_id for r in self._visible_records):
+            return
+        else:
+            self._selected_id = self._selected_row = None
+        self._on_selection()
 
     def _on_selection(self, event=None):
         """Exibe detalhes resumidos de um alerta quando ele é selecionado na tabela."""
-        selected_item = self.tree.selection()
+        record = self._selected_row
         for widget in self.details_frame.winfo_children(): widget.destroy()
         
-        if not selected_item:
+        if not record:
             self.analyze_btn['state'] = 'disabled'
             ttkb.Label(self.details_frame, text="Selecione um alerta para ver os detalhes", font=("Segoe UI", 11), bootstyle="secondary").pack(pady=40)
             return
             
         self.analyze_btn['state'] = 'normal'
-        record = self.history_data[int(selected_item[0])]
+        alert_id, timestamp, symbol, trigger, has_data = record
         
         details_content = ttkb.Frame(self.details_frame, bootstyle="dark")
         details_content.pack(fill="both", expand=True)
@@ -1059,19 +1176,18 @@ class AlertHistoryWindow(ttkb.Toplevel):
         left_col.pack(side="left", fill="both", expand=True, padx=(0, 10))
         right_col.pack(side="left", fill="both", expand=True)
         
-        try: dt = datetime.fromisoformat(record.get('timestamp', '')); formatted_time = dt.strftime("%d/%m/%Y %H:%M:%S")
-        except: formatted_time = record.get('timestamp', 'N/A')
+        try: dt = datetime.fromisoformat(timestamp); formatted_time = dt.strftime("%d/%m/%Y %H:%M:%S")
+        except (ValueError, TypeError): formatted_time = timestamp or 'N/A'
             
         ttkb.Label(left_col, text="Símbolo:", font=("Segoe UI", 10, "bold"), bootstyle="secondary").grid(row=0, column=0, sticky="w", pady=3)
-        ttkb.Label(left_col, text=record.get('symbol', 'N/A'), font=("Segoe UI", 10, "bold"), bootstyle="info").grid(row=0, column=1, sticky="w", pady=3, padx=5)
+        ttkb.Label(left_col, text=symbol or 'N/A', font=("Segoe UI", 10, "bold"), bootstyle="info").grid(row=0, column=1, sticky="w", pady=3, padx=5)
         ttkb.Label(left_col, text="Gatilho:", font=("Segoe UI", 10, "bold"), bootstyle="secondary").grid(row=1, column=0, sticky="w", pady=3)
-        trigger_label = ttkb.Label(left_col, text=record.get('trigger', 'N/A'), font=("Segoe UI", 10), bootstyle="light", wraplength=400)
+        trigger_label = ttkb.Label(left_col, text=trigger or 'N/A', font=("Segoe UI", 10), bootstyle="light", wraplength=400)
         trigger_label.grid(row=1, column=1, sticky="w", pady=3, padx=5)
 
         ttkb.Label(right_col, text="Data/Hora:", font=("Segoe UI", 10, "bold"), bootstyle="secondary").grid(row=0, column=0, sticky="w", pady=3)
         ttkb.Label(right_col, text=formatted_time, font=("Segoe UI", 10), bootstyle="light").grid(row=0, column=1, sticky="w", pady=3, padx=5)
 
-        has_data = 'data' in record and record['data']
         ttkb.Label(right_col, text="Dados de análise:", font=("Segoe UI", 10, "bold"), bootstyle="secondary").grid(row=1, column=0, sticky="w", pady=3)
         ttkb.Label(right_col, text="Disponíveis" if has_data else "Não disponíveis", font=("Segoe UI", 10), bootstyle="success" if has_data else "danger").grid(row=1, column=1, sticky="w", pady=3, padx=5)
 
@@ -1079,16 +1195,16 @@ class AlertHistoryWindow(ttkb.Toplevel):
 
     def _open_analysis(self):
         """Abre uma janela com a análise detalhada do alerta selecionado."""
-        if not (selected_item := self.tree.selection()): return
-        record = self.history_data[int(selected_item[0])]
-        if 'data' in record and record['data']: AlertAnalysisWindow(self, record['data'])
+        if self._selected_id is None: return
+        data = self.parent_app.alert_history.get_data(self._selected_id)
+        if data: AlertAnalysisWindow(self, data)
         else: messagebox.showinfo("Sem Dados", "Não há dados de análise detalhada para este alerta.", parent=self)
 
     def _clear_history(self):
         """Limpa todo o histórico de alertas após confirmação do usuário."""
         if messagebox.askyesno("Confirmar", "Tem certeza que deseja apagar todo o histórico de alertas?\n\nEsta ação não pode ser desfeita.", parent=self):
             self.parent_app.alert_history.clear()
-            self.parent_app.save_alert_history()
+            self._selected_id = self._selected_row = None
             self._load_history()
             self.status_label.config(text="Histórico de alertas apagado")
             for widget in self.details_frame.winfo_children(): widget.destroy()
@@ -0,0 +1,352 @@
+# kline_archive.py
+#
+# Arquivo local de candles (1h e 1m) dos símbolos monitorados, para indicadores de
+# janela longa (ex.: MME 200 no diário) e backtests sem baixar o histórico de novo.
+# Cada série (símbolo, intervalo) é um conjunto de segmentos .npy colunares (uma linha
+# da matriz por coluna), lidos por memória mapeada. O preenchimento vem do /api/v3/klines
+# em janelas de 1000 candles buscadas em paralelo, dentro de um orçamento de peso da API,
+# e os segmentos pequenos gerados pelas atualizações são compactados em segmentos maiores.
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+import robust_services
+from app_state import get_application_path
+from config_store import config_store
+
+KLINE_ARCHIVE_PATH = os.path.join(get_application_path(), "kline_archive")
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+
+INTERVAL_MS = {'1m': 60_000, '1h': 3_600_000}
+KLINE_COLUMNS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'quote_asset_volume',
+                 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume')
+# Posições das colunas acima na resposta da Binance (a 6 é o close_time, derivado do open_time)
+_RESPONSE_FIELDS = (0, 1, 2, 3, 4, 5, 7, 8, 9, 10)
+
+WINDOW_LIMIT = 1000
+# Compactação em duas faixas de tamanho: os segmentos de uma faixa são juntados quando passam de MAX_SMALL_SEGMENTS
+COMPACT_LEVELS = (5_000, 50_000)
+SEGMENT_ROWS = COMPACT_LEVELS[-1]
+MAX_SMALL_SEGMENTS = 4
+SYNC_INTERVAL = 900
+
+DEFAULT_HISTORY_DAYS = {'1h': 1825, '1m': 30}
+
+def _ranges(times, step):
+    """Agrupa timestamps ordenados em intervalos contíguos [(início, fim), ...]."""
+    if not len(times): return []
+    breaks = np.flatnonzero(np.diff(times) != step)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(times) - 1]))
+    return [(int(times[s]), int(times[e])) for s, e in zip(starts, ends)]
+
+def _merge_ranges(ranges, step):
+    """Une intervalos [(início, fim)] que se sobrepõem ou se encostam; retorna-os ordenados."""
+    merged = []
+    for a, b in sorted((int(a), int(b)) for a, b in ranges):
+        if merged and a <= merged[-1][1] + step: merged[-1][1] = max(merged[-1][1], b)
+        else: merged.append([a, b])
+    return merged
+
+def _subtract_ranges(ranges, holes, step):
+    """Partes de 'ranges' fora dos intervalos 'holes' (ordenados e disjuntos, como os de _merge_ranges)."""
+    result = []
+    for a, b in ranges:
+        for ha, hb in holes:
+            if hb < a or ha > b: continue
+            if ha > a: result.append((a, ha - step))
+            a = hb + step
+            if a > b: break
+        if a <= b: result.append((a, b))
+    return result
+
+def resample_klines(df, interval='1d'):
+    """Agrega candles (ex.: de 1h) em um intervalo maior do pandas ('1d', '4h', '1W'...)."""
+    index = pd.to_datetime(df['open_time'], unit='ms')
+    grouped = df.set_index(index).resample(interval)
+    result = pd.DataFrame({
+        'open': grouped['open'].first(), 'high': grouped['high'].max(), 'low': grouped['low'].min(),
+        'close': grouped['close'].last(), 'volume': grouped['volume'].sum(),
+        'quote_asset_volume': grouped['quote_asset_volume'].sum(), 'number_of_trades': grouped['number_of_trades'].sum(),
+    }).dropna(subset=['close'])
+    result.insert(0, 'open_time', (result.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1))
+    return result.reset_index(drop=True)
+
+class KlineArchive:
+    """Séries de candles por (símbolo, intervalo) em segmentos colunares, com preenchimento de lacunas."""
+    def __init__(self, path=KLINE_ARCHIVE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._stop_run = False
+        self._session = requests.Session()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ---------- Segmentos ----------
+    def _series_path(self, symbol, interval):
+        return os.path.join(self.path, interval, symbol)
+
+    def _segments(self, symbol, interval):
+        """[(seq, início, fim, linhas, caminho)] em ordem de gravação; o nome do arquivo traz o resto."""
+        path = self._series_path(symbol, interval)
+        if not os.path.isdir(path): return []
+        segments = []
+        for name in os.listdir(path):
+            if not name.endswith(".npy"): continue
+            try:
+                start, end, rows, seq = (int(part) for part in name[:-4].split("_"))
+            except ValueError:
+                continue
+            segments.append((seq, start, end, rows, os.path.join(path, name)))
+            self._seq = max(self._seq, seq)
+        return sorted(segments)
+
+    def _write_segment(self, symbol, interval, data):
+        """Grava um segmento (matriz colunas x candles) de forma atômica."""
+        path = self._series_path(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+        self._seq += 1
+        name = f"{int(data[0, 0])}_{int(data[0, -1])}_{data.shape[1]}_{self._seq}.npy"
+        tmp = os.path.join(path, name + ".tmp")
+        with open(tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, name))
+
+    @staticmethod
+    def _dedupe(data):
+        """Ordena por open_time e, com candles repetidos, fica com o do segmento mais novo."""
+        order = np.argsort(data[0], kind='stable')
+        data = data[:, order]
+        keep = np.append(data[0, 1:] != data[0, :-1], True)
+        return data[:, keep]
+
+    def append(self, symbol, interval, rows):
+        """Acrescenta candles (matriz candles x colunas, como em KLINE_COLUMNS) à série."""
+        if rows is None or not len(rows): return
+        with self._lock:
+            self._write_segment(symbol, interval, self._dedupe(np.asarray(rows, dtype=np.float64).T))
+            self.compact(symbol, interval)
+
+    def compact(self, symbol, interval, force=False):
+        """
+        Junta os segmentos pequenos (das atualizações e das janelas de preenchimento) em
+        segmentos de até SEGMENT_ROWS candles. Os pequenos viram médios e só os médios
+        viram cheios, então cada candle é reescrito poucas vezes; os cheios ficam como estão.
+        """
+        with self._lock:
+            for lower, limit in zip((0,) + COMPACT_LEVELS, COMPACT_LEVELS):
+                small = [s for s in self._segments(symbol, interval) if lower <= s[3] < limit]
+                if len(small) < 2 or (len(small) <= MAX_SMALL_SEGMENTS and not force): continue
+                data = self._dedupe(np.concatenate([np.load(s[4]) for s in small], axis=1))
+                for start in range(0, data.shape[1], SEGMENT_ROWS):
+                    self._write_segment(symbol, interval, data[:, start:start + SEGMENT_ROWS])
+                # Se parar antes de apagar, a leitura descarta as repetições e a próxima compactação as junta
+                for segment in small:
+                    os.remove(segment[4])
+
+    def _read(self, symbol, interval, start=None, end=None, columns=None):
+        # O open_time (linha 0) sempre vem junto, para ordenar e descartar repetições
+        rows = [0] + [KLINE_COLUMNS.index(c) for c in columns if c != 'open_time'] if columns else list(range(len(KLINE_COLUMNS)))
+        parts = []
+        with self._lock:
+            for seq, seg_start, seg_end, count, path in self._segments(symbol, interval):
+                if (start is not None and seg_end < start) or (end is not None and seg_start > end): continue
+                data = np.load(path, mmap_mode='r')
+                lo = int(np.searchsorted(data[0], start, side='left')) if start is not None else 0
+                hi = int(np.searchsorted(data[0], end, side='right')) if end is not None else count
+                if lo < hi: parts.append(np.asarray(data[rows, lo:hi]))
+                del data
+        if not parts: return np.empty((len(rows), 0))
+        return self._dedupe(np.concatenate(parts, axis=1)) if len(parts) > 1 else parts[0]
+
+    def open_times(self, symbol, interval):
+        """Todos os open_time guardados da série (só a primeira linha de cada segmento é lida)."""
+        return self._read(symbol, interval, columns=('open_time',))[0].astype(np.int64)
+
+    def load(self, symbol, interval='1h', start=None, end=None):
+        """
+        Candles guardados entre 'start' e 'end' (open_time em ms), no mesmo formato de
+        colunas do get_klines_data (com close_time), prontos para os indicadores.
+        """
+        data = self._read(symbol, interval, start, end)
+        df = pd.DataFrame(data.T, columns=KLINE_COLUMNS)
+        df['open_time'] = df['open_time'].astype(np.int64)
+        df['number_of_trades'] = df['number_of_trades'].astype(np.int64)
+        df.insert(6, 'close_time', df['open_time'] + INTERVAL_MS[interval] - 1)
+        return df
+
+    # ---------- Lacunas ----------
+    def _meta_path(self, symbol, interval):
+        return os.path.join(self._series_path(symbol, interval), "meta.json")
+
+    def _load_meta(self, symbol, interval):
+        try:
+            with open(self._meta_path(symbol, interval), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {'first_available': None, 'verified_gaps': []}
+
+    def _save_meta(self, symbol, interval, meta):
+        os.makedirs(self._series_path(symbol, interval), exist_ok=True)
+        tmp = self._meta_path(symbol, interval) + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path(symbol, interval))
+
+    def missing_ranges(self, symbol, interval, since_ms, now_ms=None):
+        """
+        Intervalos [(início, fim)] de open_time que faltam desde 'since_ms' até o último
+        candle fechado: o começo, o fim e as lacunas no meio. Ignora o período anterior
+        à listagem do par e as lacunas já confirmadas como ausentes na própria Binance.
+        """
+        step = INTERVAL_MS[interval]
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        last_closed = now_ms // step * step - step
+        meta = self._load_meta(symbol, interval)
+        since = -(-since_ms // step) * step
+        if meta['first_available']: since = max(since, meta['first_available'])
+        if since > last_closed: return []
+
+        times = self.open_times(symbol, interval)
+        times = times[(times >= since) & (times <= last_closed)]
+        if not len(times): return [(since, last_closed)]
+        missing = []
+        if times[0] > since: missing.append((since, int(times[0]) - step))
+        for i in np.flatnonzero(np.diff(times) != step):
+            missing.append((int(times[i]) + step, int(times[i + 1]) - step))
+        if times[-1] < last_closed: missing.append((int(times[-1]) + step, last_closed))
+        # Lacunas confirmadas podem ter sido gravadas em pedaços (uma por janela): compara com a união delas
+        return _subtract_ranges(missing, _merge_ranges(meta['verified_gaps'], step), step)
+
+    def _record_holes(self, symbol, interval, windows):
+        """
+        Depois de buscar as janelas, o que continua faltando nelas não existe na Binance:
+        antes do primeiro candle é o período anterior à listagem; depois, lacuna confirmada.
+        Uma lacuna que atravessa várias janelas é gravada como um único intervalo.
+        """
+        step = INTERVAL_MS[interval]
+        times = self.open_times(symbol, interval)
+        meta = self._load_meta(symbol, interval)
+        for start, end in windows:
+            expected = np.arange(start, end + step, step, dtype=np.int64)
+            for a, b in _ranges(expected[~np.isin(expected, times)], step):
+                if not len(times) or b < times[0]:
+                    meta['first_available'] = max(meta['first_available'] or 0, b + step)
+                else:
+                    meta['verified_gaps'].append([a, b])
+        meta['verified_gaps'] = _merge_ranges(meta['verified_gaps'], step)
+        self._save_meta(symbol, interval, meta)
+
+    # ---------- Preenchimento ----------
+    def _fetch_window(self, symbol, interval, start, end):
+        """Uma janela de até WINDOW_LIMIT candles fechados. Retorna a matriz ou None em caso de erro."""
+        robust_services.rate_limiter.wait_if_needed()
+        params = {'symbol': symbol, 'interval': interval, 'startTime': start, 'endTime': end, 'limit': WINDOW_LIMIT}
+        try:
+            response = self._session.get(KLINES_URL, params=params, timeout=15)
+            if response.status_code in (418, 429):
+                logging.warning(f"Arquivo de klines: limite da Binance atingido ({response.status_code}). Preenchimento interrompido.")
+                self._stop_run = True
+                return None
+            response.raise_for_status()
+            raw = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.error(f"Arquivo de klines: erro ao buscar {symbol} {interval}: {e}")
+            return None
+        if not raw: return np.empty((0, len(KLINE_COLUMNS)))
+        rows = np.array([[float(candle[i]) for i in _RESPONSE_FIELDS] for candle in raw])
+        # Só candles fechados entram no arquivo
+        return rows[rows[:, 0] + INTERVAL_MS[interval] <= time.time() * 1000]
+
+    def plan_windows(self, symbol, interval, since_ms, now_ms=None):
+        """Divide o que falta em janelas de WINDOW_LIMIT candles, das mais recentes para as mais antigas."""
+        step = INTERVAL_MS[interval]
+        windows = []
+        for a, b in self.missing_ranges(symbol, interval, since_ms, now_ms):
+            for start in range(a, b + 1, WINDOW_LIMIT * step):
+                windows.append((start, min(b, start + (WINDOW_LIMIT - 1) * step)))
+        return sorted(windows, reverse=True)
+
+    def backfill(self, symbols, history_days=None, weight_budget=600, max_workers=4, stop_event=None):
+        """
+        Busca o que falta das séries de 'symbols' para cada intervalo de 'history_days'
+        ({intervalo: dias}), em paralelo e até 'weight_budget' de peso da API. O que não
+        couber no orçamento fica para a próxima chamada. Retorna {'windows', 'candles', 'pending'}.
+        """
+        history_days = history_days or DEFAULT_HISTORY_DAYS
+        now_ms = int(time.time() * 1000)
+        jobs = []
+        for interval, days in history_days.items():
+            if interval not in INTERVAL_MS: continue
+            for symbol in symbols:
+                for window in self.plan_windows(symbol, interval, now_ms - int(days * 86400 * 1000), now_ms):
+                    jobs.append((symbol, interval, window))
+        # As janelas mais recentes primeiro, alternando entre os símbolos
+        jobs.sort(key=lambda job: job[2][0], reverse=True)
+        weight = robust_services.klines_weight(WINDOW_LIMIT)
+        affordable, pending = jobs[:max(0, weight_budget // weight)], len(jobs)
+        self._stop_run = False
+
+        def fetch(job):
+            if self._stop_run or (stop_event and stop_event.is_set()): return job, None
+            return job, self._fetch_window(job[0], job[1], *job[2])
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for (symbol, interval, window), rows in executor.map(fetch, affordable):
+                if rows is None: continue
+                results.setdefault((symbol, interval), ([], []))
+                results[(symbol, interval)][0].append(rows)
+                results[(symbol, interval)][1].append(window)
+
+        candles = 0
+        for (symbol, interval), (frames, windows) in results.items():
+            rows = np.concatenate(frames)
+            self.append(symbol, interval, rows)
+            self._record_holes(symbol, interval, windows)
+            candles += len(rows)
+            pending -= len(windows)
+        if jobs:
+            logging.info(f"Arquivo de klines: {len(jobs) - pending} janelas buscadas ({candles} candles), {pending} pendentes.")
+        return {'windows': len(jobs) - pending, 'candles': candles, 'pending': pending}
+
+    # ---------- Sincronização em segundo plano ----------
+    def start(self):
+        """Inicia (uma vez) a thread que mantém o arquivo dos símbolos monitorados em dia."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="kline-archive", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            _, config = config_store.current()
+            wait = SYNC_INTERVAL
+            if config and config.get('kline_archive_enabled', False):
+                symbols = [c['symbol'] for c in config.get('cryptos_to_monitor', ())
+                           if robust_services.DataValidator.validate_symbol(c.get('symbol'))]
+                try:
+                    result = self.backfill(symbols, config.get('kline_archive_history_days', DEFAULT_HISTORY_DAYS),
+                                           config.get('kline_archive_weight_budget', 600),
+                                           config.get('kline_archive_workers', 4), self._stop)
+                    # Ainda há histórico para baixar: volta logo, respeitando o rate limiter
+                    if result['pending']: wait = 60
+                except Exception as e:
+                    logging.error(f"Erro ao atualizar o arquivo de klines: {e}")
+            self._stop.wait(wait)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout)
+
+kline_archive = KlineArchive()
@@ -8,10 +8,12 @@ import threading
 import sys
 import queue
 import logging
+import multiprocessing
 import time
 import webbrowser
 from urllib.parse import quote
-from notification_service import send_telegram_alert, AlertConsolidator
+from notification_service import telegram_worker, AlertConsolidator
+from notification_sinks import NotificationDispatcher, build_sinks
 import robust_services
 from monitoring_service import (
     run_monitoring_cycle,
@@ -29,11 +31,16 @@ from core_components import (
 from api_config_window import ApiConfigWindow
 from capital_flow_window import CapitalFlowWindow
 from token_movers_window import TokenMoversWindow
+from screener_window import ScreenerWindow
 from sound_config_window import SoundConfigWindow
 from dynamic_view_window import DynamicViewWindow
 from coin_manager import CoinManager
 from help_window import HelpWindow
 from app_state import get_last_fetch_timestamp, update_last_fetch_timestamp
+from alert_state import alert_state
+from config_store import config_store, ConfigPersister, load_config_file
+from alert_history_store import AlertHistoryStore
+from kline_archive import kline_archive
 from update_checker import check_for_updates
 
 def get_app_version():
@@ -106,19 +113,28 @@ class CryptoApp:
         self.all_symbols = all_symbols
         self.coin_manager = coin_manager
         self.coingecko_mapping = coingecko_mapping
+        self.config_persister = ConfigPersister(config_store, os.path.join(get_application_path(), "config.json"))
         self.version = APP_VERSION
         self.data_queue = queue.Queue()
         self.monitoring_thread = None
         self.stop_monitoring_event = threading.Event()
         self.coin_cards = {}
-        self.alert_history = self.load_alert_history()
+        self.alert_history = AlertHistoryStore(max_entries=self.config.get('alert_history_max_entries', 50000),
+                                               retention_days=self.config.get('alert_history_retention_days', 365))
         self.countdown_job = None
+        self.screener_window = None
+        self.latest_screener_result = None
         
         self.setup_logging()
         self.setup_ui()
         
         self.alert_consolidator = AlertConsolidator(self.root, self)
+        telegram_worker.resume()
+        self.notification_dispatcher = NotificationDispatcher(build_sinks(self.config))
+        self._sinks_signature = self._get_sinks_signature()
+        config_store.publish(self.config)
         self.start_monitoring()
+        kline_archive.start()
         
         self.root.after(100, self.process_queue)
         self.update_dominance_display()
@@ -146,6 +162,7 @@ class CryptoApp:
         self.menu_bar.add_cascade(label="📊 Análise de Mercado", menu=analysis_menu)
         analysis_menu.add_command(label="💹 Fluxo de Capital (Categorias)", command=self.show_capital_flow_window)
         analysis_menu.add_command(label="📈 Ganhadores e Perdedores", command=self.show_token_movers_window)
+        analysis_menu.add_command(label="🔎 Screener de Mercado", command=self.show_screener_window)
         analysis_menu.add_command(label="🔔 Histórico de Alertas", command=self.show_alert_history_window)
         analysis_menu.add_separator()
         analysis_menu.add_command(label="✨ Visão Dinâmica", command=self.show_dynamic_view_window)
@@ -321,7 +338,7 @@ class CryptoApp:
         """Inicia o thread de monitoramento em segundo plano."""
         if self.monitoring_thread and self.monitoring_thread.is_alive(): return
         self.stop_monitoring_event.clear()
-        self.monitoring_thread = threading.Thread(target=run_monitoring_cycle, args=(self.config, self.data_queue, self.stop_monitoring_event, self.coingecko_mapping), daemon=True)
+        self.monitoring_thread = threading.Thread(target=run_monitoring_cycle, args=(self.data_queue, self.stop_monitoring_event, self.coingecko_mapping), daemon=True)
         self.monitoring_thread.start()
         logging.info("Serviço de monitoramento em segundo plano iniciado.")
 
@@ -333,6 +350,7 @@ class CryptoApp:
                 if item['type'] == 'data': self.update_card_data(item['payload'])
                 elif item['type'] == 'alert': self.handle_alert(item['payload'])
                 elif item['type'] == 'start_countdown': self.start_countdown(item['payload']['seconds'])
+                elif item['type'] == 'screener': self.update_screener_results(item['payload'])
         finally:
             self.root.after(200, self.process_queue)
 
@@ -340,7 +358,14 @@ class CryptoApp:
         """Processa um alerta recebido do serviço de monitoramento."""
         self.log_and_save_alert(payload.get('symbol'), payload.get('trigger'), payload.get('analysis_data'))
         self.alert_consolidator.add_alert(payload.get('symbol'), payload.get('trigger'), payload.get('message'), payload.get('sound'))
-        send_telegram_alert(self.config.get('telegram_bot_token'), self.config.get('telegram_chat_id'), payload.get('message'))
+        analysis_data = payload.get('analysis_data') or {}
+        self.notification_dispatcher.publish([{'symbol': payload.get('symbol'), 'trigger': payload.get('trigger'),
+                                               'message': payload.get('message'), 'price': analysis_data.get('current_price')}])
+
+    def _get_sinks_signature(self):
+        """Representação das configurações de notificação, para recriar os destinos só quando mudam."""
+        return json.dumps([self.config.get('telegram_bot_token'), self.config.get('telegram_chat_id'),
+                           self.config.get('notification_sinks', [])], sort_keys=True, default=str)
 
     def on_closing(self):
         """Executa procedimentos de limpeza ao fechar a aplicação."""
@@ -349,41 +374,30 @@ class CryptoApp:
             self.stop_monitoring_event.set()
             if self.monitoring_thread: self.monitoring_thread.join(timeout=5)
             self.save_config()
-            self.save_alert_history()
+            self.config_persister.flush()
+            self.alert_history.close()
+            kline_archive.stop(timeout=3)
+            alert_state.save()
+            self.alert_consolidator.stop()
+            self.notification_dispatcher.stop(timeout=3)
+            telegram_worker.stop(timeout=3)
             self.root.destroy()
             sys.exit()
 
     def save_config(self):
-        """Salva a configuração atual no arquivo config.json."""
-        config_path = os.path.join(get_application_path(), "config.json")
-        try:
-            with open(config_path, 'w', encoding='utf-8') as f: json.dump(self.config, f, indent=2)
-            logging.info("Configurações salvas com sucesso.")
-        except Exception as e:
-            logging.error(f"Erro ao salvar configurações: {e}")
-
-    def load_alert_history(self):
-        """Carrega o histórico de alertas do arquivo alert_history.json."""
-        history_path = os.path.join(get_application_path(), "alert_history.json")
-        try:
-            with open(history_path, 'r', encoding='utf-8') as f: return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-
-    def save_alert_history(self):
-        """Salva o histórico de alertas atual no arquivo alert_history.json."""
-        history_path = os.path.join(get_application_path(), "alert_history.json")
-        try:
-            with open(history_path, 'w', encoding='utf-8') as f: json.dump(self.alert_history, f, indent=2)
-            logging.info("Histórico de alertas salvo com sucesso.")
-        except Exception as e:
-            logging.error(f"Não foi possível salvar o histórico de alertas: {e}")
+        """Publica a configuração atual para o monitoramento e agenda a gravação do config.json."""
+        config_store.publish(self.config)
+        if hasattr(self, 'notification_dispatcher') and self._get_sinks_signature() != self._sinks_signature:
+            self._sinks_signature = self._get_sinks_signature()
+            self.notification_dispatcher.configure(build_sinks(self.config))
+        self.config_persister.schedule()
 
     def log_and_save_alert(self, symbol, trigger, data):
         """Adiciona uma nova entrada de alerta ao histórico."""
-        alert_entry = {'timestamp': datetime.now().isoformat(), 'symbol': symbol, 'trigger': trigger, 'data': data}
-        self.alert_history.insert(0, alert_entry)
-        if len(self.alert_history) > 200: self.alert_history = self.alert_history[:200]
+        try:
+            self.alert_history.append(symbol, trigger, data)
+        except Exception as e:
+            logging.error(f"Não foi possível gravar o alerta no histórico: {e}")
 
     def show_alert_manager(self):
         """Abre a janela do gerenciador de alertas."""
@@ -401,6 +415,19 @@ class CryptoApp:
         cg_client = CoinGeckoAPI()
         TokenMoversWindow(self.root, self, cg_client, robust_services.data_cache, robust_services.rate_limiter)
 
+    def show_screener_window(self):
+        """Abre a janela do screener de mercado (ou traz a existente para frente)."""
+        if self.screener_window and self.screener_window.winfo_exists():
+            self.screener_window.lift()
+            return
+        self.screener_window = ScreenerWindow(self.root, self)
+
+    def update_screener_results(self, result):
+        """Guarda o último resultado do screener e atualiza a janela, se estiver aberta."""
+        self.latest_screener_result = result
+        if self.screener_window and self.screener_window.winfo_exists():
+            self.screener_window.display_results(result)
+
     def show_alert_history_window(self):
         """Abre a janela do histórico de alertas."""
         AlertHistoryWindow(self)
@@ -597,10 +624,7 @@ Se estiver relatando um erro, inclua os passos para reproduzi-lo.
 def get_current_config():
     """Carrega a configuração do aplicativo a partir do arquivo config.json."""
     config_path = os.path.join(get_application_path(), "config.json")
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f: return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"cryptos_to_monitor": [], "telegram_bot_token": "", "telegram_chat_id": "", "check_interval_seconds": 300}
+    return load_config_file(config_path, {"cryptos_to_monitor": [], "telegram_bot_token": "", "telegram_chat_id": "", "check_interval_seconds": 300})
 
 def fetch_initial_data(config, data_queue):
     """Busca todos os dados iniciais necessários para a aplicação em uma thread separada."""
@@ -696,4 +720,5 @@ def start_main_application(root, config, all_symbols_list, coingecko_mapping):
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Necessário para o pool de processos no executável do PyInstaller
     main()
\ No newline at end of file
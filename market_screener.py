@@ -0,0 +1,180 @@
+# market_screener.py
+#
+# Screener de mercado: avalia um conjunto de condições (RSI, Bollinger, cruzamento de
+# MMEs e volume/capitalização) sobre todos os pares USDT da Binance, respeitando um
+# orçamento de peso da API por ciclo, e devolve as moedas ordenadas pela força do sinal.
+
+import time
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+import robust_services
+from indicators import batch_rsi, batch_bollinger_bands, batch_ema_last
+from monitoring_service import get_ticker_data, get_klines_data, cg_client
+
+DEFAULT_SCREENER_CONFIG = {
+    'enabled': False,
+    'conditions': {
+        'rsi_sobrevendido': {'enabled': True, 'value': 30.0},
+        'rsi_sobrecomprado': {'enabled': True, 'value': 70.0},
+        'bollinger_abaixo': {'enabled': True},
+        'bollinger_acima': {'enabled': True},
+        'mme_cruz_dourada': {'enabled': False},
+        'mme_cruz_morte': {'enabled': False},
+        'volume_mcap': {'enabled': False, 'value': 10.0},  # Volume 24h >= X% da capitalização
+    },
+    'min_quote_volume': 1_000_000,  # Ignora pares com volume 24h (USDT) abaixo disso
+    'weight_budget': 1200,          # Peso máximo da API da Binance gasto por execução
+    'max_workers': 8,
+    'top_n': 50,
+}
+
+# Pesos da API da Binance (https://binance-docs.github.io/apidocs/spot/en/)
+TICKER_24H_WEIGHT = 80
+RSI_PERIOD, BB_PERIOD, BB_STD = 14, 20, 2
+EMA_FAST, EMA_SLOW = 50, 200
+
+def get_screener_config(config):
+    """Retorna a configuração do screener mesclada com os valores padrão."""
+    user_config = config.get('screener_config', {})
+    merged = {**DEFAULT_SCREENER_CONFIG, **user_config}
+    merged['conditions'] = {key: {**default, **user_config.get('conditions', {}).get(key, {})}
+                            for key, default in DEFAULT_SCREENER_CONFIG['conditions'].items()}
+    return merged
+
+def get_market_caps_by_symbol(pages=2):
+    """Busca a capitalização das maiores moedas da CoinGecko (250 por página), indexada pelo símbolo."""
+    cache_key = {'func': 'get_market_caps_by_symbol', 'pages': pages}
+    cached_data = robust_services.data_cache.get(cache_key, ttl=300)
+    if cached_data is not None: return cached_data
+
+    market_caps = {}
+    try:
+        for page in range(1, pages + 1):
+            robust_services.rate_limiter.wait_if_needed()
+            coins = cg_client.get_coins_markets(vs_currency='usd', order='market_cap_desc', per_page=250, page=page)
+            for coin in coins:
+                # Em símbolos repetidos prevalece a moeda de maior capitalização
+                market_caps.setdefault(coin['symbol'].upper(), coin.get('market_cap'))
+        robust_services.data_cache.set(cache_key, market_caps)
+    except Exception as e:
+        logging.error(f"Erro ao buscar capitalizações para o screener: {e}")
+    return market_caps
+
+def _required_klines(conditions):
+    """Quantidade de candles necessária para as condições habilitadas (0 = só o ticker)."""
+    enabled = {key for key, cond in conditions.items() if cond.get('enabled')}
+    if enabled & {'mme_cruz_dourada', 'mme_cruz_morte'}: return 300
+    if enabled & {'rsi_sobrevendido', 'rsi_sobrecomprado', 'bollinger_abaixo', 'bollinger_acima'}:
+        return max(RSI_PERIOD + 1, BB_PERIOD) + 1
+    return 0
+
+def run_market_screener(screener_config, ticker_data=None, stop_event=None):
+    """
+    Executa o screener sobre todo o universo USDT. Se 'ticker_data' já foi buscado no ciclo,
+    ele é reaproveitado e não conta no orçamento de peso.
+    Retorna um dicionário com os resultados ordenados por força e estatísticas da execução.
+    """
+    start = time.time()
+    conditions = screener_config['conditions']
+    weight_used = 0
+    if ticker_data is None:
+        ticker_data = get_ticker_data()
+        weight_used += TICKER_24H_WEIGHT
+    if not ticker_data:
+        return {'results': [], 'universe': 0, 'scanned': 0, 'weight': weight_used, 'elapsed': time.time() - start}
+
+    safe_float = robust_services.DataValidator.safe_float
+    universe = []
+    for symbol, item in ticker_data.items():
+        if not robust_services.DataValidator.validate_symbol(symbol): continue
+        quote_volume = safe_float(item.get('quoteVolume'))
+        if quote_volume >= screener_config['min_quote_volume']:
+            universe.append((quote_volume, symbol))
+    universe.sort(reverse=True)
+    symbols = [symbol for _, symbol in universe]
+
+    # Colunas do ticker para todo o universo
+    prices = np.array([safe_float(ticker_data[s].get('lastPrice')) for s in symbols])
+    changes = np.array([safe_float(ticker_data[s].get('priceChangePercent')) for s in symbols])
+    volumes = np.array([quote_volume for quote_volume, _ in universe])
+    n = len(symbols)
+    rsi = np.full(n, np.nan); upper = np.full(n, np.nan); lower = np.full(n, np.nan)
+    ema_fast = np.full((2, n), np.nan); ema_slow = np.full((2, n), np.nan)
+
+    # Klines: só os necessários, do maior para o menor volume, até o orçamento de peso
+    limit = _required_klines(conditions)
+    if limit and n:
+        weight = robust_services.klines_weight(limit)
+        affordable = max(0, (screener_config['weight_budget'] - weight_used) // weight)
+        to_fetch = symbols[:affordable]
+        if len(to_fetch) < n:
+            logging.info(f"Screener: orçamento de peso permite {len(to_fetch)} de {n} pares.")
+        with ThreadPoolExecutor(max_workers=screener_config['max_workers']) as executor:
+            frames = list(executor.map(lambda s: None if stop_event and stop_event.is_set() else get_klines_data(s, interval='1h', limit=limit), to_fetch))
+        weight_used += weight * len(to_fetch)
+
+        rows = [i for i, df in enumerate(frames) if df is not None and len(df) >= limit]
+        if rows:
+            closes = np.array([frames[i]['close'].to_numpy(dtype=float)[-limit:] for i in rows])
+            rsi[rows] = batch_rsi(closes, RSI_PERIOD)
+            upper[rows], lower[rows] = batch_bollinger_bands(closes, BB_PERIOD, BB_STD)
+            if limit >= EMA_SLOW:
+                ema_fast[:, rows] = batch_ema_last(closes, EMA_FAST)
+                ema_slow[:, rows] = batch_ema_last(closes, EMA_SLOW)
+
+    mcap_ratio = np.full(n, np.nan)
+    if conditions['volume_mcap']['enabled'] and n:
+        market_caps = get_market_caps_by_symbol()
+        caps = np.array([market_caps.get(s[:-4]) or np.nan for s in symbols], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mcap_ratio = np.where(caps > 0, volumes / caps * 100, np.nan)
+
+    # Cada condição gera uma máscara e uma força (1 + magnitude relativa do sinal)
+    strength = np.zeros(n)
+    labels = [[] for _ in range(n)]
+    band_width = upper - lower
+    checks = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if conditions['rsi_sobrevendido']['enabled']:
+            v = conditions['rsi_sobrevendido']['value']
+            checks.append((rsi <= v, (v - rsi) / v, lambda i: f"RSI {rsi[i]:.1f} <= {conditions['rsi_sobrevendido']['value']:.0f}"))
+        if conditions['rsi_sobrecomprado']['enabled']:
+            v = conditions['rsi_sobrecomprado']['value']
+            checks.append((rsi >= v, (rsi - v) / (100 - v), lambda i: f"RSI {rsi[i]:.1f} >= {conditions['rsi_sobrecomprado']['value']:.0f}"))
+        if conditions['bollinger_abaixo']['enabled']:
+            checks.append(((prices > 0) & (prices < lower), (lower - prices) / band_width, lambda i: "Abaixo da Banda Inferior"))
+        if conditions['bollinger_acima']['enabled']:
+            checks.append(((prices > 0) & (prices > upper), (prices - upper) / band_width, lambda i: "Acima da Banda Superior"))
+        if conditions['mme_cruz_dourada']['enabled']:
+            checks.append(((ema_fast[0] < ema_slow[0]) & (ema_fast[1] > ema_slow[1]), np.zeros(n), lambda i: "Cruz Dourada (50/200)"))
+        if conditions['mme_cruz_morte']['enabled']:
+            checks.append(((ema_fast[0] > ema_slow[0]) & (ema_fast[1] < ema_slow[1]), np.zeros(n), lambda i: "Cruz da Morte (50/200)"))
+        if conditions['volume_mcap']['enabled']:
+            v = conditions['volume_mcap']['value']
+            checks.append((mcap_ratio >= v, mcap_ratio / v - 1, lambda i: f"Volume/Cap. {mcap_ratio[i]:.1f}%"))
+
+    for mask, magnitude, label in checks:
+        mask = np.nan_to_num(mask, nan=False).astype(bool)
+        strength[mask] += 1 + np.clip(np.nan_to_num(magnitude[mask]), 0, 10)
+        for i in np.flatnonzero(mask):
+            labels[i].append(label(i))
+
+    matched = np.flatnonzero(strength > 0)
+    ranked = matched[np.argsort(-strength[matched], kind='stable')][:screener_config['top_n']]
+    results = [{
+        'symbol': symbols[i],
+        'strength': float(strength[i]),
+        'price': float(prices[i]),
+        'price_change_24h': float(changes[i]),
+        'volume_24h': float(volumes[i]),
+        'rsi_value': None if np.isnan(rsi[i]) else float(rsi[i]),
+        'volume_mcap_ratio': None if np.isnan(mcap_ratio[i]) else float(mcap_ratio[i]),
+        'matches': labels[i],
+    } for i in ranked]
+
+    elapsed = time.time() - start
+    logging.info(f"Screener: {len(matched)} correspondências em {n} pares ({elapsed:.1f}s, peso {weight_used}).")
+    return {'results': results, 'universe': n, 'scanned': len(matched), 'weight': weight_used,
+            'elapsed': elapsed, 'timestamp': time.time()}
@@ -1,18 +1,28 @@
 import requests
 import pandas as pd
+import numpy as np
 import time
 import logging
-import copy
-from datetime import datetime, timedelta
+from collections import namedtuple
 import robust_services
 import os
-from indicators import calculate_rsi, calculate_bollinger_bands, calculate_macd, calculate_emas, calculate_hilo_signals
+from indicators import IndicatorPipeline, IndicatorMemo, batch_volume_zscore, batch_volume_robust_zscore
+from analysis_pool import ProcessAnalysisBackend
 from notification_service import send_telegram_alert
 from pycoingecko import CoinGeckoAPI
-from app_state import load_coin_mapping_cache, save_coin_mapping_cache
+from coin_metadata import coin_metadata
 from core_components import ALERT_SUMMARIES
+from alert_rules import AlertRuleCache, AlertRuleMatrix, AnalysisColumns, COOLDOWN_EXEMPT, CONDITIONS
+from price_levels import PriceLevelIndex, parse_price_levels, price_level_rules
+from alert_state import alert_state
+from analysis_series import analysis_series
+from config_store import config_store
 
 cg_client = CoinGeckoAPI()
+indicator_pipeline = IndicatorPipeline()
+indicator_memo = IndicatorMemo()
+_pipelines = {indicator_pipeline.indicators: indicator_pipeline}
+alert_rule_cache = AlertRuleCache()
 
 def get_klines_data(symbol, interval='1h', limit=300):
     """Busca dados de k-lines da Binance com cache, rate limiting e validação."""
@@ -36,6 +46,7 @@ def get_klines_data(symbol, interval='1h', limit=300):
         df['close'] = df['close'].apply(robust_services.DataValidator.safe_price)
         df['high'] = df['high'].apply(robust_services.DataValidator.safe_price)
         df['low'] = df['low'].apply(robust_services.DataValidator.safe_price)
+        df['volume'] = df['volume'].apply(robust_services.DataValidator.safe_float)
         robust_services.data_cache.set(cache_args, df)
         return df
     except requests.exceptions.RequestException as e:
@@ -65,13 +76,13 @@ def get_market_caps_coingecko(symbols_to_monitor, coingecko_mapping):
     coin_ids_to_fetch = []
     symbol_to_coin_id = {}
 
-    all_coins = cg_client.get_coins_list()
+    coins = coin_metadata.snapshot()
 
     for binance_symbol in symbols_to_monitor:
         base_asset = binance_symbol.replace('USDT', '').upper()
         coingecko_name = coingecko_mapping.get(base_asset)
         if coingecko_name:
-            coin_id = next((item['id'] for item in all_coins if item['name'].lower() == coingecko_name.lower()), None)
+            coin_id = coins.id_for_name(coingecko_name)
             if coin_id:
                 coin_ids_to_fetch.append(coin_id)
                 symbol_to_coin_id[coin_id] = binance_symbol
@@ -97,26 +108,11 @@ def get_market_caps_coingecko(symbols_to_monitor, coingecko_mapping):
 
 def get_coingecko_global_mapping():
     """
-    Busca a lista de moedas da CoinGecko para mapear Símbolo -> Nome.
-    Utiliza um cache local que é atualizado a cada 24 horas.
+    Mapeamento Símbolo -> Nome da CoinGecko. Vem do serviço de metadados das moedas, que
+    só baixa a lista se o banco local estiver vazio e a atualiza em segundo plano.
     """
-    cached_mapping = load_coin_mapping_cache()
-    if cached_mapping is not None:
-        return cached_mapping
-
-    logging.info("Buscando novo mapeamento de nomes da CoinGecko (cache expirado ou inexistente)...")
-    robust_services.rate_limiter.wait_if_needed()
-    try:
-        coins_list = cg_client.get_coins_list()
-        mapping = {coin['symbol'].upper(): coin['name'] for coin in coins_list}
-
-        save_coin_mapping_cache(mapping) # Salva o novo mapeamento no cache
-
-        logging.info("Mapeamento de nomes CoinGecko carregado e cache atualizado.")
-        return mapping
-    except Exception as e:
-        logging.error(f"Não foi possível buscar mapeamento da CoinGecko: {e}")
-        return {}
+    coin_metadata.ensure_loaded()
+    return coin_metadata.symbol_names
 
 def fetch_all_binance_symbols_startup(existing_config):
     """Busca todos os símbolos USDT da Binance na inicialização."""
@@ -150,6 +146,8 @@ def _get_sound_for_trigger(trigger_key, sound_config):
         'ENTRADA_CAPITAL': 'critical_alert',
         'HILO_COMPRA': 'golden_cross',
         'HILO_VENDA': 'death_cross',
+        'NIVEL_PRECO_ACIMA': 'price_above',
+        'NIVEL_PRECO_ABAIXO': 'price_below',
     }
 
     default_sounds = {
@@ -169,86 +167,19 @@ def _get_sound_for_trigger(trigger_key, sound_config):
 
     return os.path.join('sons', sound_file)
 
-def _check_and_trigger_alerts(symbol, alert_config, analysis_data, data_queue, sound_config):
-    """Verifica e dispara alertas para um símbolo com base nas condições configuradas."""
-    conditions = alert_config.get('conditions', {})
-
-    triggered_conditions = alert_config.get('triggered_conditions', {})
-    if isinstance(triggered_conditions, list):
-        triggered_conditions = {}
-
-    alert_cooldown_minutes = alert_config.get('alert_cooldown_minutes', 60)
+def _dispatch_alerts(symbol, alert_config, analysis_data, active_triggers, data_queue, sound_config):
+    """Aplica o cooldown às regras que dispararam para um símbolo e envia os alertas para a fila."""
+    cooldown_seconds = alert_config.get('alert_cooldown_minutes', 60) * 60
 
     current_price = analysis_data['current_price']
-    rsi = analysis_data['rsi_value']
     volume_24h = analysis_data['volume_24h']
     price_change_24h = analysis_data['price_change_24h']
     market_cap = analysis_data.get('market_cap')
 
-    # Dicionário para mapear condição a chave e mensagem
-    alert_definitions = {
-        'preco_baixo': {'key': 'PRECO_ABAIXO', 'msg': f"Preço Abaixo de ${conditions.get('preco_baixo', {}).get('value', 0):.2f}"},
-        'preco_alto': {'key': 'PRECO_ACIMA', 'msg': f"Preço Acima de ${conditions.get('preco_alto', {}).get('value', 0):.2f}"},
-        'rsi_sobrevendido': {'key': 'RSI_SOBREVENDA', 'msg': f"RSI Sobrevendido (<= {conditions.get('rsi_sobrevendido', {}).get('value', 30):.1f})"},
-        'rsi_sobrecomprado': {'key': 'RSI_SOBRECOMPRA', 'msg': f"RSI Sobrecomprado (>= {conditions.get('rsi_sobrecomprado', {}).get('value', 70):.1f})"},
-        'bollinger_abaixo': {'key': 'PRECO_ABAIXO_BANDA_INFERIOR', 'msg': "Preço Abaixo da Banda Inferior de Bollinger"},
-        'bollinger_acima': {'key': 'PRECO_ACIMA_BANDA_SUPERIOR', 'msg': "Preço Acima da Banda Superior de Bollinger"},
-        'macd_cruz_baixa': {'key': 'CRUZAMENTO_MACD_BAIXA', 'msg': "MACD: Cruzamento de Baixa"},
-        'macd_cruz_alta': {'key': 'CRUZAMENTO_MACD_ALTA', 'msg': "MACD: Cruzamento de Alta"},
-        'mme_cruz_morte': {'key': 'CRUZ_DA_MORTE', 'msg': "MME: Cruz da Morte (50/200)"},
-        'mme_cruz_dourada': {'key': 'CRUZ_DOURADA', 'msg': "MME: Cruz Dourada (50/200)"},
-        'fuga_capital': {'key': 'FUGA_CAPITAL', 'msg': "Detectada possível fuga de capital significativa"},
-        'entrada_capital': {'key': 'ENTRADA_CAPITAL', 'msg': "Detectada possível entrada de capital significativa"},
-        'hilo_compra': {'key': 'HILO_COMPRA', 'msg': "HiLo: Sinal de Compra"},
-        'hilo_venda': {'key': 'HILO_VENDA', 'msg': "HiLo: Sinal de Venda"},
-    }
-
-    active_triggers = []
-
-    # Lógica de verificação de condições
-    if conditions.get('preco_baixo', {}).get('enabled') and current_price <= conditions['preco_baixo']['value']: active_triggers.append(alert_definitions['preco_baixo'])
-    if conditions.get('preco_alto', {}).get('enabled') and current_price >= conditions['preco_alto']['value']: active_triggers.append(alert_definitions['preco_alto'])
-    if conditions.get('rsi_sobrevendido', {}).get('enabled') and rsi <= conditions['rsi_sobrevendido']['value']: active_triggers.append(alert_definitions['rsi_sobrevendido'])
-    if conditions.get('rsi_sobrecomprado', {}).get('enabled') and rsi >= conditions['rsi_sobrecomprado']['value']: active_triggers.append(alert_definitions['rsi_sobrecomprado'])
-    if conditions.get('bollinger_abaixo', {}).get('enabled') and analysis_data.get('bollinger_signal') == "Abaixo da Banda": active_triggers.append(alert_definitions['bollinger_abaixo'])
-    if conditions.get('bollinger_acima', {}).get('enabled') and analysis_data.get('bollinger_signal') == "Acima da Banda": active_triggers.append(alert_definitions['bollinger_acima'])
-    if conditions.get('macd_cruz_baixa', {}).get('enabled') and analysis_data.get('macd_signal') == "Cruzamento de Baixa": active_triggers.append(alert_definitions['macd_cruz_baixa'])
-    if conditions.get('macd_cruz_alta', {}).get('enabled') and analysis_data.get('macd_signal') == "Cruzamento de Alta": active_triggers.append(alert_definitions['macd_cruz_alta'])
-    if conditions.get('mme_cruz_morte', {}).get('enabled') and analysis_data.get('mme_cross') == "Cruz da Morte": active_triggers.append(alert_definitions['mme_cruz_morte'])
-    if conditions.get('mme_cruz_dourada', {}).get('enabled') and analysis_data.get('mme_cross') == "Cruz Dourada": active_triggers.append(alert_definitions['mme_cruz_dourada'])
-    if conditions.get('hilo_compra', {}).get('enabled') and analysis_data.get('hilo_signal') == "HiLo Buy": active_triggers.append(alert_definitions['hilo_compra'])
-    if conditions.get('hilo_venda', {}).get('enabled') and analysis_data.get('hilo_signal') == "HiLo Sell": active_triggers.append(alert_definitions['hilo_venda'])
-
-    fuga_capital_config = conditions.get('fuga_capital_significativa', {})
-    if fuga_capital_config.get('enabled') and market_cap is not None and market_cap > 0:
-        try:
-            percent_mcap_str, percent_price_str = fuga_capital_config['value'].split(',')
-            if (volume_24h / market_cap * 100) > float(percent_mcap_str) and price_change_24h < float(percent_price_str):
-                active_triggers.append(alert_definitions['fuga_capital'])
-        except (ValueError, TypeError):
-            logging.warning(f"Configuração de alerta 'fuga de capital' inválida para {symbol}.")
-
-    entrada_capital_config = conditions.get('entrada_capital_significativa', {})
-    if entrada_capital_config.get('enabled') and market_cap is not None and market_cap > 0:
-        try:
-            percent_mcap_str, percent_price_str = entrada_capital_config['value'].split(',')
-            if (volume_24h / market_cap * 100) > float(percent_mcap_str) and price_change_24h > float(percent_price_str):
-                active_triggers.append(alert_definitions['entrada_capital'])
-        except (ValueError, TypeError):
-            logging.warning(f"Configuração de alerta 'entrada de capital' inválida para {symbol}.")
-
-    now = datetime.now()
+    now = time.monotonic()
     for trigger in active_triggers:
-        trigger_key = trigger['key']
-
-        last_triggered_str = triggered_conditions.get(trigger_key)
-        if last_triggered_str:
-            try:
-                last_triggered_time = datetime.fromisoformat(last_triggered_str)
-                if now - last_triggered_time < timedelta(minutes=alert_cooldown_minutes):
-                    continue
-            except ValueError:
-                logging.warning(f"Formato de data inválido para a última ativação do alerta '{trigger_key}' para {symbol}. Ignorando cooldown para este ciclo.")
+        trigger_key = trigger.key
+        if trigger.condition not in COOLDOWN_EXEMPT and alert_state.in_cooldown(symbol, trigger_key, cooldown_seconds, now): continue
 
         market_cap_str = f"${market_cap:,.0f}" if market_cap is not None else "N/A"
         user_notes = alert_config.get('notes', '').strip()
@@ -260,7 +191,7 @@ def _check_and_trigger_alerts(symbol, alert_config, analysis_data, data_queue, s
 
         formatted_message = (
             f"🚨 ALERTA: {symbol} 🚨\n\n"
-            f"Disparo: {trigger['msg']} (Atual: ${current_price:,.2f})\n"
+            f"Disparo: {trigger.message(analysis_data)} (Atual: ${current_price:,.2f})\n"
             f"Preço Atual: ${current_price:,.2f}\n"
             f"Volume 24h: ${volume_24h:,.0f}\n"
             f"Capitalização de Mercado: {market_cap_str}\n"
@@ -277,15 +208,80 @@ def _check_and_trigger_alerts(symbol, alert_config, analysis_data, data_queue, s
             'analysis_data': analysis_data
         }
         data_queue.put({'type': 'alert', 'payload': alert_payload})
-        triggered_conditions[trigger_key] = now.isoformat()
-
-    active_trigger_keys = {t['key'] for t in active_triggers}
-    alert_config['triggered_conditions'] = {k: v for k, v in triggered_conditions.items() if k in active_trigger_keys}
-
-def _analyze_symbol(symbol, ticker_data, market_cap=None):
-    """Coleta e analisa todos os dados técnicos para um único símbolo."""
+        alert_state.mark_triggered(symbol, trigger_key, now)
+
+# ==========================================
+# PLANEJAMENTO DE BUSCA
+# ==========================================
+# Indicador de que cada condição depende. Condições de preço e de capital usam só o ticker.
+CONDITION_INDICATORS = {
+    'rsi_sobrevendido': 'rsi', 'rsi_sobrecomprado': 'rsi',
+    'bollinger_abaixo': 'bollinger', 'bollinger_acima': 'bollinger',
+    'macd_cruz_baixa': 'macd', 'macd_cruz_alta': 'macd',
+    'mme_cruz_morte': 'mme', 'mme_cruz_dourada': 'mme',
+    'hilo_compra': 'hilo', 'hilo_venda': 'hilo',
+}
+# EMAs começam no primeiro candle da janela: esses indicadores mantêm a janela completa
+# para que os valores não dependam do plano.
+EMA_INDICATORS = frozenset({'macd', 'mme', 'hilo'})
+FULL_KLINES_LIMIT = 300
+
+# O z-score de volume só existe depois do laço (é calculado em lote); as demais condições
+# são avaliadas assim que a análise de cada símbolo fica pronta, sem esperar o ciclo inteiro
+DEFERRED_CONDITIONS = frozenset({'volume_anormal'})
+IMMEDIATE_CONDITIONS = frozenset(CONDITIONS) - DEFERRED_CONDITIONS
+
+FetchPlan = namedtuple('FetchPlan', ['indicators', 'limit'])  # limit == 0: só o ticker
+FULL_FETCH_PLAN = FetchPlan(indicator_pipeline.indicators, FULL_KLINES_LIMIT)
+
+def _pipeline_for(indicators):
+    """Pipeline (compartilhado) que calcula apenas os indicadores informados."""
+    if indicators not in _pipelines:
+        _pipelines[indicators] = IndicatorPipeline(indicators)
+    return _pipelines[indicators]
+
+def plan_symbol_fetch(rules, config):
+    """Menor conjunto de dados (indicadores e quantidade de candles) que atende às regras de um símbolo."""
+    indicators = frozenset(CONDITION_INDICATORS[r.condition] for r in rules if r.condition in CONDITION_INDICATORS)
+    limit = 0
+    if indicators & EMA_INDICATORS:
+        limit = FULL_KLINES_LIMIT
+    elif indicators:
+        limit = max(_pipeline_for(indicators).min_candles.values())
+    if any(r.condition == 'volume_anormal' for r in rules):
+        limit = max(limit, config.get('volume_anomaly_window', 20) + 2)
+    return FetchPlan(indicators, limit)
+
+def _compute_indicators(symbol, fetch_plan=FULL_FETCH_PLAN):
+    """Busca os klines de um símbolo e calcula os indicadores do plano na thread atual. Retorna (indicadores, klines)."""
+    df = get_klines_data(symbol, interval='1h', limit=fetch_plan.limit)
+    if df is None or df.empty: return None, None
+    return indicator_memo.run(_pipeline_for(fetch_plan.indicators), df, symbol, interval='1h'), df
+
+def _compute_volume_zscores(volume_rows, config):
+    """
+    Z-score de volume do último candle de 1h fechado de cada símbolo, calculado em lote.
+    'volume_rows' mapeia símbolo -> volumes dos klines que o próprio ciclo já buscou.
+    """
+    window = config.get('volume_anomaly_window', 20)
+    kernel = batch_volume_robust_zscore if config.get('volume_anomaly_method') == 'mad' else batch_volume_zscore
+    names, rows = [], []
+    for symbol, volumes in volume_rows.items():
+        if len(volumes) < window + 2: continue
+        # Descarta o candle em formação: seu volume ainda é parcial
+        rows.append(volumes[-(window + 2):-1])
+        names.append(symbol)
+    if not rows: return {}
+    return dict(zip(names, kernel(np.array(rows), window).tolist()))
+
+def _analyze_symbol(symbol, ticker_data, market_cap=None, indicators=None, fetch_plan=FULL_FETCH_PLAN, volume_rows=None):
+    """
+    Coleta e analisa os dados técnicos de um único símbolo, limitados ao 'fetch_plan'.
+    Se 'indicators' não for informado (ex.: vindo do pool de processos), calcula localmente.
+    Com 'volume_rows', guarda nele os volumes dos klines buscados, para o z-score em lote.
+    """
     analysis_result = {'symbol': symbol, 'current_price': 0.0, 'price_change_24h': 0.0, 'volume_24h': 0.0,
-                       'rsi_value': 0.0, 'rsi_signal': "N/A", 'bollinger_signal': "Nenhum",
+                       'rsi_value': 0.0, 'rsi_signal': "N/A", 'bollinger_signal': "Nenhum", 'bollinger_pct_b': None,
                        'macd_signal': "Nenhum", 'mme_cross': "Nenhum", 'hilo_signal': "Nenhum", 'market_cap': market_cap}
 
     symbol_ticker = ticker_data.get(symbol, {})
@@ -293,68 +289,204 @@ def _analyze_symbol(symbol, ticker_data, market_cap=None):
     analysis_result['price_change_24h'] = robust_services.DataValidator.safe_float(symbol_ticker.get('priceChangePercent'))
     analysis_result['volume_24h'] = robust_services.DataValidator.safe_float(symbol_ticker.get('quoteVolume'))
 
-    df = get_klines_data(symbol)
-    if df is None or df.empty: return analysis_result
+    if indicators is None and fetch_plan.limit:
+        indicators, df = _compute_indicators(symbol, fetch_plan)
+        if volume_rows is not None and df is not None: volume_rows[symbol] = df['volume'].to_numpy(dtype=float)
+    if indicators is None: return analysis_result
 
-    rsi_value, _, _ = calculate_rsi(df)
-    upper_band, lower_band, _, _ = calculate_bollinger_bands(df)
-    macd_cross = calculate_macd(df)
-    _, _, hilo_signal = calculate_hilo_signals(df)
-    emas = calculate_emas(df, periods=[50, 200])
+    rsi_value = indicators['rsi_value']
+    upper_band, lower_band = indicators['bollinger_upper'], indicators['bollinger_lower']
 
-    analysis_result['hilo_signal'] = hilo_signal
+    analysis_result['hilo_signal'] = indicators['hilo_signal']
     analysis_result['rsi_value'] = rsi_value if rsi_value else 0.0
     analysis_result['rsi_signal'] = f"{rsi_value:.2f}" if rsi_value else "N/A"
     
     if upper_band > 0 and analysis_result['current_price'] > 0:
+        if upper_band > lower_band:
+            analysis_result['bollinger_pct_b'] = (analysis_result['current_price'] - lower_band) / (upper_band - lower_band)
         if analysis_result['current_price'] > upper_band: analysis_result['bollinger_signal'] = "Acima da Banda"
         elif analysis_result['current_price'] < lower_band: analysis_result['bollinger_signal'] = "Abaixo da Banda"
             
-    analysis_result['macd_signal'] = macd_cross
-    
-    if 50 in emas and 200 in emas and len(emas[50]) > 1 and len(emas[200]) > 1:
-        if emas[50].iloc[-2] < emas[200].iloc[-2] and emas[50].iloc[-1] > emas[200].iloc[-1]: analysis_result['mme_cross'] = "Cruz Dourada"
-        elif emas[50].iloc[-2] > emas[200].iloc[-2] and emas[50].iloc[-1] < emas[200].iloc[-1]: analysis_result['mme_cross'] = "Cruz da Morte"
+    analysis_result['macd_signal'] = indicators['macd_signal']
+    analysis_result['mme_cross'] = indicators['mme_cross']
     
     return analysis_result
 
-def run_monitoring_cycle(config, data_queue, stop_event, coingecko_mapping):
-    """Ciclo principal de monitoramento que roda em segundo plano para buscar e analisar dados."""
+def _prepare_process_backend(backend, config, symbols):
+    """Cria, recria ou encerra o backend de processos conforme a configuração e a lista de símbolos."""
+    if config.get('analysis_backend') != 'process' or not symbols:
+        if backend: backend.shutdown()
+        return None
+    if backend and backend.symbols == symbols:
+        return backend
+    if backend: backend.shutdown()
+    try:
+        return ProcessAnalysisBackend(symbols, workers=config.get('analysis_workers'))
+    except Exception as e:
+        logging.error(f"Não foi possível iniciar o backend de análise em processos: {e}. Usando a thread de monitoramento.")
+        return None
+
+class MonitoringPlan:
+    """Tudo o que o ciclo deriva da configuração; recriado só quando uma nova versão é publicada."""
+    def __init__(self, version, config, previous=None):
+        self.version = version
+        self.config = config
+        cryptos = [c for c in config.get("cryptos_to_monitor", ()) if robust_services.DataValidator.validate_symbol(c.get('symbol'))]
+        self.symbols = [c['symbol'] for c in cryptos]
+        self.alert_configs = {c['symbol']: c['alert_config'] for c in cryptos if c.get('alert_config')}
+        self.alert_symbols = list(self.alert_configs)
+        rules_by_symbol = {symbol: alert_rule_cache.get(symbol, alert_config) for symbol, alert_config in self.alert_configs.items()}
+        alert_rule_cache.prune(self.symbols)
+        self.rule_matrix = AlertRuleMatrix(self.alert_symbols, rules_by_symbol, config.get('alert_hysteresis'))
+        if previous: self.rule_matrix.carry_state(previous.rule_matrix)
+        else: self.rule_matrix.restore_disarmed(alert_state.disarmed_rules())
+
+        levels_by_symbol = {}
+        for symbol, alert_config in self.alert_configs.items():
+            levels_config = alert_config.get('conditions', {}).get('niveis_preco', {})
+            if not levels_config.get('enabled'): continue
+            try:
+                levels_by_symbol[symbol] = parse_price_levels(levels_config.get('value', ''))
+            except ValueError:
+                logging.warning(f"Lista de níveis de preço inválida para {symbol}. Condição ignorada.")
+        hysteresis = config.get('alert_hysteresis') or {}
+        self.level_index = PriceLevelIndex(levels_by_symbol, hysteresis.get('price_pct', 0.5))
+        self.level_index.carry_state(previous.level_index if previous else None)
+
+        if config.get('fetch_planner', True):
+            self.fetch_plans = {symbol: plan_symbol_fetch(rules_by_symbol.get(symbol, ()), config) for symbol in self.symbols}
+        else:
+            self.fetch_plans = {symbol: FULL_FETCH_PLAN for symbol in self.symbols}
+        self.volume_limits = {symbol: self.fetch_plans[symbol].limit for symbol, rules in rules_by_symbol.items()
+                              if any(r.condition == 'volume_anormal' for r in rules)}
+        # O pool de processos calcula todos os indicadores, então só recebe símbolos com a janela completa
+        self.full_symbols = [symbol for symbol in self.symbols if self.fetch_plans[symbol].limit == FULL_KLINES_LIMIT]
+        weight = sum(robust_services.klines_weight(p.limit) for p in self.fetch_plans.values() if p.limit)
+        ticker_only = sum(1 for p in self.fetch_plans.values() if not p.limit)
+        logging.info(f"Configuração v{version} carregada pelo monitoramento: {len(self.symbols)} símbolos, {len(self.alert_symbols)} com alertas, "
+                     f"{ticker_only} só com ticker, peso de klines por ciclo {weight}.")
+
+def run_monitoring_cycle(data_queue, stop_event, coingecko_mapping):
+    """
+    Ciclo principal de monitoramento que roda em segundo plano para buscar e analisar dados.
+    Lê a configuração do config_store e só recompila o plano quando a versão publicada muda.
+    """
     logging.info("Ciclo de monitoramento iniciado.")
-    
-    while not stop_event.is_set():
-        check_interval = config.get("check_interval_seconds", 300)
-        data_queue.put({'type': 'start_countdown', 'payload': {'seconds': check_interval}})
-        monitored_cryptos = copy.deepcopy(config.get("cryptos_to_monitor", []))
-        sound_config = config.get('sound_config', {})
-        if not monitored_cryptos:
-            time.sleep(5)
-            continue
-
-        ticker_data = get_ticker_data()
-        market_caps_data = get_market_caps_coingecko([c['symbol'] for c in monitored_cryptos], coingecko_mapping)
-
-        if not ticker_data:
-            logging.warning("Não foi possível obter os dados do ticker. Pulando este ciclo.")
-            time.sleep(config.get("check_interval_seconds", 300))
-            continue
-
-        for crypto_config in monitored_cryptos:
-            if stop_event.is_set(): break
-            symbol = crypto_config.get('symbol')
-            if not symbol or not robust_services.DataValidator.validate_symbol(symbol): continue
-
-            analysis_data = _analyze_symbol(symbol, ticker_data, market_caps_data.get(symbol))
-            data_queue.put({'type': 'data', 'payload': analysis_data})
-
-            if alert_config := crypto_config.get('alert_config'):
-                _check_and_trigger_alerts(symbol, alert_config, analysis_data, data_queue, sound_config)
-
-            time.sleep(0.2)
-
-        if not stop_event.is_set():
-            logging.info(f"Ciclo de monitoramento completo. Aguardando {config.get('check_interval_seconds', 300)}s.")
-            time.sleep(config.get("check_interval_seconds", 300))
+    process_backend = None
+    plan = None
+
+    try:
+        while not stop_event.is_set():
+            version, config = config_store.current()
+            if plan is None or plan.version != version:
+                plan = MonitoringPlan(version, config, plan)
+                analysis_series.configure(config)
+            check_interval = config.get("check_interval_seconds", 300)
+            data_queue.put({'type': 'start_countdown', 'payload': {'seconds': check_interval}})
+            sound_config = config.get('sound_config', {})
+            if not plan.symbols:
+                time.sleep(5)
+                continue
+
+            ticker_data = get_ticker_data()
+            market_caps_data = get_market_caps_coingecko(plan.symbols, coingecko_mapping)
+
+            if not ticker_data:
+                logging.warning("Não foi possível obter os dados do ticker. Pulando este ciclo.")
+                time.sleep(check_interval)
+                continue
+
+            # Com o backend de processos, os klines são buscados primeiro e os indicadores
+            # de todos os símbolos são calculados em paralelo fora desta thread.
+            process_backend = _prepare_process_backend(process_backend, config, plan.full_symbols)
+            pool_results = {}
+            volume_rows = {}
+            if process_backend:
+                try:
+                    for symbol in plan.full_symbols:
+                        if stop_event.is_set(): break
+                        df = get_klines_data(symbol, interval='1h')
+                        process_backend.update_candles(symbol, df)
+                        if symbol in plan.volume_limits and df is not None: volume_rows[symbol] = df['volume'].to_numpy(dtype=float)
+                    pool_results = process_backend.analyze(plan.full_symbols)
+                except Exception as e:
+                    # Pool quebrado (BrokenProcessPool, erro de pickle ou no worker): este ciclo
+                    # segue pela thread de monitoramento e o pool é recriado no próximo
+                    logging.error(f"Erro no backend de análise em processos: {e}. Usando a thread de monitoramento neste ciclo.")
+                    process_backend.shutdown()
+                    process_backend = None
+                    pool_results = {}
+
+            columns = AnalysisColumns(plan.alert_symbols)
+            alert_rows = {symbol: i for i, symbol in enumerate(plan.alert_symbols)}
+            cycle_analysis = {}
+            cycle_snapshots = []
+            fired_keys, active_keys = set(), set()
+
+            for symbol in plan.symbols:
+                if stop_event.is_set(): break
+                fetch_plan = plan.fetch_plans[symbol]
+                analysis_data = _analyze_symbol(symbol, ticker_data, market_caps_data.get(symbol), pool_results.get(symbol), fetch_plan,
+                                                volume_rows if symbol in plan.volume_limits else None)
+                analysis_data['volume_zscore'] = None
+                data_queue.put({'type': 'data', 'payload': analysis_data})
+                cycle_snapshots.append(analysis_data)
+                if symbol in alert_rows:
+                    row = alert_rows[symbol]
+                    columns.set_row(row, analysis_data)
+                    cycle_analysis[symbol] = analysis_data
+                    hits, active = plan.rule_matrix.evaluate(columns, slice(row, row + 1), IMMEDIATE_CONDITIONS)
+                    active_keys.update((symbol, plan.rule_matrix.rule_for(i, j).key) for i, j in active)
+                    triggers = [plan.rule_matrix.rule_for(i, j) for i, j in hits]
+                    if symbol in plan.level_index.symbols:
+                        triggers.extend(price_level_rules(*plan.level_index.update(symbol, analysis_data['current_price'])))
+                    if triggers:
+                        fired_keys.update((symbol, rule.key) for rule in triggers)
+                        _dispatch_alerts(symbol, plan.alert_configs[symbol], analysis_data, triggers, data_queue, sound_config)
+
+                if fetch_plan.limit and symbol not in pool_results: time.sleep(0.2)
+
+            # Z-score de volume em lote, com os volumes dos klines que o laço já buscou
+            if volume_rows:
+                for symbol, zscore in _compute_volume_zscores(volume_rows, config).items():
+                    if symbol not in cycle_analysis: continue
+                    cycle_analysis[symbol]['volume_zscore'] = zscore
+                    columns.volume_zscore[alert_rows[symbol]] = zscore
+
+            if config.get('analysis_series_enabled', True):
+                analysis_series.append(cycle_snapshots)
+
+            # Condições que dependem do ciclo inteiro, de todos os símbolos de uma vez
+            if volume_rows and not stop_event.is_set():
+                deferred = {}
+                hits, active = plan.rule_matrix.evaluate(columns, conditions=DEFERRED_CONDITIONS)
+                active_keys.update((plan.alert_symbols[i], plan.rule_matrix.rule_for(i, j).key) for i, j in active)
+                for symbol_index, condition_index in hits:
+                    deferred.setdefault(symbol_index, []).append(plan.rule_matrix.rule_for(symbol_index, condition_index))
+                for symbol_index, triggers in deferred.items():
+                    symbol = plan.alert_symbols[symbol_index]
+                    fired_keys.update((symbol, rule.key) for rule in triggers)
+                    _dispatch_alerts(symbol, plan.alert_configs[symbol], cycle_analysis[symbol], triggers, data_queue, sound_config)
+            if cycle_analysis:
+                # Condições ainda atendidas (mesmo desarmadas) mantêm o cooldown
+                alert_state.retain_active(cycle_analysis, active_keys | fired_keys)
+                alert_state.update_disarmed(plan.rule_matrix.disarmed_state())
+                alert_state.save_if_due()
+
+            screener_config = config.get('screener_config', {})
+            if screener_config.get('enabled') and not stop_event.is_set():
+                from market_screener import run_market_screener, get_screener_config
+                screener_result = run_market_screener(get_screener_config(config), ticker_data, stop_event)
+                data_queue.put({'type': 'screener', 'payload': screener_result})
+
+            if not stop_event.is_set():
+                memo_stats = indicator_memo.get_stats()
+                logging.info(f"Memo de indicadores: {memo_stats['hits']} acertos, {memo_stats['misses']} recálculos ({memo_stats['hit_rate']:.1f}%).")
+                logging.info(f"Ciclo de monitoramento completo. Aguardando {check_interval}s.")
+                time.sleep(check_interval)
+    finally:
+        if process_backend: process_backend.shutdown()
+        alert_state.save()
     logging.info("Ciclo de monitoramento terminado.")
 
 def run_single_symbol_update(symbol, config, data_queue, coingecko_mapping):
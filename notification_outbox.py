@@ -0,0 +1,96 @@
+# notification_outbox.py
+#
+# Caixa de saída durável das notificações. Cada mensagem é gravada em SQLite (modo WAL)
+# antes de ser entregue e só sai do estado 'pending' depois de enviada ou recusada de
+# forma definitiva, de modo que quedas de rede e reinícios do programa não perdem alertas.
+
+import os
+import time
+import sqlite3
+import logging
+from threading import Lock
+
+from app_state import get_application_path
+
+OUTBOX_DB_PATH = os.path.join(get_application_path(), "notification_outbox.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    target TEXT NOT NULL,
+    options TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, id);
+"""
+
+class NotificationOutbox:
+    """Fila persistente de notificações: enqueue, mark_sent, mark_failed e record_attempt."""
+    def __init__(self, path=OUTBOX_DB_PATH, retention_days=7):
+        self.path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Em WAL, NORMAL só sincroniza no checkpoint: o commit de cada enqueue fica barato
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.purge(retention_days)
+
+    def enqueue(self, channel, target, payload, options=None):
+        """Grava uma notificação pendente. Retorna o id da linha."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (channel, target, options, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (channel, target, options, payload, now, now))
+        return cursor.lastrowid
+
+    def pending(self, channel):
+        """Notificações ainda não entregues do canal, na ordem em que foram criadas."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, target, options, payload, attempts FROM outbox WHERE channel = ? AND status = 'pending' ORDER BY id",
+                (channel,)).fetchall()
+
+    def _set_status(self, ids, status, error=None, attempt=False):
+        if not ids: return
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE outbox SET status = ?, last_error = ?, updated_at = ?, attempts = attempts + ? WHERE id IN ({placeholders})",
+                (status, error, time.time(), 1 if attempt else 0, *ids))
+
+    def mark_sent(self, ids):
+        self._set_status(ids, 'sent', attempt=True)
+
+    def mark_failed(self, ids, error):
+        """Recusa definitiva (ex.: token inválido): a notificação não será mais tentada."""
+        self._set_status(ids, 'failed', error, attempt=True)
+
+    def record_attempt(self, ids, error):
+        """Tentativa que falhou, mas será repetida."""
+        self._set_status(ids, 'pending', error, attempt=True)
+
+    def counts(self):
+        """Quantidade de notificações por status."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def purge(self, retention_days=7):
+        """Remove as notificações já finalizadas (enviadas ou recusadas) mais antigas que 'retention_days'."""
+        cutoff = time.time() - retention_days * 86400
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM outbox WHERE status != 'pending' AND updated_at < ?", (cutoff,))
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao limpar a caixa de saída de notificações: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -26,23 +26,44 @@ def get_application_path():
 # SISTEMA DE CONSOLIDAÇÃO DE ALERTAS
 # ==========================================
 class AlertConsolidator:
-    def __init__(self, parent_window, app_instance=None):
+    """
+    Agrupa os alertas em lotes para exibir uma única janela. A thread de despacho dorme
+    em uma Condition até chegar um alerta; o lote é liberado quando atinge 'max_batch'
+    alertas ou quando o primeiro alerta pendente completa 'max_wait' segundos.
+    """
+    def __init__(self, parent_window, app_instance=None, max_wait=None, max_batch=None):
         self.parent_window = parent_window
         self.app_instance = app_instance  # Instância do CryptoApp para acessar config
+        config = getattr(app_instance, 'config', None) or {}
+        self.max_wait = float(max_wait if max_wait is not None else config.get('alert_batch_max_wait', 2.0))
+        self.max_batch = int(max_batch if max_batch is not None else config.get('alert_batch_max_size', 50))
         self.pending_alerts = deque()
         self.consolidated_window = None
         self.alert_lock = threading.Lock()
+        self.alert_ready = threading.Condition(self.alert_lock)
         self.is_showing = False
-        self.suppress_alerts = False  # Nova flag para pausar alertas
-        self.last_alert_time = 0  # Para agrupar alertas por tempo
+        self._suppress_alerts = False
+        self._batch_deadline = None  # Instante (monotônico) em que o lote pendente deve ser liberado
+        self._running = True
         
         # Inicia thread para processar alertas consolidados
         self.alert_thread = threading.Thread(target=self._process_alerts, daemon=True)
         self.alert_thread.start()
+
+    @property
+    def suppress_alerts(self):
+        return self._suppress_alerts
+
+    @suppress_alerts.setter
+    def suppress_alerts(self, value):
+        """Pausa/retoma a exibição dos alertas, acordando o despacho ao retomar."""
+        with self.alert_ready:
+            self._suppress_alerts = bool(value)
+            self.alert_ready.notify()
     
     def add_alert(self, symbol, trigger, message, sound=None):
         """Adiciona um alerta à fila de consolidação."""
-        with self.alert_lock:
+        with self.alert_ready:
             alert_data = {
                 'symbol': symbol,
                 'trigger': trigger,
@@ -51,37 +72,45 @@ class AlertConsolidator:
                 'timestamp': datetime.datetime.now().strftime("%H:%M:%S")
             }
             self.pending_alerts.append(alert_data)
+            if self._batch_deadline is None:
+                self._batch_deadline = time.monotonic() + self.max_wait
+            self.alert_ready.notify()
             print(f"LOG: Alerta adicionado à fila de consolidação: {symbol} - {trigger}")
-    
+
+    def _can_flush(self):
+        return bool(self.pending_alerts) and not self.is_showing and not self._suppress_alerts
+
     def _process_alerts(self):
-        """Processa alertas em background sem bloquear a thread principal."""
+        """Thread de despacho: só acorda quando há alerta novo, janela fechada ou prazo vencido."""
         while True:
-            alerts_to_show = []
-            should_show = False
-
-            with self.alert_lock:
-                if self.pending_alerts and not self.is_showing and not self.suppress_alerts:
-                    current_time = time.time()
-
-                    # Decide se deve iniciar um novo lote de alertas
-                    if self.last_alert_time == 0 or (current_time - self.last_alert_time) > 3.0:
-                        should_show = True
-
-            # Se decidimos mostrar, esperamos um pouco para agrupar mais alertas
-            if should_show:
-                time.sleep(2.0) # Dorme fora do lock para não bloquear a adição de novos alertas
-                
-                with self.alert_lock:
-                    # Coleta todos os alertas que chegaram nesse meio tempo
-                    while self.pending_alerts:
-                        alerts_to_show.append(self.pending_alerts.popleft())
-
-                    if alerts_to_show:
-                        self.last_alert_time = time.time()
-                        # Agenda a exibição da janela na thread principal
-                        self.parent_window.after(0, self._show_consolidated_alerts, alerts_to_show)
-
-            time.sleep(0.3) # Loop de verificação principal
+            with self.alert_ready:
+                while self._running:
+                    if self._can_flush():
+                        if len(self.pending_alerts) >= self.max_batch: break
+                        remaining = self._batch_deadline - time.monotonic()
+                        if remaining <= 0: break
+                        self.alert_ready.wait(remaining)
+                    else:
+                        self.alert_ready.wait()
+                if not self._running: return
+
+                alerts_to_show = list(self.pending_alerts)
+                self.pending_alerts.clear()
+                self._batch_deadline = None
+                # Marca como exibindo já aqui: a janela só é criada depois, na thread principal
+                self.is_showing = True
+
+            # Agenda a exibição da janela na thread principal
+            try:
+                self.parent_window.after(0, self._show_consolidated_alerts, alerts_to_show)
+            except (RuntimeError, tk.TclError):
+                return
+
+    def stop(self):
+        """Encerra a thread de despacho."""
+        with self.alert_ready:
+            self._running = False
+            self.alert_ready.notify()
     
     def _show_consolidated_alerts(self, alerts):
         """Mostra uma janela consolidada com todos os alertas."""
@@ -207,9 +236,6 @@ class AlertConsolidator:
         # Toca som consolidado automaticamente
         self._play_consolidated_sound(alerts)
         
-        # Envia para Telegram se configurado
-        self._send_consolidated_telegram(alerts)
-        
         print(f"LOG: Janela consolidada mostrada com {len(alerts)} alerta(s)")
     
     def _play_consolidated_sound(self, alerts):
@@ -230,54 +256,6 @@ class AlertConsolidator:
                     play_alert_sound(alert['sound'])
                     break
     
-    def _send_consolidated_telegram(self, alerts):
-        """Envia alertas consolidados para o Telegram."""
-        # Tenta acessar a configuração
-        try:
-            if self.app_instance and hasattr(self.app_instance, 'config'):
-                bot_token = self.app_instance.config.get('telegram_bot_token')
-                chat_id = self.app_instance.config.get('telegram_chat_id')
-            elif hasattr(self.parent_window, 'config'):
-                bot_token = self.parent_window.config.get('telegram_bot_token')
-                chat_id = self.parent_window.config.get('telegram_chat_id')
-            else:
-                print("LOG: Não foi possível acessar configurações do Telegram")
-                return
-        except Exception as e:
-            print(f"ERRO: Erro ao acessar configurações do Telegram: {e}")
-            return
-        
-        if not bot_token or "AQUI" in str(bot_token) or not chat_id or "AQUI" in str(chat_id):
-            return
-        
-        # Agrupa alertas por símbolo para uma mensagem mais clara
-        grouped_alerts = {}
-        for alert in alerts:
-            symbol = alert['symbol']
-            if symbol not in grouped_alerts:
-                grouped_alerts[symbol] = []
-            grouped_alerts[symbol].append(alert)
-
-        # Cria mensagem consolidada
-        message = f"🚨 *{len(alerts)} Alerta(s) Consolidado(s)*\n\n"
-        
-        # Resumo por moeda
-        for symbol, symbol_alerts in grouped_alerts.items():
-            message += f"📊 *{symbol}* ({len(symbol_alerts)} alerta(s))\n"
-            for alert in symbol_alerts:
-                message += f"  - {alert['trigger']} às {alert['timestamp']}\n"
-            message += "\n"
-
-        # Adiciona detalhes completos de cada alerta
-        message += "--- *Detalhes* ---\n\n"
-        for alert in alerts:
-            message += f"*{alert['symbol']}* - {alert['trigger']}\n"
-            # Remove a parte inicial "ALERTA: ..." da mensagem para não ser redundante
-            clean_message = alert['message'].split('\n\n', 1)[-1]
-            message += f"```{clean_message}```\n\n"
-        
-        send_telegram_alert(bot_token, chat_id, message)
-    
     def _on_mousewheel(self, event):
         """Permite a rolagem da janela de alertas com o scroll do mouse."""
         if hasattr(self, 'canvas'):
@@ -288,11 +266,16 @@ class AlertConsolidator:
                 self.canvas.yview_scroll(-1, "units")
 
     def _close_consolidated_window(self):
-        """Fecha a janela consolidada."""
+        """Fecha a janela consolidada e libera o próximo lote, se houver."""
         if self.consolidated_window:
             self.consolidated_window.destroy()
             self.consolidated_window = None
-        self.is_showing = False
+        with self.alert_ready:
+            self.is_showing = False
+            if self.pending_alerts:
+                # Alertas que chegaram com a janela aberta já esperaram o suficiente
+                self._batch_deadline = min(self._batch_deadline, time.monotonic())
+            self.alert_ready.notify()
         print("LOG: Janela consolidada fechada")
     
     def _center_window(self, window):
@@ -328,17 +311,211 @@ def play_alert_sound(sound_path_str):
     else:
         print(f"ERRO: Arquivo de som não encontrado em '{sound_path}'.")
 
-def send_telegram_alert(bot_token, chat_id, message):
-    """Envia uma mensagem de alerta para um chat do Telegram."""
+def send_telegram_alert(bot_token, chat_id, message, parse_mode='Markdown'):
+    """Enfileira uma mensagem de alerta para um chat do Telegram (não bloqueia)."""
     if not bot_token or "AQUI" in str(bot_token) or not chat_id or "AQUI" in str(chat_id):
         print("LOG: Token ou Chat ID do Telegram não configurado. Pulando notificação.")
-        return
-        
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {'chat_id': chat_id, 'text': message, 'parse_mode': 'Markdown'}
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        print("LOG: Alerta enviado para o Telegram.")
-    except Exception as e:
-        print(f"--> ERRO ao enviar para o Telegram: {e}")
\ No newline at end of file
+        return False
+    return telegram_worker.send(bot_token, chat_id, message, parse_mode)
+
+# ==========================================
+# ENTREGA ASSÍNCRONA PARA O TELEGRAM
+# ==========================================
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+TELEGRAM_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+def split_telegram_message(text, limit=TELEGRAM_MAX_MESSAGE_LENGTH):
+    """Divide o texto em partes de até 'limit' caracteres, preferindo quebrar em linhas."""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0: cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text: parts.append(text)
+    return parts
+
+class TelegramDeliveryWorker:
+    """
+    Thread que entrega as mensagens do Telegram fora da thread da interface. Toda mensagem
+    passa antes pela caixa de saída em SQLite (notification_outbox.py), de onde a entrega
+    é retomada após um reinício. Cada chat tem sua fila: mensagens acumuladas são agrupadas
+    em uma só (até 4096 caracteres), respeitando um intervalo mínimo por chat, o
+    'retry_after' das respostas 429 e novas tentativas com backoff exponencial para falhas
+    de rede e erros 5xx, sem descartar nada enquanto a rede estiver fora.
+    """
+    CHANNEL = 'telegram'
+
+    def __init__(self, outbox_path=None, max_queue=5000, min_interval=1.0, base_backoff=2.0, max_backoff=120.0):
+        self.outbox_path = outbox_path
+        self.max_queue = max_queue
+        self.min_interval = min_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        self._ready = threading.Condition()
+        self._outbox = None
+        self._queues = {}        # (token, chat_id, parse_mode) -> deque de (ids, texto)
+        self._next_allowed = {}  # (token, chat_id, parse_mode) -> instante monotônico do próximo envio
+        self._attempts = {}
+        self._pending = 0
+        self._thread = None
+        self._closing = False
+        self.stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'retries': 0}
+
+    def _get_outbox(self):
+        """Abre a caixa de saída na primeira utilização (com o lock). Sem ela, a fila fica só em memória."""
+        if self._outbox is None:
+            from notification_outbox import NotificationOutbox, OUTBOX_DB_PATH
+            try:
+                self._outbox = NotificationOutbox(self.outbox_path or OUTBOX_DB_PATH)
+            except Exception as e:
+                print(f"ERRO: Não foi possível abrir a caixa de saída de notificações: {e}")
+                self._outbox = False
+        return self._outbox
+
+    def _start(self):
+        if self._thread is None:
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def resume(self):
+        """Recarrega as mensagens pendentes da caixa de saída (ex.: após reinício) e inicia a entrega."""
+        with self._ready:
+            outbox = self._get_outbox()
+            if not outbox: return 0
+            queued = {row_id for pending in self._queues.values() for ids, _ in pending for row_id in ids}
+            rows = [row for row in outbox.pending(self.CHANNEL) if row[0] not in queued]
+            for row_id, chat_id, options, text, _ in rows:
+                options = json.loads(options or '{}')
+                key = (options.get('bot_token', ''), chat_id, options.get('parse_mode'))
+                self._queues.setdefault(key, deque()).append(((row_id,), text))
+                self._pending += 1
+            if rows:
+                print(f"LOG: {len(rows)} notificação(ões) pendente(s) retomada(s) da caixa de saída.")
+                self._start()
+                self._ready.notify()
+            return len(rows)
+
+    def send(self, bot_token, chat_id, text, parse_mode='Markdown'):
+        """Grava a mensagem na caixa de saída e a enfileira. Retorna False se a fila estiver cheia."""
+        key = (str(bot_token), str(chat_id), parse_mode)
+        with self._ready:
+            if self._pending >= self.max_queue:
+                self.stats['dropped'] += 1
+                print(f"ERRO: Fila do Telegram cheia ({self.max_queue}). Mensagem descartada.")
+                return False
+            outbox = self._get_outbox()
+            ids = ()
+            if outbox:
+                options = json.dumps({'bot_token': key[0], 'parse_mode': parse_mode})
+                ids = (outbox.enqueue(self.CHANNEL, key[1], text, options),)
+            self._queues.setdefault(key, deque()).append((ids, text))
+            self._pending += 1
+            self._start()
+            self._ready.notify()
+        return True
+
+    def _next_batch(self, key):
+        """Retira da fila do chat o maior grupo de mensagens que cabe em uma só (com o lock)."""
+        pending = self._queues[key]
+        head_ids, head = pending.popleft()
+        if len(head) > TELEGRAM_MAX_MESSAGE_LENGTH:
+            # Só a última parte carrega os ids: a linha é finalizada quando a mensagem inteira sai
+            first, *rest = split_telegram_message(head)
+            pending.extendleft(reversed([((), part) for part in rest[:-1]] + [(head_ids, rest[-1])]))
+            self._pending += len(rest)
+            return (), first, 1
+        ids, texts = list(head_ids), [head]
+        size = len(head)
+        while pending and size + len(TELEGRAM_SEPARATOR) + len(pending[0][1]) <= TELEGRAM_MAX_MESSAGE_LENGTH:
+            next_ids, text = pending.popleft()
+            size += len(TELEGRAM_SEPARATOR) + len(text)
+            ids.extend(next_ids)
+            texts.append(text)
+        return tuple(ids), TELEGRAM_SEPARATOR.join(texts), len(texts)
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while True:
+                    now = time.monotonic()
+                    ready = [key for key, pending in self._queues.items() if pending and self._next_allowed.get(key, 0) <= now]
+                    if ready or (self._closing and not self._pending): break
+                    waits = [self._next_allowed[key] - now for key, pending in self._queues.items() if pending]
+                    self._ready.wait(min(waits) if waits else None)
+                if not ready:
+                    self._thread = None
+                    return
+                key = min(ready, key=lambda k: self._next_allowed.get(k, 0))
+                ids, text, count = self._next_batch(key)
+                self._pending -= count
+
+            retry_after, error = self._deliver(key, text)
+
+            with self._ready:
+                outbox = self._get_outbox()
+                if retry_after is None:
+                    self._attempts.pop(key, None)
+                    self._next_allowed[key] = time.monotonic() + self.min_interval
+                    if outbox and error: outbox.mark_failed(ids, error)
+                    elif outbox: outbox.mark_sent(ids)
+                    continue
+                self._attempts[key] = self._attempts.get(key, 0) + 1
+                self.stats['retries'] += 1
+                if outbox: outbox.record_attempt(ids, error)
+                # Devolve o texto já agrupado para o início da fila do chat
+                self._queues[key].appendleft((ids, text))
+                self._pending += 1
+                self._next_allowed[key] = time.monotonic() + retry_after
+
+    def _deliver(self, key, text):
+        """
+        Envia uma mensagem. Retorna (espera, erro): espera None indica que não há o que
+        repetir (sucesso, ou erro definitivo quando 'erro' vem preenchido); caso contrário,
+        os segundos a aguardar antes da próxima tentativa.
+        """
+        bot_token, chat_id, parse_mode = key
+        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode: payload['parse_mode'] = parse_mode
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** self._attempts.get(key, 0))
+        try:
+            response = self.session.post(url, json=payload, timeout=10)
+        except requests.RequestException as e:
+            print(f"--> ERRO ao enviar para o Telegram: {e}. Nova tentativa em {backoff:.0f}s.")
+            return backoff, str(e)
+
+        if response.ok:
+            self.stats['sent'] += 1
+            print("LOG: Alerta enviado para o Telegram.")
+            return None, None
+        try:
+            description = response.json()
+        except ValueError:
+            description = {}
+        error = f"{response.status_code} {description.get('description', '')}".strip()
+        if response.status_code == 429:
+            retry_after = (description.get('parameters') or {}).get('retry_after', backoff)
+            print(f"LOG: Limite de envio do Telegram atingido. Aguardando {retry_after}s.")
+            return float(retry_after), error
+        if response.status_code >= 500:
+            print(f"--> ERRO do Telegram ({response.status_code}). Nova tentativa em {backoff:.0f}s.")
+            return backoff, error
+        if response.status_code == 400 and parse_mode and 'parse' in error.lower():
+            # Texto com caracteres que quebram o Markdown: envia como texto simples
+            return self._deliver((bot_token, chat_id, None), text)
+        self.stats['failed'] += 1
+        print(f"--> ERRO ao enviar para o Telegram: {error}")
+        return None, error
+
+    def stop(self, timeout=5.0):
+        """Tenta entregar o que ainda está na fila em até 'timeout' segundos; o resto fica na caixa de saída."""
+        with self._ready:
+            self._closing = True
+            thread = self._thread
+            self._ready.notify()
+        if thread: thread.join(timeout)
+
+telegram_worker = TelegramDeliveryWorker()
@@ -0,0 +1,219 @@
+# notification_sinks.py
+#
+# Destinos das notificações remotas (Telegram, webhooks HTTP, e-mail e arquivo JSONL).
+# Cada destino tem sua própria thread de entrega, com intervalo mínimo entre envios e
+# timeout próprios: um destino lento ou fora do ar nunca atrasa os demais.
+
+import abc
+import json
+import time
+import logging
+import smtplib
+import threading
+import datetime
+from collections import deque
+from email.message import EmailMessage
+
+import requests
+
+from notification_service import send_telegram_alert
+
+class NotificationSink(abc.ABC):
+    """Interface dos destinos: 'deliver' recebe uma lista de alertas (dicts) e envia de uma vez."""
+    kind = 'sink'
+
+    def __init__(self, name=None, min_interval=0.0, timeout=10.0, max_retries=3):
+        self.name = name or self.kind
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    @abc.abstractmethod
+    def deliver(self, alerts):
+        """Envia o lote; deve levantar exceção em caso de falha (o worker cuida das novas tentativas)."""
+
+    @staticmethod
+    def format_text(alerts):
+        """Texto único com todas as mensagens do lote."""
+        return "\n\n".join(alert.get('message', '') for alert in alerts)
+
+class TelegramSink(NotificationSink):
+    """Um ou mais chats do Telegram. A entrega em si fica com o telegram_worker (durável)."""
+    kind = 'telegram'
+
+    def __init__(self, bot_token, chat_ids, **kwargs):
+        super().__init__(**kwargs)
+        self.bot_token = bot_token
+        self.chat_ids = [str(chat_id).strip() for chat_id in chat_ids if str(chat_id).strip()]
+
+    def deliver(self, alerts):
+        for chat_id in self.chat_ids:
+            for alert in alerts:
+                send_telegram_alert(self.bot_token, chat_id, alert.get('message', ''))
+
+class WebhookSink(NotificationSink):
+    """POST em JSON ({'alerts': [...]}) para uma URL qualquer."""
+    kind = 'webhook'
+
+    def __init__(self, url, headers=None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.headers = dict(headers or {})
+        self.session = requests.Session()
+
+    def deliver(self, alerts):
+        body = json.dumps({'alerts': alerts}, ensure_ascii=False, default=str)
+        headers = {'Content-Type': 'application/json', **self.headers}
+        response = self.session.post(self.url, data=body.encode('utf-8'), headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+
+class EmailSink(NotificationSink):
+    """E-mail via SMTP (com STARTTLS e login opcionais)."""
+    kind = 'email'
+
+    def __init__(self, host, recipients, port=587, sender=None, username=None, password=None, use_tls=True, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = int(port)
+        self.recipients = [recipients] if isinstance(recipients, str) else list(recipients)
+        self.sender = sender or username
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+
+    def deliver(self, alerts):
+        symbols = sorted({alert.get('symbol', '') for alert in alerts})
+        message = EmailMessage()
+        message['Subject'] = f"🚨 {len(alerts)} Alerta(s): {', '.join(symbols)}"
+        message['From'] = self.sender
+        message['To'] = ", ".join(self.recipients)
+        message.set_content(self.format_text(alerts))
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls: smtp.starttls()
+            if self.username: smtp.login(self.username, self.password or '')
+            smtp.send_message(message)
+
+class FileSink(NotificationSink):
+    """Uma linha JSON por alerta, acrescentada a um arquivo local."""
+    kind = 'file'
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def deliver(self, alerts):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False, default=str) + "\n")
+
+SINK_TYPES = {sink.kind: sink for sink in (TelegramSink, WebhookSink, EmailSink, FileSink)}
+
+def build_sinks(config):
+    """
+    Cria os destinos a partir de 'notification_sinks' do config.json. O Telegram das
+    configurações principais (telegram_bot_token / telegram_chat_id, com vários chats
+    separados por vírgula) continua valendo e entra como mais um destino.
+    """
+    sinks = []
+    bot_token, chat_ids = config.get('telegram_bot_token'), str(config.get('telegram_chat_id') or '')
+    if bot_token and "AQUI" not in str(bot_token) and chat_ids and "AQUI" not in chat_ids:
+        sinks.append(TelegramSink(bot_token, chat_ids.split(',')))
+    for sink_config in config.get('notification_sinks', ()):
+        options = dict(sink_config)
+        sink_type = SINK_TYPES.get(options.pop('type', None))
+        if options.pop('enabled', True) is False:
+            continue
+        if not sink_type:
+            logging.warning(f"Tipo de destino de notificações desconhecido: '{sink_config.get('type')}'.")
+            continue
+        try:
+            sinks.append(sink_type(**options))
+        except TypeError as e:
+            logging.error(f"Configuração inválida para o destino de notificações '{sink_config.get('type')}': {e}")
+    return sinks
+
+class _SinkWorker:
+    """Fila e thread de um destino: junta os lotes que chegam enquanto espera o intervalo mínimo."""
+    def __init__(self, sink):
+        self.sink = sink
+        self.pending = deque()
+        self.ready = threading.Condition()
+        self.running = True
+        self.stats = {'delivered': 0, 'failed': 0}
+        self.thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def put(self, alerts):
+        with self.ready:
+            self.pending.extend(alerts)
+            self.ready.notify()
+
+    def _run(self):
+        next_allowed = 0.0
+        while True:
+            with self.ready:
+                while self.running and not self.pending:
+                    self.ready.wait()
+                if not self.pending: return
+            wait = next_allowed - time.monotonic()
+            if wait > 0: time.sleep(wait)
+            with self.ready:
+                batch = list(self.pending)
+                self.pending.clear()
+
+            for attempt in range(self.sink.max_retries + 1):
+                try:
+                    self.sink.deliver(batch)
+                    self.stats['delivered'] += len(batch)
+                    break
+                except Exception as e:
+                    if attempt == self.sink.max_retries or not self.running:
+                        self.stats['failed'] += len(batch)
+                        logging.error(f"Falha ao enviar {len(batch)} alerta(s) para '{self.sink.name}': {e}")
+                        break
+                    time.sleep(min(30, 2 ** attempt))
+            next_allowed = time.monotonic() + self.sink.min_interval
+
+    def close(self):
+        """Pede o encerramento: a thread entrega o que já está na fila e termina."""
+        with self.ready:
+            self.running = False
+            self.ready.notify()
+
+    def stop(self, timeout):
+        self.close()
+        self.thread.join(timeout)
+
+class NotificationDispatcher:
+    """Distribui cada lote de alertas para todos os destinos ao mesmo tempo."""
+    def __init__(self, sinks=()):
+        self._lock = threading.Lock()
+        self._workers = [_SinkWorker(sink) for sink in sinks]
+
+    def configure(self, sinks):
+        """Troca os destinos; os antigos terminam o que já tinham recebido em segundo plano."""
+        with self._lock:
+            old_workers, self._workers = self._workers, [_SinkWorker(sink) for sink in sinks]
+        for worker in old_workers:
+            threading.Thread(target=worker.stop, args=(worker.sink.timeout * 2,), daemon=True).start()
+
+    def publish(self, alerts):
+        """Enfileira o lote em cada destino (não bloqueia)."""
+        alerts = [dict(alert, timestamp=alert.get('timestamp') or datetime.datetime.now().isoformat(timespec='seconds')) for alert in alerts]
+        with self._lock:
+            for worker in self._workers:
+                worker.put(alerts)
+
+    @property
+    def sinks(self):
+        return [worker.sink for worker in self._workers]
+
+    def stop(self, timeout=3.0):
+        """Dá até 'timeout' segundos (no total) para os destinos esvaziarem as filas."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+        for worker in workers:
+            worker.thread.join(max(0.0, deadline - time.monotonic()))
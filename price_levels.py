@@ -0,0 +1,92 @@
+# price_levels.py
+#
+# Índice de níveis de preço (escadas/grids) por símbolo. Os níveis ficam em listas
+# ordenadas e, a cada ciclo, os níveis cruzados entre o preço anterior e o atual são
+# encontrados com bisect em O(log n + k), independentemente de quantos níveis existem.
+
+import re
+from bisect import bisect_left, bisect_right, insort
+
+from alert_rules import AlertRule
+
+def parse_price_levels(text):
+    """Converte '100, 105.5; 110' em uma tupla ordenada de níveis positivos (sem repetições)."""
+    parts = [part for part in re.split(r'[;,\s]+', str(text).strip()) if part]
+    levels = sorted({float(part) for part in parts})
+    if any(level <= 0 for level in levels):
+        raise ValueError("Os níveis de preço devem ser maiores que zero.")
+    return tuple(levels)
+
+class PriceLevelIndex:
+    """
+    Níveis de preço ordenados por símbolo, com o último preço visto e o estado de rearme.
+    Um nível cruzado para cima só volta a disparar para cima depois que o preço recua
+    além da margem de histerese (e vice-versa), evitando repetições com o preço oscilando.
+    """
+    def __init__(self, levels_by_symbol, hysteresis_pct=0.5):
+        self.levels = {symbol: list(levels) for symbol, levels in levels_by_symbol.items() if levels}
+        self.hysteresis = hysteresis_pct / 100
+        self.last_price = {}
+        # Níveis desarmados em listas ordenadas: o rearme é um corte com bisect na ponta da lista
+        self.disarmed_up = {symbol: [] for symbol in self.levels}
+        self.disarmed_down = {symbol: [] for symbol in self.levels}
+
+    @property
+    def symbols(self):
+        return self.levels.keys()
+
+    def update(self, symbol, price):
+        """
+        Registra o preço atual do símbolo. Retorna (níveis cruzados para cima, níveis
+        cruzados para baixo) desde o preço anterior, já filtrados pelo estado de rearme.
+        """
+        levels = self.levels.get(symbol)
+        if not levels or not price or price <= 0: return (), ()
+        previous = self.last_price.get(symbol)
+        self.last_price[symbol] = price
+
+        disarmed_up, disarmed_down = self.disarmed_up[symbol], self.disarmed_down[symbol]
+        # Rearma os níveis de que o preço se afastou além da histerese: para cima, os acima de
+        # price / (1 - h); para baixo, os abaixo de price / (1 + h)
+        if disarmed_up: del disarmed_up[bisect_right(disarmed_up, price / (1 - self.hysteresis)):]
+        if disarmed_down: del disarmed_down[:bisect_left(disarmed_down, price / (1 + self.hysteresis))]
+        if previous is None or price == previous: return (), ()
+
+        if price > previous:
+            crossed = levels[bisect_right(levels, previous):bisect_right(levels, price)]
+            fired = tuple(level for level in crossed if not _contains(disarmed_up, level))
+            for level in fired: insort(disarmed_up, level)
+            return fired, ()
+        crossed = levels[bisect_left(levels, price):bisect_left(levels, previous)]
+        fired = tuple(level for level in reversed(crossed) if not _contains(disarmed_down, level))
+        for level in fired: insort(disarmed_down, level)
+        return (), fired
+
+    def carry_state(self, previous):
+        """Herda o último preço e o estado de rearme da versão anterior do índice."""
+        if previous is None: return
+        for symbol in self.levels:
+            if symbol in previous.last_price:
+                self.last_price[symbol] = previous.last_price[symbol]
+            if symbol in previous.levels:
+                current = set(self.levels[symbol])
+                self.disarmed_up[symbol] = [level for level in previous.disarmed_up[symbol] if level in current]
+                self.disarmed_down[symbol] = [level for level in previous.disarmed_down[symbol] if level in current]
+
+def _contains(sorted_levels, level):
+    i = bisect_left(sorted_levels, level)
+    return i < len(sorted_levels) and sorted_levels[i] == level
+
+def _format_levels(levels):
+    return ", ".join(f"${level:,.8g}" for level in levels)
+
+def price_level_rules(crossed_up, crossed_down):
+    """Regras disparadas (no formato de AlertRule) para os níveis cruzados em um ciclo."""
+    rules = []
+    if crossed_up:
+        rules.append(AlertRule('niveis_preco', 'NIVEL_PRECO_ACIMA', crossed_up,
+                               lambda d: f"Preço cruzou para cima o(s) nível(is) {_format_levels(crossed_up)}"))
+    if crossed_down:
+        rules.append(AlertRule('niveis_preco', 'NIVEL_PRECO_ABAIXO', crossed_down,
+                               lambda d: f"Preço cruzou para baixo o(s) nível(is) {_format_levels(crossed_down)}"))
+    return rules
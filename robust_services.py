@@ -101,6 +101,13 @@ class BinanceRateLimiter:
 
 rate_limiter = BinanceRateLimiter()
 
+def klines_weight(limit):
+    """Peso de uma chamada /api/v3/klines da Binance de acordo com o 'limit'."""
+    if limit < 100: return 1
+    if limit < 500: return 2
+    if limit <= 1000: return 5
+    return 10
+
 # ==========================================
 # 2. CACHE DE DADOS
 # ==========================================
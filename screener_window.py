@@ -0,0 +1,156 @@
+# screener_window.py
+
+import tkinter as tk
+import ttkbootstrap as ttkb
+import threading
+from datetime import datetime
+from tkinter import messagebox
+
+from market_screener import run_market_screener, get_screener_config
+
+SCREENER_CONDITION_LABELS = {
+    'rsi_sobrevendido': ("RSI Sobrevendido (<=)", True),
+    'rsi_sobrecomprado': ("RSI Sobrecomprado (>=)", True),
+    'bollinger_abaixo': ("Preço Abaixo da Banda Inferior", False),
+    'bollinger_acima': ("Preço Acima da Banda Superior", False),
+    'mme_cruz_dourada': ("Cruz Dourada (MME 50/200)", False),
+    'mme_cruz_morte': ("Cruz da Morte (MME 50/200)", False),
+    'volume_mcap': ("Volume 24h / Capitalização (% >=)", True),
+}
+
+class ScreenerWindow(ttkb.Toplevel):
+    """Janela com o ranking do screener de mercado e suas configurações."""
+    def __init__(self, master, parent_app):
+        super().__init__(master)
+        self.parent_app = parent_app
+        self.title("Screener de Mercado")
+        self.geometry("1100x700")
+        self.minsize(900, 550)
+
+        self.screener_config = get_screener_config(self.parent_app.config)
+        self.setup_ui()
+        self.parent_app.center_toplevel_on_main(self)
+        self.transient(self.master)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if self.parent_app.latest_screener_result:
+            self.display_results(self.parent_app.latest_screener_result)
+
+    def setup_ui(self):
+        main_frame = ttkb.Frame(self, padding=15)
+        main_frame.pack(expand=True, fill='both')
+
+        settings_frame = ttkb.LabelFrame(main_frame, text=" Condições ", padding=10)
+        settings_frame.pack(side='left', fill='y', padx=(0, 10))
+        self.condition_vars = {}
+        for row, (key, (label, has_value)) in enumerate(SCREENER_CONDITION_LABELS.items()):
+            cond = self.screener_config['conditions'][key]
+            enabled_var = tk.BooleanVar(value=cond.get('enabled', False))
+            ttkb.Checkbutton(settings_frame, text=label, variable=enabled_var, bootstyle="round-toggle").grid(row=row, column=0, sticky='w', pady=3)
+            value_var = None
+            if has_value:
+                value_var = tk.StringVar(value=str(cond.get('value', '')))
+                ttkb.Entry(settings_frame, textvariable=value_var, width=8).grid(row=row, column=1, padx=(10, 0), pady=3)
+            self.condition_vars[key] = (enabled_var, value_var)
+
+        general_rows = [("Volume mínimo 24h (USDT):", 'min_quote_volume'), ("Orçamento de peso da API:", 'weight_budget'),
+                        ("Máximo de resultados:", 'top_n')]
+        self.general_vars = {}
+        base_row = len(SCREENER_CONDITION_LABELS)
+        ttkb.Separator(settings_frame).grid(row=base_row, column=0, columnspan=2, sticky='ew', pady=10)
+        for offset, (label, key) in enumerate(general_rows, start=1):
+            ttkb.Label(settings_frame, text=label).grid(row=base_row + offset, column=0, sticky='w', pady=3)
+            var = tk.StringVar(value=str(self.screener_config[key]))
+            ttkb.Entry(settings_frame, textvariable=var, width=12).grid(row=base_row + offset, column=1, padx=(10, 0), pady=3)
+            self.general_vars[key] = var
+
+        self.enabled_var = tk.BooleanVar(value=self.screener_config.get('enabled', False))
+        ttkb.Checkbutton(settings_frame, text="Executar a cada ciclo de monitoramento", variable=self.enabled_var,
+                         bootstyle="round-toggle").grid(row=base_row + len(general_rows) + 1, column=0, columnspan=2, sticky='w', pady=(10, 3))
+        ttkb.Button(settings_frame, text="💾 Salvar Configurações", command=self.save_settings,
+                    bootstyle="secondary").grid(row=base_row + len(general_rows) + 2, column=0, columnspan=2, sticky='ew', pady=(10, 0))
+
+        results_frame = ttkb.Frame(main_frame)
+        results_frame.pack(side='left', expand=True, fill='both')
+        self.status_label = ttkb.Label(results_frame, text="Nenhuma execução ainda.", bootstyle="secondary")
+        self.status_label.pack(fill='x', pady=(0, 5))
+
+        columns = ('rank', 'symbol', 'strength', 'price', 'change', 'rsi', 'matches')
+        headings = {'rank': ('#', 40), 'symbol': ('Símbolo', 110), 'strength': ('Força', 70), 'price': ('Preço', 110),
+                    'change': ('24h %', 80), 'rsi': ('RSI', 60), 'matches': ('Condições', 400)}
+        tree_frame = ttkb.Frame(results_frame)
+        tree_frame.pack(expand=True, fill='both')
+        self.tree = ttkb.Treeview(tree_frame, columns=columns, show='headings', bootstyle="info")
+        for col in columns:
+            text, width = headings[col]
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor='w' if col == 'matches' else 'center', stretch=col == 'matches')
+        scrollbar = ttkb.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', expand=True, fill='both')
+
+        self.run_button = ttkb.Button(results_frame, text="🔎 Executar Agora", command=self.start_screener_thread, bootstyle="info")
+        self.run_button.pack(fill='x', pady=(10, 0))
+
+    def _read_settings(self):
+        """Lê os campos da janela e devolve a configuração do screener validada."""
+        new_config = get_screener_config(self.parent_app.config)
+        new_config['enabled'] = self.enabled_var.get()
+        for key, (enabled_var, value_var) in self.condition_vars.items():
+            new_config['conditions'][key]['enabled'] = enabled_var.get()
+            if value_var is not None:
+                new_config['conditions'][key]['value'] = float(value_var.get().replace(',', '.'))
+        for key, var in self.general_vars.items():
+            new_config[key] = int(float(var.get().replace(',', '.')))
+        return new_config
+
+    def save_settings(self):
+        try:
+            new_config = self._read_settings()
+        except ValueError:
+            messagebox.showerror("Valor Inválido", "Verifique os valores numéricos das condições.", parent=self)
+            return
+        self.parent_app.config['screener_config'] = new_config
+        self.parent_app.save_config()
+        self.screener_config = new_config
+        messagebox.showinfo("Salvo", "Configurações do screener salvas.", parent=self)
+
+    def start_screener_thread(self):
+        """Executa o screener em uma thread separada para não bloquear a UI."""
+        try:
+            screener_config = self._read_settings()
+        except ValueError:
+            messagebox.showerror("Valor Inválido", "Verifique os valores numéricos das condições.", parent=self)
+            return
+        self.run_button['state'] = 'disabled'
+        self.run_button['text'] = 'Analisando o mercado...'
+        threading.Thread(target=self.run_screener, args=(screener_config,), daemon=True).start()
+
+    def run_screener(self, screener_config):
+        try:
+            result = run_market_screener(screener_config)
+            self.after(0, self.parent_app.update_screener_results, result)
+        except Exception as e:
+            self.after(0, lambda: messagebox.showerror("Erro no Screener", str(e), parent=self))
+        finally:
+            self.after(0, self.finalize_screener_ui)
+
+    def finalize_screener_ui(self):
+        self.run_button['state'] = 'normal'
+        self.run_button['text'] = '🔎 Executar Agora'
+
+    def display_results(self, result):
+        """Substitui o conteúdo da tabela pelo ranking recebido."""
+        self.tree.delete(*self.tree.get_children())
+        for rank, item in enumerate(result['results'], start=1):
+            rsi = f"{item['rsi_value']:.1f}" if item['rsi_value'] is not None else "N/A"
+            self.tree.insert('', 'end', values=(rank, item['symbol'], f"{item['strength']:.2f}", f"{item['price']:.8g}",
+                                                f"{item['price_change_24h']:+.2f}%", rsi, " | ".join(item['matches'])))
+        timestamp = datetime.fromtimestamp(result.get('timestamp', 0)).strftime('%d/%m/%Y %H:%M:%S')
+        self.status_label.config(text=f"Última execução: {timestamp} — {result['scanned']} correspondências em {result['universe']} pares "
+                                      f"({result['elapsed']:.1f}s, peso {result['weight']}).")
+
+    def on_close(self):
+        self.parent_app.screener_window = None
+        self.destroy()
@@ -0,0 +1,61 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from alert_history_store import AlertHistoryIndex, AlertHistoryStore
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT']
+TRIGGERS = ['RSI Sobrevendido', 'Cruz Dourada', 'Preço acima de 100', 'Bollinger Superior']
+
+@pytest.fixture
+def store(tmp_path):
+    rng = random.Random(7)
+    store = AlertHistoryStore(str(tmp_path / 'history.db'), max_entries=None, retention_days=None, legacy_path=None)
+    now = datetime.now().replace(microsecond=0)
+    for _ in range(1500):
+        # Vários alertas no mesmo segundo, para a ordem depender também do id
+        moment = now - timedelta(minutes=rng.randrange(0, 10 * 24 * 60, 7))
+        store.append(rng.choice(SYMBOLS), rng.choice(TRIGGERS), {'rsi': 30} if rng.random() < 0.5 else None, moment.isoformat())
+    yield store
+    store.close()
+
+def all_rows(store, history_filter):
+    return store.page(history_filter.start, history_filter.symbols, history_filter.triggers, limit=10 ** 6)
+
+def expected(store, text, start_date):
+    rows = store.page(limit=10 ** 6)
+    start = datetime.combine(start_date, datetime.min.time()).timestamp() if start_date else None
+    return [row for row in rows if (start is None or row[5] >= start)
+            and (not text or text.lower() in row[2].lower() or text.lower() in row[3].lower())]
+
+@pytest.mark.parametrize("text, days_back", [("", None), ("eth", None), ("cruz", 3), ("usdt", 0), ("nada", None)])
+def test_search_totals_match_rows(store, text, days_back):
+    start_date = date.today() - timedelta(days=days_back) if days_back is not None else None
+    history_filter = AlertHistoryIndex(store.aggregates()).search(text, start_date)
+    rows = expected(store, text, start_date)
+    assert all_rows(store, history_filter) == rows
+    assert history_filter.count == len(rows)
+
+def test_seek_and_keyset_pages_cover_every_row_once(store):
+    history_filter = AlertHistoryIndex(store.aggregates()).search("btc")
+    rows = all_rows(store, history_filter)
+    for position in (0, 1, 57, 199, 200, len(rows) - 1, len(rows)):
+        before, skip = AlertHistoryIndex.seek(history_filter, position)
+        page = store.page(history_filter.start, history_filter.symbols, history_filter.triggers, 50, before, skip)
+        assert page == rows[position:position + 50]
+
+    walked, cursor = [], None
+    while page := store.page(history_filter.start, history_filter.symbols, history_filter.triggers, 64, cursor):
+        walked.extend(page)
+        cursor = (page[-1][5], page[-1][0])
+    assert walked == rows
+
+def test_version_changes_on_every_write(store):
+    version = store.version
+    store.append('BTCUSDT', 'Cruz Dourada')
+    assert store.version > version
+    version = store.version
+    store.clear()
+    assert store.version > version and len(store) == 0
+    assert AlertHistoryIndex(store.aggregates()).search().count == 0
@@ -0,0 +1,184 @@
+import logging
+import random
+
+import numpy as np
+import pytest
+
+from alert_rules import CONDITIONS, AlertRuleCache, AlertRuleMatrix, AnalysisColumns, compile_alert_rules
+
+VALUED = {'preco_baixo': 100.0, 'preco_alto': 120.0, 'rsi_sobrevendido': 30.0, 'rsi_sobrecomprado': 70.0,
+          'volume_anormal': 2.5, 'fuga_capital_significativa': "5, -3", 'entrada_capital_significativa': "5, 3"}
+
+def alert_config(enabled=CONDITIONS, **values):
+    conditions = {}
+    for condition in enabled:
+        value = values.get(condition, VALUED.get(condition))
+        conditions[condition] = {'enabled': True, **({'value': value} if value is not None else {})}
+    return {'conditions': conditions}
+
+def test_compile_keeps_condition_order_and_parses_values_once():
+    rules = compile_alert_rules('BTCUSDT', alert_config(reversed(CONDITIONS)))
+    assert [rule.condition for rule in rules] == list(CONDITIONS)
+    by_condition = {rule.condition: rule for rule in rules}
+    assert by_condition['preco_baixo'].params == (100.0,)
+    assert by_condition['fuga_capital_significativa'].params == (5.0, -3.0)
+    assert by_condition['macd_cruz_alta'].params == ()
+    assert by_condition['preco_alto'].message({}) == "Preço Acima de $120.00"
+    assert by_condition['volume_anormal'].message({'volume_zscore': 3.14}) == "Volume Anormal (z-score 3.1 >= 2.5)"
+
+def test_invalid_and_disabled_conditions_are_skipped(caplog):
+    config = alert_config(('preco_baixo', 'rsi_sobrevendido', 'fuga_capital_significativa'),
+                          rsi_sobrevendido="trinta", fuga_capital_significativa="5")
+    config['conditions']['preco_alto'] = {'enabled': False, 'value': 1}
+    with caplog.at_level(logging.WARNING):
+        rules = compile_alert_rules('BTCUSDT', config)
+    assert [rule.condition for rule in rules] == ['preco_baixo']
+    assert "rsi_sobrevendido" in caplog.text and "fuga_capital_significativa" in caplog.text
+
+def test_cache_recompiles_only_when_the_content_changes():
+    cache = AlertRuleCache()
+    config = alert_config(('preco_baixo',))
+    rules = cache.get('BTCUSDT', config)
+    assert cache.get('BTCUSDT', config) is rules
+    # Cópia com o mesmo conteúdo (o ciclo usa deepcopy da configuração): não recompila
+    assert cache.get('BTCUSDT', alert_config(('preco_baixo',))) is rules and cache.version == 1
+    changed = cache.get('BTCUSDT', alert_config(('preco_baixo',), preco_baixo=90))
+    assert changed[0].params == (90.0,) and cache.version == 2
+    cache.get('ETHUSDT', config)
+    cache.prune(['ETHUSDT'])
+    assert cache.get('BTCUSDT', alert_config(('preco_baixo',), preco_baixo=90)) is not changed
+
+def scalar_predicate(condition, params, d):
+    """Predicados escalares (um símbolo por vez) que as máscaras substituíram."""
+    if condition == 'preco_baixo': return d['current_price'] <= params[0]
+    if condition == 'preco_alto': return d['current_price'] >= params[0]
+    if condition == 'rsi_sobrevendido': return d['rsi_value'] <= params[0]
+    if condition == 'rsi_sobrecomprado': return d['rsi_value'] >= params[0]
+    if condition == 'bollinger_abaixo': return d['bollinger_signal'] == "Abaixo da Banda"
+    if condition == 'bollinger_acima': return d['bollinger_signal'] == "Acima da Banda"
+    if condition == 'macd_cruz_baixa': return d['macd_signal'] == "Cruzamento de Baixa"
+    if condition == 'macd_cruz_alta': return d['macd_signal'] == "Cruzamento de Alta"
+    if condition == 'mme_cruz_morte': return d['mme_cross'] == "Cruz da Morte"
+    if condition == 'mme_cruz_dourada': return d['mme_cross'] == "Cruz Dourada"
+    if condition == 'hilo_compra': return d['hilo_signal'] == "HiLo Buy"
+    if condition == 'hilo_venda': return d['hilo_signal'] == "HiLo Sell"
+    if condition == 'volume_anormal': return d['volume_zscore'] is not None and d['volume_zscore'] >= params[0]
+    market_cap = d['market_cap']
+    if market_cap is None or market_cap <= 0 or d['volume_24h'] / market_cap * 100 <= params[0]: return False
+    if condition == 'fuga_capital_significativa': return d['price_change_24h'] < params[1]
+    return d['price_change_24h'] > params[1]
+
+def random_analysis(rng, symbol):
+    pct_b = rng.uniform(-0.5, 1.5)
+    return {
+        'symbol': symbol, 'current_price': rng.uniform(80, 140), 'rsi_value': rng.uniform(10, 90),
+        'volume_24h': rng.uniform(0, 1e7), 'price_change_24h': rng.uniform(-8, 8),
+        'market_cap': rng.choice([None, 0, rng.uniform(1e7, 2e8)]),
+        'volume_zscore': rng.choice([None, rng.uniform(-1, 5)]), 'bollinger_pct_b': pct_b,
+        'bollinger_signal': "Abaixo da Banda" if pct_b < 0 else "Acima da Banda" if pct_b > 1 else "Nenhum",
+        'macd_signal': rng.choice(["Nenhum", "Cruzamento de Alta", "Cruzamento de Baixa"]),
+        'mme_cross': rng.choice(["Nenhum", "Cruz Dourada", "Cruz da Morte"]),
+        'hilo_signal': rng.choice(["Nenhum", "HiLo Buy", "HiLo Sell"]),
+    }
+
+def random_matrix(rng, n=40):
+    symbols = [f"S{i}USDT" for i in range(n)]
+    rules = {symbol: compile_alert_rules(symbol, alert_config(
+        [c for c in CONDITIONS if rng.random() < 0.5],
+        preco_baixo=rng.uniform(90, 110), rsi_sobrevendido=rng.uniform(20, 40),
+        fuga_capital_significativa=f"{rng.uniform(1, 10)}, {rng.uniform(-5, 0)}")) for symbol in symbols}
+    return symbols, rules
+
+def fill(symbols, analyses):
+    columns = AnalysisColumns(symbols)
+    for i, symbol in enumerate(symbols):
+        columns.set_row(i, analyses[symbol])
+    return columns
+
+@pytest.mark.parametrize("seed", range(5))
+def test_masks_match_scalar_predicates(seed):
+    rng = random.Random(seed)
+    symbols, rules = random_matrix(rng)
+    analyses = {symbol: random_analysis(rng, symbol) for symbol in symbols}
+    matrix = AlertRuleMatrix(symbols, rules)
+    hits, active = matrix.evaluate(fill(symbols, analyses))
+    expected = [(i, CONDITIONS.index(rule.condition)) for i, symbol in enumerate(symbols)
+                for rule in rules[symbol] if scalar_predicate(rule.condition, rule.params, analyses[symbol])]
+    # Primeiro ciclo: tudo armado, então os disparos são exatamente as condições atendidas
+    assert [tuple(pair) for pair in hits] == expected
+    assert [tuple(pair) for pair in active] == expected
+
+@pytest.mark.parametrize("seed", range(5))
+def test_row_by_row_evaluation_matches_the_batch(seed):
+    rng = random.Random(seed)
+    symbols, rules = random_matrix(rng)
+    batch, incremental = AlertRuleMatrix(symbols, rules), AlertRuleMatrix(symbols, rules)
+    for _ in range(15):
+        analyses = {symbol: random_analysis(rng, symbol) for symbol in symbols}
+        columns = fill(symbols, analyses)
+        batch_hits, batch_active = batch.evaluate(columns)
+        parts = [incremental.evaluate(columns, slice(i, i + 1)) for i in range(len(symbols))]
+        assert np.array_equal(np.concatenate([hits for hits, _ in parts]), batch_hits)
+        assert np.array_equal(np.concatenate([active for _, active in parts]), batch_active)
+        assert np.array_equal(incremental.armed, batch.armed)
+
+def test_rows_as_index_array_and_condition_filter():
+    rng = random.Random(1)
+    symbols, rules = random_matrix(rng)
+    analyses = {symbol: random_analysis(rng, symbol) for symbol in symbols}
+    columns = fill(symbols, analyses)
+    all_hits, _ = AlertRuleMatrix(symbols, rules).evaluate(columns)
+    rows = [3, 7, 21]
+    hits, _ = AlertRuleMatrix(symbols, rules).evaluate(columns, rows, conditions={'preco_baixo', 'macd_cruz_alta'})
+    wanted = {CONDITIONS.index('preco_baixo'), CONDITIONS.index('macd_cruz_alta')}
+    assert [tuple(p) for p in hits] == [tuple(p) for p in all_hits if p[0] in rows and p[1] in wanted]
+
+def single(config, hysteresis=None, symbol='BTCUSDT'):
+    return AlertRuleMatrix([symbol], {symbol: compile_alert_rules(symbol, config)}, hysteresis)
+
+def fired(matrix, **values):
+    columns = AnalysisColumns(matrix.symbols)
+    columns.set_row(0, values)
+    hits, _ = matrix.evaluate(columns)
+    return [CONDITIONS[j] for _, j in hits]
+
+def test_price_level_rearms_only_past_the_hysteresis_band():
+    matrix = single(alert_config(('preco_baixo',)))   # Limite 100, banda de 0,5%
+    prices = [99.0, 99.5, 100.3, 99.0, 100.6, 99.9]
+    assert [bool(fired(matrix, current_price=p)) for p in prices] == [True, False, False, False, False, True]
+
+def test_rsi_rearm_uses_points_and_custom_hysteresis():
+    default = single(alert_config(('rsi_sobrevendido',)))
+    assert [bool(fired(default, rsi_value=r)) for r in (25, 33, 28, 36, 29)] == [True, False, False, False, True]
+    wide = single(alert_config(('rsi_sobrevendido',)), hysteresis={'rsi_points': 10})
+    assert [bool(fired(wide, rsi_value=r)) for r in (25, 36, 29, 41, 29)] == [True, False, False, False, True]
+
+def test_missing_data_neither_fires_nor_rearms():
+    matrix = single(alert_config(('rsi_sobrecomprado',)))
+    assert fired(matrix, rsi_value=80) == ['rsi_sobrecomprado']
+    assert fired(matrix, rsi_value=None) == []
+    assert fired(matrix, rsi_value=75) == []
+
+def test_crossover_signals_fire_on_every_cycle():
+    matrix = single(alert_config(('macd_cruz_alta', 'bollinger_acima')))
+    for _ in range(3):
+        assert fired(matrix, macd_signal="Cruzamento de Alta", bollinger_pct_b=0.5) == ['macd_cruz_alta']
+    assert fired(matrix, bollinger_pct_b=1.2) == ['bollinger_acima']
+    assert fired(matrix, bollinger_pct_b=1.05) == []
+
+def test_disarmed_state_survives_reconfiguration_and_restart():
+    config = alert_config(('preco_baixo', 'rsi_sobrevendido'))
+    matrix = single(config)
+    assert fired(matrix, current_price=99.0, rsi_value=20) == ['preco_baixo', 'rsi_sobrevendido']
+
+    # Nova configuração: só a regra de RSI mudou de limite, então só ela volta armada
+    carried = single(alert_config(('preco_baixo', 'rsi_sobrevendido'), rsi_sobrevendido=25))
+    carried.carry_state(matrix)
+    assert fired(carried, current_price=99.0, rsi_value=20) == ['rsi_sobrevendido']
+
+    # Reinício: o estado salvo (em JSON) desarma de novo as mesmas regras
+    state = matrix.disarmed_state()
+    assert state == {'BTCUSDT': {'preco_baixo': [100.0], 'rsi_sobrevendido': [30.0]}}
+    restored = single(alert_config(('preco_baixo', 'rsi_sobrevendido'), preco_baixo=95))
+    restored.restore_disarmed(state)
+    assert fired(restored, current_price=94.0, rsi_value=20) == ['preco_baixo']
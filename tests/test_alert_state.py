@@ -0,0 +1,58 @@
+import json
+
+from alert_rules import AlertRuleMatrix, AnalysisColumns, compile_alert_rules
+from alert_state import AlertStateStore
+
+SYMBOL = 'BTCUSDT'
+
+def make_matrix(limit=30.0):
+    config = {'conditions': {'rsi_sobrevendido': {'enabled': True, 'value': limit}}}
+    return AlertRuleMatrix([SYMBOL], {SYMBOL: compile_alert_rules(SYMBOL, config)})
+
+def run_cycle(matrix, store, rsi):
+    """Um ciclo como o do monitoramento: avalia, registra disparos e poda o cooldown pelas condições ativas."""
+    columns = AnalysisColumns([SYMBOL])
+    columns.set_row(0, {'rsi_value': rsi})
+    hits, active = matrix.evaluate(columns)
+    fired = {(SYMBOL, matrix.rule_for(i, j).key) for i, j in hits}
+    for _, key in fired:
+        store.mark_triggered(SYMBOL, key)
+    store.retain_active([SYMBOL], fired | {(SYMBOL, matrix.rule_for(i, j).key) for i, j in active})
+    store.update_disarmed(matrix.disarmed_state())
+    return fired
+
+def test_condition_still_true_keeps_cooldown(tmp_path):
+    store, matrix = AlertStateStore(str(tmp_path / "state.json")), make_matrix()
+    assert run_cycle(matrix, store, 20) == {(SYMBOL, 'RSI_SOBREVENDA')}
+    assert run_cycle(matrix, store, 20) == set()
+    assert store.in_cooldown(SYMBOL, 'RSI_SOBREVENDA', 3600)
+
+def test_restart_does_not_refire_a_condition_that_is_still_true(tmp_path):
+    path = str(tmp_path / "state.json")
+    store, matrix = AlertStateStore(path), make_matrix()
+    run_cycle(matrix, store, 20)
+    run_cycle(matrix, store, 22)
+    store.save()
+
+    restarted, matrix = AlertStateStore(path), make_matrix()
+    matrix.restore_disarmed(restarted.disarmed_rules())
+    assert restarted.in_cooldown(SYMBOL, 'RSI_SOBREVENDA', 3600)
+    assert run_cycle(matrix, restarted, 20) == set()
+
+    # Volta além da histerese (30 + 5) e cai de novo: dispara (o cooldown já foi podado)
+    assert run_cycle(matrix, restarted, 40) == set()
+    assert run_cycle(matrix, restarted, 20) == {(SYMBOL, 'RSI_SOBREVENDA')}
+
+def test_changed_parameters_are_not_restored(tmp_path):
+    store, matrix = AlertStateStore(str(tmp_path / "state.json")), make_matrix(30.0)
+    run_cycle(matrix, store, 20)
+    matrix = make_matrix(25.0)
+    matrix.restore_disarmed(store.disarmed_rules())
+    assert matrix.armed.all()
+
+def test_loads_the_old_file_format(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({SYMBOL: {'RSI_SOBREVENDA': 4102444800.0}}))
+    store = AlertStateStore(str(path))
+    assert store.in_cooldown(SYMBOL, 'RSI_SOBREVENDA', 60)
+    assert store.disarmed_rules() == {}
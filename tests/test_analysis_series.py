@@ -0,0 +1,108 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import analysis_series as series_module
+from analysis_series import COLUMNS, AnalysisSeriesStore
+
+DAY = 86400
+T0 = 1_700_000_000 // DAY * DAY
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(T0)
+    monkeypatch.setattr(series_module, 'time', SimpleNamespace(time=clock.time))
+    return clock
+
+def snapshot(symbol, price, **extra):
+    return {'symbol': symbol, 'current_price': price, 'price_change_24h': 1.5, 'volume_24h': 1e6, 'market_cap': "N/A",
+            'rsi_value': 40.0, 'bollinger_signal': "Abaixo da Banda", 'macd_signal': "Cruzamento de Alta", **extra}
+
+def run_cycles(store, clock, start, end, step=300):
+    for ts in range(start, end, step):
+        clock.now = ts
+        # O preço é o próprio horário do ciclo, para conferir qual snapshot sobrou em cada intervalo
+        store.append([snapshot('BTCUSDT', float(ts)), snapshot('ETHUSDT', float(-ts))], ts=ts)
+
+def test_append_and_read_back(tmp_path, clock):
+    store = AnalysisSeriesStore(str(tmp_path))
+    run_cycles(store, clock, T0, T0 + 3600)
+    data = store.series('ETHUSDT', start=T0 + 600, end=T0 + 1200, columns=('price', 'rsi', 'market_cap', 'macd_signal'))
+    assert data['ts'].tolist() == [T0 + 600, T0 + 900, T0 + 1200]
+    assert data['price'].tolist() == [-(T0 + 600), -(T0 + 900), -(T0 + 1200)]
+    assert np.isnan(data['market_cap']).all()
+    assert list(store.signal_labels('macd_signal', data['macd_signal'])) == ["Cruzamento de Alta"] * 3
+    assert store.series('XRPUSDT')['ts'].size == 0
+    assert store.symbols() == ['BTCUSDT', 'ETHUSDT']
+
+def test_compaction_moves_rows_through_the_tiers(tmp_path, clock):
+    store = AnalysisSeriesStore(str(tmp_path), raw_days=0.5, hourly_days=1)
+    run_cycles(store, clock, T0, T0 + 4 * DAY)
+    store._compact()
+    raw, hourly, daily = store._tiers
+    now = clock.now
+    assert raw.column('ts')[0] >= (now - DAY // 2) // 3600 * 3600
+    assert hourly.rows and (hourly.column('ts') % 3600 == 0).all()
+    assert hourly.column('ts')[0] >= (now - DAY) // DAY * DAY
+    assert daily.rows and (daily.column('ts') % DAY == 0).all()
+
+    data = store.series('BTCUSDT', columns=('price',))
+    assert (np.diff(data['ts']) > 0).all()
+    assert data['ts'][0] == T0 and data['ts'][-1] == now
+    # Cada ponto reduzido guarda o último snapshot do seu intervalo
+    for tier in (hourly, daily):
+        index = tier.column('symbol') == 0
+        assert (tier.column('price')[index] == tier.column('ts')[index] + tier.step - 300).all()
+
+    reopened = AnalysisSeriesStore(str(tmp_path), raw_days=0.5, hourly_days=1)
+    for column in ('ts', 'price'):
+        assert np.array_equal(reopened.series('BTCUSDT', columns=('price',))[column], data[column])
+
+def test_sparkline_and_trend(tmp_path, clock):
+    store = AnalysisSeriesStore(str(tmp_path))
+    run_cycles(store, clock, T0, T0 + DAY)
+    line = store.sparkline('BTCUSDT', seconds=DAY, points=20)
+    assert len(line) == 20 and line[-1] == clock.now and line == sorted(line)
+    trend = store.trend('BTCUSDT', seconds=6 * 3600)
+    assert trend['slope_per_hour'] == pytest.approx(3600)
+    assert trend['change_pct'] > 0 and trend['points'] == 6 * 12 + 1
+    assert store.trend('XRPUSDT') is None
+
+def test_recovers_torn_rows_and_interrupted_compaction(tmp_path, clock):
+    store = AnalysisSeriesStore(str(tmp_path))
+    run_cycles(store, clock, T0, T0 + 3600)
+    raw = store._tiers[0]
+    expected = store.series('BTCUSDT', columns=('price',))
+
+    # Fechamento no meio de um append: algumas colunas ficaram com uma linha a mais
+    with open(raw.file('price'), 'ab') as f:
+        f.write(np.zeros(1, dtype=COLUMNS['price']).tobytes())
+    with open(raw.file('ts'), 'ab') as f:
+        f.write(b"\x01\x02\x03")
+    reopened = AnalysisSeriesStore(str(tmp_path))
+    assert reopened.series('BTCUSDT', columns=('price',))['price'].tolist() == expected['price'].tolist()
+    assert os.path.getsize(raw.file('price')) == raw.rows * np.dtype(COLUMNS['price']).itemsize
+
+    # Compactação interrompida antes do marcador: os .new são descartados
+    for column in COLUMNS:
+        np.zeros(2, dtype=COLUMNS[column]).tofile(raw.file(column, ".new"))
+    reopened = AnalysisSeriesStore(str(tmp_path))
+    assert reopened.series('BTCUSDT', columns=('price',))['price'].tolist() == expected['price'].tolist()
+    assert not any(name.endswith(".new") for name in os.listdir(raw.path))
+
+    # Interrompida depois do marcador: os .new são aplicados
+    for column in COLUMNS:
+        np.array(raw.column(column)[-2:]).tofile(raw.file(column, ".new"))
+    open(os.path.join(raw.path, "COMPACTING"), 'w').close()
+    reopened = AnalysisSeriesStore(str(tmp_path))
+    assert reopened.series('BTCUSDT', columns=('price',))['price'].tolist() == expected['price'].tolist()[-1:]
+    assert not os.path.exists(os.path.join(raw.path, "COMPACTING"))
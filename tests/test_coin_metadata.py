@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+import coin_metadata as cm
+from coin_db import KEPT_GENERATIONS, CoinDatabase
+
+COINS = [
+    {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'},
+    {'id': 'ethereum', 'symbol': 'eth', 'name': 'Ethereum'},
+    {'id': 'bitcoin-cash', 'symbol': 'bch', 'name': 'Bitcoin Cash'},
+    {'id': 'wrapped-bitcoin', 'symbol': 'wbtc', 'name': 'Wrapped Bitcoin'},
+    {'id': 'btc-clone', 'symbol': 'btc', 'name': 'Bitcoin Clone'},
+    {'id': 'bitcoin-2', 'symbol': 'btc2', 'name': 'bitcoin'},
+]
+
+@pytest.fixture
+def db(tmp_path):
+    db = CoinDatabase(str(tmp_path / 'coins.db'), legacy_path=None)
+    db.apply_list(COINS)
+    return db
+
+class FakeCoinGecko:
+    calls = 0
+    coins = COINS
+
+    def get_coins_list(self):
+        FakeCoinGecko.calls += 1
+        return list(FakeCoinGecko.coins)
+
+@pytest.fixture
+def service(db, monkeypatch):
+    monkeypatch.setattr(cm, 'CoinGeckoAPI', FakeCoinGecko)
+    monkeypatch.setattr(cm.robust_services.rate_limiter, 'wait_if_needed', lambda *args, **kwargs: None)
+    FakeCoinGecko.calls, FakeCoinGecko.coins = 0, COINS
+    return cm.CoinMetadataService(db)
+
+def test_snapshot_answers_like_the_database(db):
+    snapshot = cm.CoinSnapshot.from_db(db)
+    assert len(snapshot) == len(list(snapshot)) == len(set(snapshot)) == 5
+    for symbol in snapshot:
+        assert snapshot[symbol] == db.name_for_symbol(symbol)
+    for coin in COINS:
+        assert snapshot.id_for_name(coin['name'].upper()) == db.id_for_name(coin['name'])
+        assert snapshot.by_id(coin['id']) == db.by_id(coin['id'])
+        assert snapshot.by_symbol(coin['symbol']) == db.by_symbol(coin['symbol'])
+    for prefix in ('bit', 'BITCOIN ', 'e', 'x', ''):
+        assert snapshot.search_prefix(prefix, limit=3) == db.search_prefix(prefix, limit=3)
+    with pytest.raises(KeyError):
+        snapshot['DOGE']
+
+def test_snapshot_does_not_follow_later_database_changes(db):
+    snapshot = cm.CoinSnapshot.from_db(db)
+    db.apply_list(COINS[1:] + [{'id': 'dogecoin', 'symbol': 'doge', 'name': 'Dogecoin'}])
+    assert snapshot['BTC'] == 'Bitcoin Clone'
+    assert 'DOGE' not in snapshot
+    assert snapshot.id_for_name('bitcoin') == 'bitcoin'
+    snapshot.by_id('ethereum')['name'] = 'alterado'
+    assert snapshot.by_id('ethereum')['name'] == 'Ethereum'
+
+def test_refresh_bumps_version_only_when_the_list_changes(service):
+    first = service.snapshot()
+    unchanged = service.refresh(force=True)
+    assert unchanged.version == first.version and dict(unchanged) == dict(first)
+    FakeCoinGecko.coins = COINS + [{'id': 'dogecoin', 'symbol': 'doge', 'name': 'Dogecoin'}]
+    changed = service.refresh(force=True)
+    assert changed.version == first.version + 1
+    assert changed['DOGE'] == 'Dogecoin' and 'DOGE' not in first
+    assert service.symbol_names['DOGE'] == 'Dogecoin'
+    assert service.refresh().version == changed.version and FakeCoinGecko.calls == 2
+
+def test_old_snapshots_read_their_generation_until_pruned(db):
+    first = cm.CoinSnapshot.from_db(db)
+    lists = [[dict(COINS[0], name=f'Bitcoin v{i}')] + COINS[1:] + [{'id': f'coin-{i}', 'symbol': f'c{i}', 'name': f'Coin {i}'}]
+             for i in range(KEPT_GENERATIONS)]
+    snapshots = []
+    for coins in lists:
+        db.apply_list(coins)
+        snapshots.append(cm.CoinSnapshot.from_db(db))
+    assert [snapshot.version for snapshot in snapshots] == list(range(2, KEPT_GENERATIONS + 2))
+    for snapshot, coins in zip(snapshots, lists):
+        assert len(snapshot) == len({coin['symbol'] for coin in coins})
+        assert snapshot.by_id('bitcoin')['name'] == coins[0]['name']
+        assert [coin['id'] for coin in snapshot.search_prefix('coin')] == [coins[-1]['id']]
+    # A primeira geração saiu da janela de KEPT_GENERATIONS: a linha substituída dela foi apagada
+    assert first.by_id('bitcoin') is None
+    assert db.count() == len(lists[-1])
+
+def test_position_only_changes_publish_a_new_generation(service, db):
+    first = service.snapshot()
+    FakeCoinGecko.coins = list(reversed(COINS))
+    snapshot = service.refresh(force=True)
+    assert snapshot.version == first.version + 1
+    assert snapshot['BTC'] == 'Bitcoin' and first['BTC'] == 'Bitcoin Clone'
+
+def test_database_is_opened_on_first_query(tmp_path):
+    path = tmp_path / 'coins.db'
+    db = CoinDatabase(str(path), legacy_path=None)
+    service = cm.CoinMetadataService(db)
+    assert not path.exists()
+    assert len(service.snapshot()) == 0 and path.exists()
+
+def test_unversioned_database_is_migrated(tmp_path):
+    path = str(tmp_path / 'coins.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE coins (id TEXT PRIMARY KEY, symbol TEXT NOT NULL, name TEXT NOT NULL, name_lower TEXT NOT NULL, pos INTEGER NOT NULL) WITHOUT ROWID;
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+        INSERT INTO coins VALUES ('bitcoin', 'BTC', 'Bitcoin', 'bitcoin', 0), ('ethereum', 'ETH', 'Ethereum', 'ethereum', 1);
+        INSERT INTO meta VALUES ('updated_at', '123.0');
+    """)
+    conn.close()
+    db = CoinDatabase(path, legacy_path=None)
+    assert db.generation() == 1 and db.updated_at() == 123.0
+    assert cm.CoinSnapshot.from_db(db)['ETH'] == 'Ethereum'
+    assert db.apply_list(COINS).added and db.generation() == 2
@@ -0,0 +1,95 @@
+import os
+import json
+import time
+
+import pytest
+
+from config_store import ConfigStore, ConfigPersister, load_config_file
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline: return False
+        time.sleep(0.01)
+    return True
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.json"
+    write_text(path, json.dumps({'version': 0}))
+    return str(path)
+
+def counting_persister(monkeypatch, store, path, **kwargs):
+    persister = ConfigPersister(store, path, **kwargs)
+    writes = []
+    original = persister._write
+    def write():
+        writes.append(store.version)
+        original()
+    monkeypatch.setattr(persister, '_write', write)
+    return persister, writes
+
+def test_publishes_within_debounce_window_produce_one_write(config_path, monkeypatch):
+    store = ConfigStore()
+    persister, writes = counting_persister(monkeypatch, store, config_path, debounce=0.2, backup_interval=0)
+    for i in range(1, 6):
+        store.publish({'version': i, 'coins': ['BTCUSDT'] * i})
+        persister.schedule()
+        time.sleep(0.02)
+    assert wait_until(lambda: writes)
+    time.sleep(0.3)
+    assert writes == [5]
+    assert read_json(config_path) == {'version': 5, 'coins': ['BTCUSDT'] * 5}
+    # O arquivo anterior vira o backup mais recente; nada de temporário sobrando
+    assert read_json(config_path + ".bak.1") == {'version': 0}
+    assert not os.path.exists(config_path + ".tmp")
+
+def test_backups_rotate_up_to_backup_count(config_path):
+    store = ConfigStore()
+    persister = ConfigPersister(store, config_path, debounce=60, backup_count=2, backup_interval=0)
+    for i in range(1, 4):
+        store.publish({'version': i})
+        persister.flush()
+    assert read_json(config_path) == {'version': 3}
+    assert read_json(config_path + ".bak.1") == {'version': 2}
+    assert read_json(config_path + ".bak.2") == {'version': 1}
+    assert not os.path.exists(config_path + ".bak.3")
+
+def test_backups_are_rate_limited(config_path):
+    store = ConfigStore()
+    persister = ConfigPersister(store, config_path, debounce=60, backup_interval=600)
+    for i in range(1, 4):
+        store.publish({'version': i})
+        persister.flush()
+    assert read_json(config_path + ".bak.1") == {'version': 0}
+    assert not os.path.exists(config_path + ".bak.2")
+
+def test_flush_skips_versions_already_written(config_path):
+    store = ConfigStore()
+    persister = ConfigPersister(store, config_path, debounce=60)
+    store.publish({'version': 1})
+    persister.flush()
+    write_text(config_path, json.dumps({'edited': True}))
+    persister.flush()
+    assert read_json(config_path) == {'edited': True}
+
+def test_load_falls_back_to_the_newest_valid_backup(config_path):
+    write_text(config_path, '{"version": 3, "coins": [')
+    write_text(config_path + ".bak.1", '')
+    write_text(config_path + ".bak.2", json.dumps({'version': 2}))
+    write_text(config_path + ".bak.3", json.dumps({'version': 1}))
+    assert load_config_file(config_path) == {'version': 2}
+
+def test_load_returns_default_without_any_valid_file(tmp_path):
+    path = str(tmp_path / "config.json")
+    assert load_config_file(path, default={'coins': []}) == {'coins': []}
+    write_text(path, 'não é json')
+    assert load_config_file(path) is None
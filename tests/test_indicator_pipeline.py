@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import (calculate_rsi, calculate_bollinger_bands, calculate_macd, calculate_emas,
+                        calculate_hilo_signals, IndicatorPipeline, IndicatorMemo)
+
+HOUR_MS = 3_600_000
+
+def random_klines(n=400, seed=0, start=0):
+    # Passeio aleatório somado a uma onda longa, para que as EMAs 50/200 também cruzem
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)) + 0.3 * np.sin(np.arange(n) / 30))
+    spread = np.abs(rng.normal(0, 0.005, n))
+    return pd.DataFrame({'open_time': start + np.arange(n, dtype=np.int64) * HOUR_MS, 'close': closes,
+                         'high': closes * (1 + spread), 'low': closes * (1 - spread)})
+
+def batch_results(df):
+    """Os mesmos campos calculados com as funções em lote, como o _analyze_symbol fazia antes do pipeline."""
+    upper, lower, _, _ = calculate_bollinger_bands(df)
+    _, _, hilo_signal = calculate_hilo_signals(df)
+    emas = calculate_emas(df, periods=[50, 200])
+    mme_cross = "Nenhum"
+    if 50 in emas and 200 in emas and len(emas[50]) > 1 and len(emas[200]) > 1:
+        if emas[50].iloc[-2] < emas[200].iloc[-2] and emas[50].iloc[-1] > emas[200].iloc[-1]: mme_cross = "Cruz Dourada"
+        elif emas[50].iloc[-2] > emas[200].iloc[-2] and emas[50].iloc[-1] < emas[200].iloc[-1]: mme_cross = "Cruz da Morte"
+    return {'rsi_value': calculate_rsi(df)[0], 'bollinger_upper': upper, 'bollinger_lower': lower,
+            'macd_signal': calculate_macd(df), 'mme_cross': mme_cross, 'hilo_signal': hilo_signal or "Nenhum"}
+
+def assert_same_results(got, expected):
+    for field in ('rsi_value', 'bollinger_upper', 'bollinger_lower'):
+        assert got[field] == pytest.approx(expected[field], rel=1e-9, abs=1e-9), field
+    for field in ('macd_signal', 'mme_cross', 'hilo_signal'):
+        assert got[field] == expected[field], field
+
+@pytest.mark.parametrize("seed", range(3))
+def test_pipeline_matches_batch_functions(seed):
+    df = random_klines(seed=seed)
+    pipeline = IndicatorPipeline()
+    signals = set()
+    for end in range(1, len(df) + 1):
+        prefix = df.iloc[:end]
+        got = pipeline.run(prefix)
+        assert_same_results(got, batch_results(prefix))
+        signals.update((got['macd_signal'], got['mme_cross'], got['hilo_signal']))
+    # Os cruzamentos precisam ter aparecido para a comparação valer alguma coisa
+    assert {"Cruzamento de Alta", "Cruzamento de Baixa", "HiLo Buy", "HiLo Sell"} <= signals
+    assert {"Cruz Dourada", "Cruz da Morte"} & signals
+
+def test_fold_closed_then_finish_equals_run():
+    df = random_klines(seed=7)
+    pipeline = IndicatorPipeline()
+    arrays = IndicatorPipeline.arrays_from_df(df)
+    state = pipeline.fold_closed(arrays)
+    live = {col: arrays[col][-1] for col in ('close', 'high', 'low')}
+    assert pipeline.finish(state, live) == pipeline.run(df)
+
+def test_pipeline_subset_only_fills_requested_indicators():
+    df = random_klines(seed=1)
+    got = IndicatorPipeline(indicators=['rsi', 'macd']).run(df)
+    expected = batch_results(df)
+    assert got['rsi_value'] == pytest.approx(expected['rsi_value'], rel=1e-9)
+    assert got['macd_signal'] == expected['macd_signal']
+    assert got['bollinger_upper'] == got['bollinger_lower'] == 0.0
+    assert got['mme_cross'] == got['hilo_signal'] == "Nenhum"
+
+def test_pipeline_handles_empty_and_short_series():
+    pipeline = IndicatorPipeline()
+    for df in (None, random_klines().iloc[:0], random_klines().iloc[:1]):
+        got = pipeline.run(df)
+        assert got['rsi_value'] == 0.0 and got['macd_signal'] == "N/A" and got['hilo_signal'] == "Nenhum"
+
+def test_pipeline_rsi_is_100_without_losses():
+    closes = np.linspace(100, 130, 30)
+    df = pd.DataFrame({'close': closes, 'high': closes, 'low': closes})
+    assert IndicatorPipeline().run(df)['rsi_value'] == calculate_rsi(df)[0] == 100
+
+def with_live_close(df, close):
+    df = df.copy()
+    df.loc[df.index[-1], ['close', 'high', 'low']] = close
+    return df
+
+def test_memo_hits_while_last_closed_candle_is_unchanged():
+    memo, pipeline = IndicatorMemo(), IndicatorPipeline()
+    df = random_klines(seed=2)
+    assert memo.run(pipeline, df, 'BTCUSDT') == pipeline.run(df)
+    for close in (95.0, 100.0, 105.0):
+        live = with_live_close(df, close)
+        assert memo.run(pipeline, live, 'BTCUSDT') == pipeline.run(live)
+    assert (memo.hits, memo.misses) == (3, 1)
+
+def test_memo_recomputes_when_a_new_candle_closes():
+    memo, pipeline = IndicatorMemo(), IndicatorPipeline()
+    df = random_klines(n=401, seed=3)
+    memo.run(pipeline, df.iloc[:400], 'BTCUSDT')
+    # A janela anda um candle: mesmo tamanho, novo open_time fechado
+    moved = df.iloc[1:].reset_index(drop=True)
+    assert memo.run(pipeline, moved, 'BTCUSDT') == pipeline.run(moved)
+    assert (memo.hits, memo.misses) == (0, 2)
+
+def test_memo_keys_by_symbol_interval_and_parameters():
+    memo = IndicatorMemo()
+    df = random_klines(seed=4)
+    memo.run(IndicatorPipeline(), df, 'BTCUSDT')
+    memo.run(IndicatorPipeline(), df, 'ETHUSDT')
+    memo.run(IndicatorPipeline(), df, 'BTCUSDT', interval='4h')
+    got = memo.run(IndicatorPipeline(rsi_period=7), df, 'BTCUSDT')
+    assert got == IndicatorPipeline(rsi_period=7).run(df)
+    assert memo.get_stats() == {'hits': 0, 'misses': 4, 'hit_rate': 0.0, 'entries': 4}
+
+def test_memo_evicts_least_recently_used():
+    memo, pipeline = IndicatorMemo(max_entries=2), IndicatorPipeline()
+    df = random_klines(n=60, seed=5)
+    for symbol in ('A', 'B', 'A', 'C'):
+        memo.run(pipeline, df, symbol)
+    memo.run(pipeline, df, 'A')
+    memo.run(pipeline, df, 'B')
+    stats = memo.get_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 4, 2)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kline_archive import INTERVAL_MS, KLINE_COLUMNS, KlineArchive, resample_klines
+
+STEP = INTERVAL_MS['1h']
+T0 = 1_700_000_000_000 // STEP * STEP
+
+def candles(indexes):
+    """Candles de 1h nas posições 'indexes' (a partir de T0), com preços derivados da posição."""
+    indexes = np.asarray(list(indexes), dtype=np.float64)
+    rows = np.zeros((len(indexes), len(KLINE_COLUMNS)))
+    rows[:, 0] = T0 + indexes * STEP
+    for column in range(1, len(KLINE_COLUMNS)):
+        rows[:, column] = 100 + indexes + column / 100
+    return rows
+
+def t(index):
+    return T0 + index * STEP
+
+@pytest.fixture
+def archive(tmp_path):
+    return KlineArchive(str(tmp_path / 'archive'))
+
+def test_gap_across_windows_is_stored_once(archive):
+    archive.append('BTCUSDT', '1h', candles([*range(10, 30), *range(60, 100)]))
+    archive._record_holes('BTCUSDT', '1h', [(t(0), t(49)), (t(50), t(99))])
+    meta = archive._load_meta('BTCUSDT', '1h')
+    assert meta['first_available'] == t(10)
+    assert meta['verified_gaps'] == [[t(30), t(59)]]
+    assert archive.missing_ranges('BTCUSDT', '1h', t(0), now_ms=t(100)) == []
+    assert archive.missing_ranges('BTCUSDT', '1h', t(0), now_ms=t(105)) == [(t(100), t(104))]
+
+def test_new_gaps_merge_with_stored_ones(archive):
+    archive.append('BTCUSDT', '1h', candles([*range(0, 30), *range(70, 100)]))
+    archive._record_holes('BTCUSDT', '1h', [(t(20), t(39))])
+    archive._record_holes('BTCUSDT', '1h', [(t(40), t(49))])
+    archive._record_holes('BTCUSDT', '1h', [(t(45), t(69))])
+    assert archive._load_meta('BTCUSDT', '1h')['verified_gaps'] == [[t(30), t(69)]]
+
+def test_missing_range_is_checked_against_the_union_of_gaps(archive):
+    archive.append('BTCUSDT', '1h', candles([*range(0, 30), *range(80, 100)]))
+    # Lacunas gravadas em pedaços por uma versão anterior: juntas cobrem [30, 59]
+    archive._save_meta('BTCUSDT', '1h', {'first_available': None, 'verified_gaps': [[t(50), t(59)], [t(30), t(49)]]})
+    assert archive.missing_ranges('BTCUSDT', '1h', t(0), now_ms=t(100)) == [(t(60), t(79))]
+    windows = archive.plan_windows('BTCUSDT', '1h', t(0), now_ms=t(100))
+    assert windows == [(t(60), t(79))]
+
+def segment_sizes(archive):
+    return sorted(segment[3] for segment in archive._segments('BTCUSDT', '1h'))
+
+def test_append_compacts_small_segments_and_load_dedupes(archive):
+    for start in range(0, 100, 20):
+        archive.append('BTCUSDT', '1h', candles(range(start, start + 25)))   # Sobreposição de 5 candles
+    assert segment_sizes(archive) == [105]
+    newer = candles(range(90, 110))
+    newer[:, 4] += 1000
+    archive.append('BTCUSDT', '1h', newer)
+    assert segment_sizes(archive) == [20, 105]
+
+    df = archive.load('BTCUSDT', '1h')
+    assert df['open_time'].tolist() == [t(i) for i in range(110)]
+    assert (df['close_time'] == df['open_time'] + STEP - 1).all()
+    # No candle repetido vale o segmento mais novo
+    assert df['close'].iloc[95] == 100 + 95 + 0.04 + 1000
+    assert df['number_of_trades'].dtype == np.int64
+    window = archive.load('BTCUSDT', '1h', start=t(50), end=t(59))
+    assert window['open_time'].tolist() == [t(i) for i in range(50, 60)]
+
+def test_forced_compaction_survives_reopen(archive, tmp_path):
+    for start in range(0, 60, 20):
+        archive.append('BTCUSDT', '1h', candles(range(start, start + 20)))
+    archive.compact('BTCUSDT', '1h', force=True)
+    assert segment_sizes(archive) == [60]
+    assert KlineArchive(archive.path).open_times('BTCUSDT', '1h').tolist() == [t(i) for i in range(60)]
+
+def test_resample_klines_to_daily():
+    df = pd.DataFrame(candles(range(48)), columns=KLINE_COLUMNS)
+    daily = resample_klines(df, '1D')
+    first_day = (T0 // 86_400_000) * 86_400_000
+    assert daily['open_time'].iloc[0] == first_day
+    for _, day in daily.iterrows():
+        hours = df[(df['open_time'] >= day['open_time']) & (df['open_time'] < day['open_time'] + 86_400_000)]
+        assert day['open'] == hours['open'].iloc[0] and day['close'] == hours['close'].iloc[-1]
+        assert day['high'] == hours['high'].max() and day['low'] == hours['low'].min()
+        assert day['volume'] == pytest.approx(hours['volume'].sum())
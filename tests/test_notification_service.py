@@ -0,0 +1,256 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from notification_outbox import NotificationOutbox
+from notification_service import (AlertConsolidator, TelegramDeliveryWorker, TELEGRAM_MAX_MESSAGE_LENGTH,
+                                  TELEGRAM_SEPARATOR, split_telegram_message)
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline: return False
+        time.sleep(0.005)
+    return True
+
+class FakeWindow:
+    """Janela principal falsa: guarda os lotes que seriam exibidos (after(0, callback, alertas))."""
+    def __init__(self):
+        self.batches = []
+
+    def after(self, delay, callback, alerts):
+        self.batches.append((time.monotonic(), alerts))
+
+@pytest.fixture
+def consolidator_factory():
+    created = []
+    def create(**kwargs):
+        consolidator = AlertConsolidator(FakeWindow(), **kwargs)
+        created.append(consolidator)
+        return consolidator
+    yield create
+    for consolidator in created: consolidator.stop()
+
+def symbols(batch):
+    return [alert['symbol'] for alert in batch[1]]
+
+def test_full_batch_is_flushed_without_waiting(consolidator_factory):
+    consolidator = consolidator_factory(max_wait=30, max_batch=3)
+    start = time.monotonic()
+    for symbol in ('A', 'B', 'C'): consolidator.add_alert(symbol, "RSI", "msg")
+    assert wait_until(lambda: consolidator.parent_window.batches)
+    assert time.monotonic() - start < 1
+    assert [symbols(batch) for batch in consolidator.parent_window.batches] == [['A', 'B', 'C']]
+
+def test_partial_batch_waits_for_max_wait(consolidator_factory):
+    consolidator = consolidator_factory(max_wait=0.2, max_batch=50)
+    start = time.monotonic()
+    consolidator.add_alert('A', "RSI", "msg")
+    consolidator.add_alert('B', "RSI", "msg")
+    assert wait_until(lambda: consolidator.parent_window.batches)
+    flushed_at, alerts = consolidator.parent_window.batches[0]
+    # O prazo conta a partir do primeiro alerta pendente
+    assert 0.2 <= flushed_at - start < 1
+    assert [alert['symbol'] for alert in alerts] == ['A', 'B']
+
+def test_alerts_wait_while_window_is_open(consolidator_factory):
+    consolidator = consolidator_factory(max_wait=0.05, max_batch=50)
+    consolidator.add_alert('A', "RSI", "msg")
+    assert wait_until(lambda: len(consolidator.parent_window.batches) == 1)
+    consolidator.add_alert('B', "RSI", "msg")
+    time.sleep(0.2)
+    assert len(consolidator.parent_window.batches) == 1
+    consolidator._close_consolidated_window()
+    assert wait_until(lambda: len(consolidator.parent_window.batches) == 2)
+    assert symbols(consolidator.parent_window.batches[1]) == ['B']
+
+def test_suppressed_alerts_are_released_on_resume(consolidator_factory):
+    consolidator = consolidator_factory(max_wait=0.05, max_batch=1)
+    consolidator.suppress_alerts = True
+    consolidator.add_alert('A', "RSI", "msg")
+    time.sleep(0.2)
+    assert not consolidator.parent_window.batches
+    consolidator.suppress_alerts = False
+    assert wait_until(lambda: consolidator.parent_window.batches)
+
+def test_stop_ends_the_dispatch_thread(consolidator_factory):
+    consolidator = consolidator_factory()
+    consolidator.stop()
+    consolidator.alert_thread.join(1)
+    assert not consolidator.alert_thread.is_alive()
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.body = body or {'ok': self.ok}
+
+    def json(self):
+        return self.body
+
+class FakeSession:
+    """
+    Sessão HTTP falsa do worker. 'replies' é consumida em ordem (FakeResponse ou exceção a
+    levantar); esgotada, responde 200. Com 'gate', o primeiro envio espera ser liberado.
+    """
+    def __init__(self, replies=(), gate=None):
+        self.replies = list(replies)
+        self.gate = gate
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((time.monotonic(), url, json))
+        if self.gate is not None and len(self.posts) == 1: self.gate.wait(2)
+        reply = self.replies.pop(0) if self.replies else FakeResponse()
+        if isinstance(reply, Exception): raise reply
+        return reply
+
+    def texts(self):
+        return [payload['text'] for _, _, payload in self.posts]
+
+@pytest.fixture
+def worker_factory(tmp_path):
+    created = []
+    def create(session, **kwargs):
+        kwargs = {'min_interval': 0.0, 'base_backoff': 0.05, 'outbox_path': str(tmp_path / "outbox.db"), **kwargs}
+        worker = TelegramDeliveryWorker(**kwargs)
+        worker.session = session
+        created.append(worker)
+        return worker
+    yield create
+    for worker in created:
+        worker.stop(timeout=1)
+        if worker._outbox: worker._outbox.close()
+
+def test_messages_queued_for_a_chat_are_coalesced(worker_factory):
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, "primeiro")
+    assert wait_until(lambda: session.posts)
+    # Enquanto o primeiro envio está em andamento, as mensagens do chat se acumulam
+    worker.send("TOKEN", 1, "segundo")
+    worker.send("TOKEN", 1, "terceiro")
+    worker.send("TOKEN", 2, "outro chat")
+    gate.set()
+    assert wait_until(lambda: worker.stats['sent'] == 3)
+    chats = {}
+    for _, _, payload in session.posts: chats.setdefault(payload['chat_id'], []).append(payload['text'])
+    assert chats == {'1': ["primeiro", "segundo" + TELEGRAM_SEPARATOR + "terceiro"], '2': ["outro chat"]}
+    assert session.posts[0][1] == "https://api.telegram.org/botTOKEN/sendMessage"
+
+def test_coalescing_respects_the_message_limit(worker_factory):
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, "primeiro")
+    assert wait_until(lambda: session.posts)
+    for _ in range(3): worker.send("TOKEN", 1, "x" * 2000)
+    gate.set()
+    assert wait_until(lambda: worker.stats['sent'] == 3)
+    assert session.texts()[1:] == ["x" * 2000 + TELEGRAM_SEPARATOR + "x" * 2000, "x" * 2000]
+
+def test_long_message_is_split_on_line_breaks(worker_factory):
+    text = "\n".join(f"linha {i:05d} " + "x" * 50 for i in range(200))
+    assert split_telegram_message(text) and "\n".join(split_telegram_message(text)) == text
+    session = FakeSession()
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, text)
+    assert wait_until(lambda: worker.stats['sent'] == 4)
+    parts = session.texts()
+    assert len(parts) == 4
+    assert all(len(part) <= TELEGRAM_MAX_MESSAGE_LENGTH for part in parts)
+    assert "\n".join(parts) == text
+
+def test_rate_limit_waits_for_retry_after(worker_factory):
+    session = FakeSession([FakeResponse(429, {'ok': False, 'description': "Too Many Requests",
+                                              'parameters': {'retry_after': 0.3}})])
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, "alerta")
+    assert wait_until(lambda: worker.stats['sent'] == 1)
+    (first, _, _), (second, _, _) = session.posts
+    assert second - first >= 0.3
+    assert session.texts() == ["alerta", "alerta"]
+    assert worker.stats['retries'] == 1
+
+def test_server_and_network_errors_back_off_exponentially(worker_factory):
+    session = FakeSession([FakeResponse(502), requests.ConnectionError("sem rede"), FakeResponse(503)])
+    worker = worker_factory(session, base_backoff=0.05)
+    worker.send("TOKEN", 1, "alerta")
+    assert wait_until(lambda: worker.stats['sent'] == 1)
+    times = [posted_at for posted_at, _, _ in session.posts]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert len(gaps) == 3
+    for gap, expected in zip(gaps, (0.05, 0.1, 0.2)): assert gap >= expected
+    assert worker.stats == {'sent': 1, 'failed': 0, 'dropped': 0, 'retries': 3}
+
+def test_permanent_error_is_not_retried(worker_factory):
+    session = FakeSession([FakeResponse(403, {'ok': False, 'description': "Forbidden"})])
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, "alerta")
+    assert wait_until(lambda: worker.stats['failed'] == 1)
+    time.sleep(0.1)
+    assert len(session.posts) == 1
+
+def test_full_queue_drops_new_messages(worker_factory):
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    worker = worker_factory(session, max_queue=2)
+    worker.send("TOKEN", 1, "em envio")
+    assert wait_until(lambda: session.posts)
+    assert worker.send("TOKEN", 1, "a") and worker.send("TOKEN", 1, "b")
+    assert not worker.send("TOKEN", 1, "c")
+    assert worker.stats['dropped'] == 1
+    gate.set()
+
+def outbox_rows(outbox):
+    return outbox._conn.execute("SELECT status, attempts, last_error FROM outbox ORDER BY id").fetchall()
+
+def test_pending_messages_are_replayed_after_restart(worker_factory, monkeypatch):
+    # O programa fecha depois de gravar as mensagens e antes de entregá-las
+    crashed = worker_factory(FakeSession())
+    monkeypatch.setattr(crashed, '_start', lambda: None)
+    crashed.send("TOKEN", 1, "alerta *um*")
+    crashed.send("OUTRO", 2, "alerta dois", parse_mode=None)
+    assert crashed._outbox.counts() == {'pending': 2}
+
+    session = FakeSession()
+    restarted = worker_factory(session)
+    assert restarted.resume() == 2
+    assert wait_until(lambda: restarted._outbox.counts() == {'sent': 2})
+    assert sorted((url, payload.get('parse_mode'), payload['text']) for _, url, payload in session.posts) == [
+        ("https://api.telegram.org/botOUTRO/sendMessage", None, "alerta dois"),
+        ("https://api.telegram.org/botTOKEN/sendMessage", 'Markdown', "alerta *um*")]
+    assert restarted.resume() == 0
+
+def test_outbox_records_retries_and_permanent_failures(worker_factory):
+    session = FakeSession([FakeResponse(502, {'ok': False, 'description': "Bad Gateway"}),
+                           FakeResponse(403, {'ok': False, 'description': "Forbidden"})])
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, "alerta")
+    assert wait_until(lambda: worker._outbox.counts() == {'failed': 1})
+    assert outbox_rows(worker._outbox) == [('failed', 2, "403 Forbidden")]
+
+def test_split_message_is_finalized_after_the_last_part(worker_factory):
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    worker = worker_factory(session)
+    worker.send("TOKEN", 1, "\n".join("x" * 100 for _ in range(100)))
+    assert wait_until(lambda: session.posts)
+    assert worker._outbox.counts() == {'pending': 1}
+    gate.set()
+    assert wait_until(lambda: worker._outbox.counts() == {'sent': 1})
+    assert len(session.posts) == 3
+
+def test_outbox_purges_only_old_finished_rows(tmp_path):
+    outbox = NotificationOutbox(str(tmp_path / "outbox.db"))
+    sent, failed, pending, recent = (outbox.enqueue('telegram', '1', text) for text in "abcd")
+    outbox.mark_sent([sent, recent])
+    outbox.mark_failed([failed], "403")
+    outbox._conn.execute("UPDATE outbox SET updated_at = ? WHERE id IN (?, ?, ?)", (time.time() - 8 * 86400, sent, failed, pending))
+    outbox.purge(retention_days=7)
+    assert [row[0] for row in outbox.pending('telegram')] == [pending]
+    assert outbox.counts() == {'pending': 1, 'sent': 1}
+    outbox.close()
@@ -0,0 +1,162 @@
+import json
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from notification_sinks import (EmailSink, FileSink, NotificationDispatcher, NotificationSink,
+                                WebhookSink, build_sinks)
+
+ALERTS = [{'symbol': 'BTCUSDT', 'message': 'BTC acima de 100k'}, {'symbol': 'ETHUSDT', 'message': 'ETH RSI baixo'}]
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((dict(self.headers), json.loads(body)))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def webhook_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+    server.received, server.status = [], 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo (o suficiente para o smtplib): guarda cada mensagem recebida."""
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost")
+        envelope = {'to': []}
+        while line := self.rfile.readline():
+            command = line.decode('ascii').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply("250 localhost")
+            elif verb == 'MAIL':
+                envelope['from'] = command
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                envelope['to'].append(command)
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 fim com <CRLF>.<CRLF>")
+                data = b""
+                while (chunk := self.rfile.readline()) != b".\r\n":
+                    data += chunk[1:] if chunk.startswith(b"..") else chunk
+                self.server.received.append((envelope, message_from_bytes(data, policy=policy.default)))
+                envelope = {'to': []}
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 tchau")
+                return
+            else:
+                self.reply("250 OK")
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads, server.received = True, []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_sink_interface_is_abstract():
+    with pytest.raises(TypeError):
+        NotificationSink()
+
+    class Incomplete(NotificationSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_webhook_sink_posts_json_batch(webhook_server):
+    url = f"http://127.0.0.1:{webhook_server.server_port}/hook"
+    WebhookSink(url, headers={'X-Token': 'abc'}).deliver(ALERTS)
+    [(headers, body)] = webhook_server.received
+    assert body == {'alerts': ALERTS}
+    assert headers['Content-Type'] == 'application/json'
+    assert headers['X-Token'] == 'abc'
+
+def test_webhook_sink_raises_on_http_error(webhook_server):
+    webhook_server.status = 500
+    with pytest.raises(Exception):
+        WebhookSink(f"http://127.0.0.1:{webhook_server.server_port}/").deliver(ALERTS)
+
+def test_email_sink_sends_one_message_per_batch(smtp_server):
+    sink = EmailSink('127.0.0.1', ['a@example.com', 'b@example.com'], port=smtp_server.server_address[1],
+                     sender='bot@example.com', use_tls=False)
+    sink.deliver(ALERTS)
+    [(envelope, message)] = smtp_server.received
+    assert len(envelope['to']) == 2
+    assert message['Subject'] == "🚨 2 Alerta(s): BTCUSDT, ETHUSDT"
+    assert message['From'] == 'bot@example.com'
+    text = message.get_content()
+    assert 'BTC acima de 100k' in text and 'ETH RSI baixo' in text
+
+def test_build_sinks_skips_disabled_and_unknown(tmp_path):
+    sinks = build_sinks({'notification_sinks': [
+        {'type': 'file', 'path': str(tmp_path / 'a.jsonl')},
+        {'type': 'file', 'path': str(tmp_path / 'b.jsonl'), 'enabled': False},
+        {'type': 'pombo-correio'},
+        {'type': 'webhook'},   # Falta a URL
+    ]})
+    assert [type(sink) for sink in sinks] == [FileSink]
+
+class SlowSink(NotificationSink):
+    kind = 'slow'
+
+    def __init__(self, delay, **kwargs):
+        super().__init__(**kwargs)
+        self.delay, self.received = delay, []
+
+    def deliver(self, alerts):
+        time.sleep(self.delay)
+        self.received.extend(alerts)
+
+def test_slow_sink_does_not_delay_the_others(tmp_path, webhook_server, smtp_server):
+    slow = SlowSink(2.0)
+    path = tmp_path / 'alerts.jsonl'
+    dispatcher = NotificationDispatcher([
+        slow,
+        WebhookSink(f"http://127.0.0.1:{webhook_server.server_port}/"),
+        EmailSink('127.0.0.1', 'a@example.com', port=smtp_server.server_address[1], sender='bot@example.com', use_tls=False),
+        FileSink(str(path)),
+    ])
+    start = time.monotonic()
+    dispatcher.publish(ALERTS)
+    while time.monotonic() - start < 1.5:
+        if webhook_server.received and smtp_server.received and path.exists() and len(path.read_text().splitlines()) == 2:
+            break
+        time.sleep(0.01)
+    assert time.monotonic() - start < 1.5
+    assert not slow.received
+    dispatcher.stop(timeout=5.0)
+    assert [alert['symbol'] for alert in slow.received] == ['BTCUSDT', 'ETHUSDT']
+
+def test_failing_sink_does_not_block_the_others(tmp_path):
+    class BrokenSink(NotificationSink):
+        kind = 'broken'
+        def deliver(self, alerts):
+            raise ConnectionError("fora do ar")
+
+    path = tmp_path / 'alerts.jsonl'
+    dispatcher = NotificationDispatcher([BrokenSink(max_retries=0), FileSink(str(path))])
+    dispatcher.publish(ALERTS)
+    dispatcher.stop(timeout=2.0)
+    assert len(path.read_text().splitlines()) == 2
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from price_levels import PriceLevelIndex, parse_price_levels
+
+class ReferenceLevels:
+    """Implementação direta (com conjuntos e varredura de todos os níveis) usada como referência."""
+    def __init__(self, levels, hysteresis_pct):
+        self.levels, self.h = sorted(levels), hysteresis_pct / 100
+        self.last, self.up, self.down = None, set(), set()
+
+    def update(self, price):
+        previous, self.last = self.last, price
+        self.up = {level for level in self.up if not price < level * (1 - self.h)}
+        self.down = {level for level in self.down if not price > level * (1 + self.h)}
+        if previous is None or price == previous: return (), ()
+        if price > previous:
+            fired = tuple(l for l in self.levels if previous < l <= price and l not in self.up)
+            self.up.update(fired)
+            return fired, ()
+        fired = tuple(l for l in reversed(self.levels) if price <= l < previous and l not in self.down)
+        self.down.update(fired)
+        return (), fired
+
+def test_parse_price_levels():
+    assert parse_price_levels("110; 100, 105.5 100") == (100.0, 105.5, 110.0)
+    with pytest.raises(ValueError):
+        parse_price_levels("100, -5")
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference_on_random_walk(seed):
+    rng = random.Random(seed)
+    levels = sorted({round(rng.uniform(50, 150), 1) for _ in range(200)})
+    index, reference = PriceLevelIndex({'X': levels}, 0.5), ReferenceLevels(levels, 0.5)
+    price = 100.0
+    for _ in range(2000):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.01)))
+        assert index.update('X', price) == reference.update(price)
+        assert index.disarmed_up['X'] == sorted(reference.up)
+        assert index.disarmed_down['X'] == sorted(reference.down)
+
+def test_level_rearms_only_past_hysteresis():
+    index = PriceLevelIndex({'X': [100.0]}, 1.0)
+    index.update('X', 99.0)
+    assert index.update('X', 100.5) == ((100.0,), ())
+    assert index.update('X', 99.5) == ((), (100.0,))
+    assert index.update('X', 100.2) == ((), ())   # Ainda dentro da margem de 1%
+    index.update('X', 98.5)
+    assert index.update('X', 100.1) == ((100.0,), ())
+
+def test_carry_state_keeps_only_remaining_levels():
+    old = PriceLevelIndex({'X': [100.0, 110.0]}, 0.5)
+    old.update('X', 95.0)
+    old.update('X', 115.0)
+    new = PriceLevelIndex({'X': [110.0, 120.0]}, 0.5)
+    new.carry_state(old)
+    assert new.disarmed_up['X'] == [110.0]
+    assert new.update('X', 121.0) == ((120.0,), ())
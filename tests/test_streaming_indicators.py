@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import (calculate_ema, calculate_rsi, calculate_bollinger_bands, calculate_macd,
+                        StreamingEMA, RollingStats, StreamingRSI, StreamingMACD)
+
+def random_closes(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+def frame(closes):
+    return pd.DataFrame({'close': closes})
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("period", [9, 50, 200])
+def test_ema_matches_batch(seed, period):
+    closes = random_closes(seed=seed)
+    ema = StreamingEMA(period)
+    streamed = [ema.update(c) for c in closes]
+    np.testing.assert_allclose(streamed, calculate_ema(pd.Series(closes), period).to_numpy(), rtol=1e-10)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bollinger_matches_batch(seed):
+    closes = random_closes(seed=seed)
+    stats = RollingStats(20)
+    for i, close in enumerate(closes):
+        stats.update(close)
+        if i + 1 >= 20:
+            np.testing.assert_allclose(stats.bands(2), calculate_bollinger_bands(frame(closes[:i + 1]), 20, 2), rtol=1e-8)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rsi_matches_batch(seed):
+    closes = random_closes(seed=seed)
+    rsi = StreamingRSI(14)
+    for i, close in enumerate(closes):
+        rsi.update(close)
+        if i >= 14:
+            assert rsi.value == pytest.approx(calculate_rsi(frame(closes[:i + 1]), 14)[0], rel=1e-9)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_macd_cross_matches_batch(seed):
+    closes = random_closes(seed=seed)
+    macd = StreamingMACD()
+    for i, close in enumerate(closes):
+        macd.update(close)
+        assert macd.cross == calculate_macd(frame(closes[:i + 1]))
+
+def wilder_rsi_reference(closes, period=14):
+    """RSI de Wilder: média simples nas primeiras 'period' variações, depois suavização recursiva."""
+    deltas = np.diff(closes)
+    gains, losses = np.maximum(deltas, 0), np.maximum(-deltas, 0)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    values = [100 - 100 / (1 + avg_gain / avg_loss)]
+    for gain, loss in zip(gains[period:], losses[period:]):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+        values.append(100 - 100 / (1 + avg_gain / avg_loss))
+    return np.array(values)
+
+def test_wilder_rsi_matches_reference():
+    closes = random_closes(seed=7)
+    rsi = StreamingRSI(14, wilder=True)
+    streamed = [rsi.update(c) for c in closes][14:]
+    np.testing.assert_allclose(streamed, wilder_rsi_reference(closes, 14), rtol=1e-9)
+
+@pytest.mark.parametrize("make", [lambda: StreamingEMA(20), lambda: RollingStats(20), lambda: StreamingRSI(14),
+                                  lambda: StreamingRSI(14, wilder=True), lambda: StreamingMACD()])
+def test_rewriting_last_candle_matches_final_value(make):
+    """Várias atualizações do candle em formação terminam no mesmo estado de um único update com o valor final."""
+    closes = random_closes(seed=3)
+    rng = np.random.default_rng(11)
+    live, reference = make(), make()
+    for close in closes:
+        live.update(close * (1 + rng.normal(0, 0.01)))
+        for _ in range(3):
+            live.update(close * (1 + rng.normal(0, 0.01)), new_candle=False)
+        live.update(close, new_candle=False)
+        reference.update(close)
+    for attribute in ('value', 'mean', 'std', 'histogram', 'cross'):
+        if hasattr(reference, attribute):
+            expected, actual = getattr(reference, attribute), getattr(live, attribute)
+            if isinstance(expected, str): assert actual == expected
+            else: assert actual == pytest.approx(expected, rel=1e-8)
+
+@pytest.mark.parametrize("make", [lambda: StreamingEMA(20), lambda: RollingStats(20),
+                                  lambda: StreamingRSI(14, wilder=True), lambda: StreamingMACD()])
+def test_snapshot_restore_round_trip(make):
+    closes = random_closes(seed=5)
+    original = make().warm_up(closes[:300])
+    restored = make().restore(json.loads(json.dumps(original.snapshot())))
+    for close in closes[300:]:
+        assert restored.update(close) == pytest.approx(original.update(close), rel=1e-12)
+    assert restored.snapshot() == original.snapshot()
@@ -12,6 +12,7 @@ from packaging.version import parse as parse_version
 import hashlib
 
 from core_components import get_application_path
+from config_store import load_config_file
 
 # --- Constantes ---
 GITHUB_API_URL = "https://api.github.com/repos/PauloBennertz/MonitorCriptomoedas3.2/releases/latest"
@@ -110,19 +111,16 @@ def check_for_updates(root, current_version, on_startup=False):
     """ Verifica atualizações. Se on_startup for True, força a atualização se a flag estiver ativa. """
     config_path = _get_config_path()
     # Checa a flag de atualização ao iniciar
-    if on_startup and os.path.exists(config_path):
-        try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            if config.get('update_on_startup'):
-                print("Flag 'update_on_startup' encontrada. Resetando e tentando atualizar...")
-                # Reseta a flag ANTES de tentar a atualização para evitar loops
-                _set_update_on_startup_flag(False)
-                # Força a verificação e o download
-                threading.Thread(target=_perform_check, args=(root, current_version, True), daemon=True).start()
-                return  # Impede a verificação normal de ser executada
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Erro ao ler o arquivo de configuracao: {e}")
+    if on_startup:
+        app = getattr(root, 'app', None)
+        config = app.config if app is not None else load_config_file(config_path, default={})
+        if config.get('update_on_startup'):
+            print("Flag 'update_on_startup' encontrada. Resetando e tentando atualizar...")
+            # Reseta a flag ANTES de tentar a atualização para evitar loops
+            _set_update_on_startup_flag(False, root)
+            # Força a verificação e o download
+            threading.Thread(target=_perform_check, args=(root, current_version, True), daemon=True).start()
+            return  # Impede a verificação normal de ser executada
 
     # Verificação normal (manual ou na inicialização sem a flag)
     threading.Thread(target=_perform_check, args=(root, current_version, False), daemon=True).start()
@@ -164,20 +162,32 @@ def show_update_notification(root, version, notes, assets):
     if win.result == "now":
         download_and_install(root, assets)
     elif win.result == "startup":
-        _set_update_on_startup_flag(True)
+        _set_update_on_startup_flag(True, root)
 
 def _get_config_path():
     return os.path.join(get_application_path(), CONFIG_FILE_NAME)
 
-def _set_update_on_startup_flag(status: bool):
-    """ Define a flag no config.json. """
+def _set_update_on_startup_flag(status: bool, root=None):
+    """
+    Define a flag no config.json. Com a aplicação aberta, passa pela configuração dela
+    (save_config publica e agenda a gravação atômica); sem ela, grava o arquivo com um
+    temporário + os.replace, para nunca deixar o config.json pela metade.
+    """
+    app = getattr(root, 'app', None)
+    if app is not None:
+        app.config['update_on_startup'] = status
+        app.save_config()
+        return
     config_path = _get_config_path()
+    tmp_path = config_path + '.tmp'
     try:
-        config = {}
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f: config = json.load(f)
+        config = load_config_file(config_path, default={})
         config['update_on_startup'] = status
-        with open(config_path, 'w') as f: json.dump(config, f, indent=2)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, config_path)
     except Exception as e:
         print(f"Erro ao salvar flag de atualização: {e}")
 